@@ -5,19 +5,38 @@ Three-panel layout: Workspaces (left) | Canvas Visualization (center) | Workflow
 import os
 import json
 import asyncio
+from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, Response, render_template, jsonify, request, send_from_directory, stream_with_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
-import threading
 import time
+import uuid
 
 # Local imports
 from database.models import DatabaseManager, Workspace, WorkflowExecution
 from database.models import Workflow as WorkflowDB
+from database.job_queue import JobQueue
+from database.recorder import ExecutionRecorder
+from database.retention import RetentionManager
 from core.workflow_manager import WorkflowManager
 from core.workflow import Workflow
+from core.plan import PlanCache
+from core.engine_loop import EngineLoop
+from core.engine_service import EngineService, QueueFullError
+from core.browser_pool import BrowserPool
+from core.process_pool import WorkerProcessPool
+from core.fleet import FleetRegistry
+from core.cron import parse_schedule
+from core.scheduler import Scheduler
+from core.directory_sync import DirectoryManifest, DirectoryWatcher
+from core.realtime import RealtimeEmitter
+from core.event_bus import EventBus, NodeMetrics
+from core.run_log import RunLogManager, install_stdout_capture
+from core.log import configure_logging, get_log_stats
+from core.http_client import close_http_client, get_http_stats
+from core.request_blocking import compile_blocking_rules, get_blocking_stats, record_run
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -25,14 +44,25 @@ app.config['SECRET_KEY'] = 'n8n-style-automation-ui'
 
 # Initialize SocketIO
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Room-scoped event delivery, coalesced into 100ms batches with a bounded queue per client
+realtime = RealtimeEmitter(socketio, flush_interval=float(os.environ.get('REALTIME_FLUSH_INTERVAL', 0.1)))
 
-# Global instances
-db_manager = DatabaseManager()
-workflow_manager = WorkflowManager()
+# Services are created by init() when the server starts, so importing this module has no side
+# effects (worker processes started with `spawn` re-import it as __mp_main__)
 
 # Global state for real-time updates
 active_executions = {}
-execution_logs = {}
+
+def queue_full_response(error: QueueFullError):
+    """HTTP 429 with Retry-After when the engine queue applies backpressure"""
+    response = jsonify({
+        'error': str(error),
+        'retry_after': error.retry_after,
+        'engine': engine_service.get_stats()
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
 
 @app.route('/')
 def index():
@@ -62,7 +92,7 @@ def create_workspace():
         workspace.id = workspace_id
         
         # Emit real-time update
-        socketio.emit('workspace_created', workspace.to_dict())
+        realtime.emit('workspace_created', workspace.to_dict())
         
         return jsonify(workspace.to_dict()), 201
     except Exception as e:
@@ -83,10 +113,25 @@ def update_workspace(workspace_id):
         workspace.max_concurrent_workflows = data.get('max_concurrent_workflows', workspace.max_concurrent_workflows)
         workspace.proxy_settings = data.get('proxy_settings', workspace.proxy_settings)
         
+        if 'browser_settings' in data:
+            try:
+                compile_blocking_rules(data['browser_settings'])
+            except ValueError as e:
+                return jsonify({'error': f'Invalid request blocking settings: {e}'}), 400
+            workspace.browser_settings = data['browser_settings']
+        
+        if 'schedule_settings' in data:
+            try:
+                build_schedules(workspace.id, data['schedule_settings'], validate=True)
+            except ValueError as e:
+                return jsonify({'error': f'Invalid schedule: {e}'}), 400
+            workspace.schedule_settings = data['schedule_settings']
+        
         db_manager.update_workspace(workspace)
+        sync_schedules()
         
         # Emit real-time update
-        socketio.emit('workspace_updated', workspace.to_dict())
+        realtime.emit('workspace_updated', workspace.to_dict())
         
         return jsonify(workspace.to_dict())
     except Exception as e:
@@ -98,7 +143,8 @@ def delete_workspace(workspace_id):
     try:
         success = db_manager.delete_workspace(workspace_id)
         if success:
-            socketio.emit('workspace_deleted', {'id': workspace_id})
+            sync_schedules()
+            realtime.emit('workspace_deleted', {'id': workspace_id})
             return jsonify({'message': 'Workspace deleted successfully'})
         return jsonify({'error': 'Workspace not found'}), 404
     except Exception as e:
@@ -106,30 +152,64 @@ def delete_workspace(workspace_id):
 
 @app.route('/api/workspaces/<int:workspace_id>/workflows', methods=['GET'])
 def get_workspace_workflows(workspace_id):
-    """Get all workflows in a workspace"""
+    """
+    Get workflows in a workspace (without their JSON bodies).
+    Optional keyset pagination: `limit` and `cursor`; the next page's cursor is returned
+    in the X-Next-Cursor header while more rows remain.
+    """
     try:
-        workflows = db_manager.get_workflows_by_workspace(workspace_id)
-        return jsonify([wf.to_dict() for wf in workflows])
+        limit = request.args.get('limit', type=int)
+        page_size = min(max(limit, 1), 1000) if limit else None
+        cursor = request.args.get('cursor')
+        after = None
+        if cursor:
+            try:
+                display_order, last_id = cursor.split(':')
+                after = (int(display_order), int(last_id))
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        workflows = db_manager.get_workflows_by_workspace(
+            workspace_id,
+            limit=page_size,
+            after=after
+        )
+        response = jsonify([wf.to_dict() for wf in workflows])
+        if page_size and len(workflows) == page_size:
+            last = workflows[-1]
+            response.headers['X-Next-Cursor'] = f"{last.display_order}:{last.id}"
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/workspaces/<int:workspace_id>/sync', methods=['POST'])
 def sync_workspace_workflows(workspace_id):
-    """Sync workflows from workflows_json directory"""
+    """Sync workflows from workflows_json directory (only new or changed files are read)"""
     try:
-        workflows_dir = Path('workflows_json')
-        result = db_manager.sync_workflows_from_directory(workspace_id, str(workflows_dir))
+        if not workflow_files.directory.exists():
+            return jsonify({'error': f"Directory not found: {workflow_files.directory}"})
+        scan = scan_workflow_files()
+        result = db_manager.sync_workflow_files(workspace_id, scan.files.values())
+        result['errors'].extend(scan.errors)
         
         # Emit real-time update
-        socketio.emit('workspace_synced', {
+        realtime.emit('workspace_synced', {
             'workspace_id': workspace_id,
             'result': result
-        })
+        }, room=workspace_room(workspace_id))
         
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/workspaces/<int:workspace_id>/statistics', methods=['GET'])
+def get_workspace_statistics(workspace_id):
+    """Get execution statistics for a workspace (served from incrementally maintained counters)"""
+    try:
+        return jsonify(db_manager.get_workspace_statistics(workspace_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/workflows/<int:workflow_id>/canvas-data', methods=['GET'])
 def get_workflow_canvas_data(workflow_id):
     """Get workflow data for canvas visualization"""
@@ -164,10 +244,10 @@ def reorder_workflows(workflow_id):
         db_manager.update_workflow_order(order_tuples)
         
         # Emit real-time update
-        socketio.emit('workflows_reordered', {
+        realtime.emit('workflows_reordered', {
             'workspace_id': data.get('workspace_id'),
             'orders': workflow_orders
-        })
+        }, room=workspace_room(data.get('workspace_id')))
         
         return jsonify({'message': 'Workflows reordered successfully'})
     except Exception as e:
@@ -180,23 +260,27 @@ def execute_single_workflow(workflow_id):
     try:
         data = request.get_json() or {}
         headless = data.get('headless', True)
+        priority = int(data.get('priority', 0))
         
         workflow = db_manager.get_workflow(workflow_id)
         if not workflow:
             return jsonify({'error': 'Workflow not found'}), 404
         
-        # Start execution in background
-        execution_thread = threading.Thread(
-            target=run_workflow_execution,
-            args=(workflow_id, headless)
+        # Persist the job; the engine picks it up by priority (429 when the queue is full)
+        job_id = engine_service.enqueue(
+            'workflow',
+            {'workflow_id': workflow_id, 'headless': headless},
+            priority=priority,
+            idempotency_key=data.get('idempotency_key')
         )
-        execution_thread.daemon = True
-        execution_thread.start()
         
         return jsonify({
             'message': 'Workflow execution started',
-            'workflow_id': workflow_id
+            'workflow_id': workflow_id,
+            'job_id': job_id
         })
+    except QueueFullError as e:
+        return queue_full_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -206,25 +290,218 @@ def execute_workspace_workflows(workspace_id):
     try:
         data = request.get_json() or {}
         headless = data.get('headless', True)
-        max_concurrent = data.get('max_concurrent', 3)
+        priority = int(data.get('priority', 0))
+        
+        workspace = db_manager.get_workspace(workspace_id)
+        if not workspace:
+            return jsonify({'error': 'Workspace not found'}), 404
+        
+        # Concurrency is bounded by the workspace setting
+        max_concurrent = workspace.max_concurrent_workflows or data.get('max_concurrent', 3)
         
         workflows = db_manager.get_workflows_by_workspace(workspace_id)
         if not workflows:
             return jsonify({'error': 'No workflows found in workspace'}), 404
         
-        # Start batch execution in background
-        execution_thread = threading.Thread(
-            target=run_batch_execution,
-            args=(workspace_id, [wf.id for wf in workflows], headless, max_concurrent)
+        # Persist the batch; it counts against the queue for every workflow it contains
+        job_id = engine_service.enqueue(
+            'batch',
+            {
+                'workspace_id': workspace_id,
+                'workflow_ids': [wf.id for wf in workflows],
+                'headless': headless,
+                'max_concurrent': max_concurrent,
+                'priority': priority
+            },
+            priority=priority,
+            idempotency_key=data.get('idempotency_key'),
+            cost=len(workflows)
         )
-        execution_thread.daemon = True
-        execution_thread.start()
         
         return jsonify({
             'message': f'Started execution of {len(workflows)} workflows',
+            'job_id': job_id,
             'workspace_id': workspace_id,
-            'workflow_count': len(workflows)
+            'workflow_count': len(workflows),
+            'max_concurrent': max_concurrent
         })
+    except QueueFullError as e:
+        return queue_full_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/engine/stats', methods=['GET'])
+def get_engine_stats():
+    """Get engine queue, browser pool and plan cache statistics"""
+    try:
+        return jsonify({
+            'queue': engine_service.get_stats(),
+            'browser_pools': {
+                'headless' if headless else 'headed': pool.get_stats()
+                for headless, pool in browser_pools.items()
+            },
+            'plan_cache': plan_cache.get_stats(),
+            'process_pool': process_pool.get_stats() if process_pool else None,
+            'fleet': fleet_registry.get_stats(),
+            'scheduler': scheduler.get_stats(),
+            'execution_recorder': execution_recorder.get_stats(),
+            'retention': retention_manager.get_stats(),
+            'realtime': realtime.get_stats(),
+            'event_bus': event_bus.get_stats(),
+            'nodes': node_metrics.get_stats(),
+            'run_logs': run_logs.get_stats(),
+            'http': get_http_stats(),
+            'request_blocking': get_blocking_stats(),
+            'logging': get_log_stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def expire_fleet_workers():
+    """Drop workers that stopped sending heartbeats and requeue the jobs they had leased"""
+    for worker_id in fleet_registry.expire():
+        requeued = job_queue.requeue_stale_leases(owner=worker_id)
+        print(f"⚠️ Fleet worker {worker_id} expired, requeued {requeued} jobs")
+
+@app.route('/api/fleet/workers', methods=['GET'])
+def get_fleet_workers():
+    """List registered fleet workers"""
+    expire_fleet_workers()
+    return jsonify(fleet_registry.list_workers())
+
+@app.route('/api/fleet/workers/register', methods=['POST'])
+def register_fleet_worker():
+    """Register a remote worker and advertise its capacity (free browser slots)"""
+    try:
+        data = request.get_json() or {}
+        if not data.get('worker_id'):
+            return jsonify({'error': 'worker_id is required'}), 400
+        
+        # A re-registering worker lost its previous jobs (restart): hand them to someone else
+        job_queue.requeue_stale_leases(owner=data['worker_id'])
+        info = fleet_registry.register(
+            data['worker_id'],
+            data.get('hostname', request.remote_addr),
+            int(data.get('capacity', 1)),
+            data.get('labels')
+        )
+        return jsonify({
+            'worker_id': info.worker_id,
+            'heartbeat_interval': fleet_registry.heartbeat_interval,
+            'lease_seconds': job_queue.lease_seconds
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fleet/workers/heartbeat', methods=['POST'])
+def fleet_worker_heartbeat():
+    """Update free slots and extend the leases of the jobs the worker is running"""
+    try:
+        data = request.get_json() or {}
+        worker_id = data.get('worker_id')
+        info = fleet_registry.heartbeat(worker_id, int(data.get('free_slots', 0)), data.get('running_jobs'))
+        if info is None:
+            return jsonify({'error': 'Worker not registered'}), 404
+        
+        lost = [job_id for job_id in info.running_jobs if not job_queue.extend_lease(job_id, worker_id)]
+        expire_fleet_workers()
+        return jsonify({'status': 'ok', 'lost_jobs': lost})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fleet/jobs/claim', methods=['POST'])
+def claim_fleet_jobs():
+    """Lease workflow jobs to a remote worker, bounded by its share of the fleet's free capacity"""
+    try:
+        data = request.get_json() or {}
+        worker_id = data.get('worker_id')
+        if fleet_registry.get(worker_id) is None:
+            return jsonify({'error': 'Worker not registered'}), 404
+        
+        expire_fleet_workers()
+        # Remote workers only run workflow jobs: share out only those that can be claimed now
+        kinds = ['workflow']
+        limit = fleet_registry.claim_limit(worker_id, int(data.get('max_jobs', 1)),
+                                           job_queue.count_queued(kinds, ready=True))
+        jobs = job_queue.claim(worker_id, limit, kinds=kinds)
+        fleet_registry.record_claim(worker_id, [job.id for job in jobs])
+        
+        claimed = []
+        for job in jobs:
+            workflow = db_manager.get_workflow(job.payload['workflow_id'])
+            if not workflow:
+                job_queue.complete(job.id, worker_id, False)
+                fleet_registry.release(worker_id, job.id)
+                continue
+            begin_workflow_execution(workflow)
+            # Workspace browser settings (e.g. request blocking profile) apply on remote workers too
+            workspace = db_manager.get_workspace(workflow.workspace_id) if workflow.workspace_id else None
+            claimed.append({
+                'id': job.id,
+                'attempts': job.attempts,
+                'payload': job.payload,
+                'workflow': {
+                    'id': workflow.id,
+                    'name': workflow.name,
+                    'json_content': workflow.json_content,
+                    'browser_settings': workspace.browser_settings if workspace else None
+                }
+            })
+        return jsonify({'jobs': claimed})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fleet/jobs/<int:job_id>/complete', methods=['POST'])
+def complete_fleet_job(job_id):
+    """Record the outcome of a job run by a remote worker"""
+    try:
+        data = request.get_json() or {}
+        worker_id = data.get('worker_id')
+        job = job_queue.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        workflow_id = job.payload.get('workflow_id')
+        if data.get('status') == 'failed':
+            # Infrastructure failure on the worker: retry with backoff while attempts remain
+            retried = job_queue.fail(job_id, worker_id, data.get('error') or 'Worker error')
+            if not retried and job_queue.get_job(job_id).status == 'failed':
+                finish_workflow_execution(workflow_id, False, error=data.get('error'))
+        else:
+            result = data.get('result') or {}
+            if not job_queue.complete(job_id, worker_id, bool(result.get('success'))):
+                fleet_registry.release(worker_id, job_id)
+                return jsonify({'error': 'Lease lost; the job was handed to another worker'}), 409
+            request_blocking = result.get('request_blocking')
+            if not isinstance(request_blocking, dict):
+                request_blocking = None
+            if request_blocking:
+                # Counted on the remote worker; add to this process's totals for engine stats
+                record_run(request_blocking)
+            finish_workflow_execution(
+                workflow_id,
+                bool(result.get('success')),
+                result.get('execution_time'),
+                result.get('error'),
+                node_results=result.get('node_results'),
+                run_id=result.get('run_id'),
+                request_blocking=request_blocking
+            )
+        
+        fleet_registry.release(worker_id, job_id)
+        engine_service.notify_job_finished(job_queue.get_job(job_id))
+        return jsonify({'status': 'ok'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a durable job (status, attempts, last error, result)"""
+    try:
+        job = job_queue.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -243,39 +520,100 @@ def get_workflow_status(workflow_id):
             'status': workflow.status,
             'current_node': execution_info.get('current_node'),
             'progress': execution_info.get('progress', 0),
+            'run_id': execution_info.get('run_id'),
             'last_execution_time': workflow.last_execution_time,
             'last_run_at': workflow.last_run_at
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/workflows/<int:workflow_id>/executions', methods=['GET'])
+def get_workflow_executions(workflow_id):
+    """Get recorded executions of a workflow (newest first) with per-node results"""
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        executions = db_manager.get_execution_history(workflow_id, limit)
+        return jsonify([asdict(execution) for execution in executions])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/workflows/<int:workflow_id>/executions/daily', methods=['GET'])
+def get_workflow_execution_rollups(workflow_id):
+    """Get daily summaries of executions older than the retention window"""
+    try:
+        days = int(request.args.get('days', 90))
+        return jsonify(db_manager.get_execution_rollups(workflow_id, days))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/executions/<int:execution_id>', methods=['GET'])
+def get_execution(execution_id):
+    """Get one execution with its node results (loaded from the archive for old runs)"""
+    try:
+        execution = db_manager.get_execution(execution_id)
+        if not execution:
+            return jsonify({'error': 'Execution not found'}), 404
+        execution.node_results = retention_manager.load_node_results(execution)
+        return jsonify(asdict(execution))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/runs/<run_id>/logs', methods=['GET'])
+def stream_run_logs(run_id):
+    """
+    Stream a run's log records as NDJSON starting at `offset`.
+    With `follow=1` the response stays open and tails the run until it finishes.
+    """
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        follow = request.args.get('follow', '0').lower() in ('1', 'true', 'yes')
+        first = run_logs.read(run_id, offset)
+        if first is None:
+            return jsonify({'error': 'Run log not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate(records, position):
+        while True:
+            for record in records:
+                yield json.dumps(record.to_dict(), ensure_ascii=False) + '\n'
+            if records:
+                position = records[-1].offset + 1
+            else:
+                run_log = run_logs.get(run_id)
+                if not follow or run_log is None or (run_log.finished and run_log.next_offset <= position):
+                    return
+                run_log.wait(position, 15)
+            records = run_logs.read(run_id, position) or []
+    
+    return Response(stream_with_context(generate(first, offset)), mimetype='application/x-ndjson')
+
+@app.route('/api/workflows/<int:workflow_id>/statistics', methods=['GET'])
+def get_workflow_statistics(workflow_id):
+    """Get execution statistics for a workflow"""
+    try:
+        return jsonify(db_manager.get_workflow_statistics(workflow_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/workflows/available', methods=['GET'])
 def get_available_workflows():
-    """Get all available workflow files from filesystem"""
+    """Get all available workflow files from filesystem (served from the directory manifest)"""
     try:
-        workflows_dir = Path('workflows_json')
-        if not workflows_dir.exists():
-            return jsonify([])
-        
-        available_workflows = []
-        
-        for json_file in workflows_dir.glob('*.json'):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    workflow_data = json.loads(f.read())
-                
-                file_stat = json_file.stat()
-                available_workflows.append({
-                    'name': json_file.stem,
-                    'file_path': str(json_file),
-                    'node_count': len(workflow_data.get('nodes', [])),
-                    'file_size': f"{file_stat.st_size / 1024:.1f} KB",
-                    'modified_at': datetime.fromtimestamp(file_stat.st_mtime).isoformat()
-                })
-            except Exception as e:
-                print(f"Error reading {json_file}: {e}")
-                continue
+        scan = scan_workflow_files()
+        for error in scan.errors:
+            print(f"Error reading {error}")
         
+        available_workflows = [
+            {
+                'name': entry.name,
+                'file_path': entry.path,
+                'node_count': entry.node_count,
+                'file_size': f"{entry.size / 1024:.1f} KB",
+                'modified_at': datetime.fromtimestamp(entry.mtime_ns / 1e9).isoformat()
+            }
+            for entry in scan.files.values()
+        ]
         return jsonify(available_workflows)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -332,144 +670,397 @@ def add_workflow_to_workspace():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def run_workflow_execution(workflow_id: int, headless: bool = True):
-    """Run a single workflow execution"""
-    try:
+def get_browser_pool(headless: bool = True) -> BrowserPool:
+    """Get the shared browser pool for the requested mode (lives on the engine loop)"""
+    if headless not in browser_pools:
+        browser_pools[headless] = BrowserPool(headless=headless)
+    return browser_pools[headless]
+
+async def shutdown_engine():
+    """Stop engine workers and close the browser pools and HTTP client owned by the engine loop"""
+    await engine_service.shutdown()
+    for pool in browser_pools.values():
+        await pool.close()
+    await close_http_client()
+
+def workspace_room(workspace_id) -> str:
+    """Socket.IO room joined by clients viewing a workspace"""
+    return f"workspace_{workspace_id}"
+
+def workflow_room(workflow_id: int, execution: Dict = None) -> Optional[str]:
+    """Room for an executing workflow's events (None when it is not tracked as executing)"""
+    execution = execution or active_executions.get(workflow_id)
+    if execution is not None and execution.get('workspace_id') is not None:
+        return workspace_room(execution['workspace_id'])
+    return None
+
+def emit_node_event(event):
+    """Event bus subscriber: track progress and forward node lifecycle events to the UI"""
+    workflow_id = event.source
+    execution = active_executions.get(workflow_id)
+    if execution is not None:
+        execution['current_node'] = event.node_id
+        if event.kind != 'node_started':
+            execution['executed_nodes'] = execution.get('executed_nodes', 0) + 1
+            if execution.get('node_count'):
+                execution['progress'] = min(100, int(execution['executed_nodes'] / execution['node_count'] * 100))
+    
+    # Runs on the dispatcher thread, so no database lookup: events of a run that is no longer
+    # tracked (its final status was already sent) are dropped
+    room = workflow_room(workflow_id, execution)
+    if room is None:
+        return
+    
+    # Node events are high-frequency and only drive highlighting: a slow client may lose them
+    realtime.emit(event.kind, {
+        'workflow_id': workflow_id,
+        'run_id': event.run_id,
+        'node_id': event.node_id,
+        'node_type': event.node_type,
+        'execution_time': event.execution_time,
+        'error': event.error,
+        'timestamp': datetime.fromtimestamp(event.timestamp).isoformat()
+    }, room=room, droppable=True)
+
+def begin_workflow_execution(workflow: WorkflowDB, run_id: str = None):
+    """Mark a workflow as running and notify the UI"""
+    db_manager.update_workflow_status(workflow.id, 'running')
+    active_executions[workflow.id] = {
+        'status': 'running',
+        'started_at': datetime.now().isoformat(),
+        'current_node': None,
+        'progress': 0,
+        'node_count': workflow.node_count,
+        'workspace_id': workflow.workspace_id,
+        'run_id': run_id
+    }
+    
+    # Emit start event
+    realtime.emit('workflow_started', {
+        'workflow_id': workflow.id,
+        'run_id': run_id,
+        'timestamp': datetime.now().isoformat()
+    }, room=workspace_room(workflow.workspace_id), coalesce_key=('workflow_status', workflow.id))
+
+def finish_workflow_execution(workflow_id: int, success: bool, execution_time: float = None,
+                              error: str = None, node_results: Dict = None, started_at: float = None,
+                              run_id: str = None, request_blocking: Dict = None):
+    """
+    Store the final workflow status, queue the run for execution history and notify the UI.
+    Blocks on the event bus and the database: call it off the engine loop.
+    """
+    # Wait for the dispatcher to deliver the run's remaining node events, so the UI sees them
+    # before the final status
+    event_bus.flush()
+    
+    # Clean up active execution
+    room = workflow_room(workflow_id, active_executions.pop(workflow_id, None))
+    if room is None:
+        # Not tracked by this process (e.g. a fleet job claimed before a restart)
         workflow = db_manager.get_workflow(workflow_id)
-        if not workflow:
-            return
-        
-        # Update status to running
-        db_manager.update_workflow_status(workflow_id, 'running')
-        active_executions[workflow_id] = {
-            'status': 'running',
-            'started_at': datetime.now().isoformat(),
-            'current_node': None,
-            'progress': 0
-        }
-        
-        # Emit start event
-        socketio.emit('workflow_started', {
-            'workflow_id': workflow_id,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Parse workflow data
-        workflow_data = json.loads(workflow.json_content)
-        nodes = workflow_data.get('nodes', [])
-        
-        # Create workflow engine
-        engine = Workflow(workflow.name, workflow_data)
-        
-        start_time = time.time()
-        
-        # Execute workflow synchronously (the engine handles async internally)
-        success = asyncio.run(engine.run())
-        
-        if not success:
-            raise Exception("Workflow execution failed")
-        
-        execution_time = time.time() - start_time
-        
-        # Update workflow status
+        room = workspace_room(workflow.workspace_id) if workflow else None
+    
+    # Buffered; written to workflow_executions in batches by the recorder thread
+    execution_recorder.record(workflow_id, success, execution_time, error, node_results,
+                              started_at, run_id)
+    
+    if success:
         db_manager.update_workflow_status(workflow_id, 'completed', execution_time)
-        
-        # Clean up active execution
-        if workflow_id in active_executions:
-            del active_executions[workflow_id]
-        
-        # Emit completion event
-        socketio.emit('workflow_completed', {
+        realtime.emit('workflow_completed', {
             'workflow_id': workflow_id,
-            'execution_time': execution_time,
+            'execution_time': execution_time or 0.0,
+            'request_blocking': request_blocking,
             'timestamp': datetime.now().isoformat()
-        })
-        
-    except Exception as e:
-        # Handle error
+        }, room=room, coalesce_key=('workflow_status', workflow_id))
+    else:
         db_manager.update_workflow_status(workflow_id, 'failed')
-        
-        # Clean up active execution
-        if workflow_id in active_executions:
-            del active_executions[workflow_id]
-        
-        # Emit error event
-        socketio.emit('workflow_error', {
+        realtime.emit('workflow_error', {
             'workflow_id': workflow_id,
-            'error': str(e),
+            'error': error or "Workflow execution failed",
+            'request_blocking': request_blocking,
             'timestamp': datetime.now().isoformat()
-        })
+        }, room=room, coalesce_key=('workflow_status', workflow_id))
 
-def run_batch_execution(workspace_id: int, workflow_ids: List[int], headless: bool = True, max_concurrent: int = 3):
-    """Run batch workflow execution"""
+async def execute_workflow_async(workflow_id: int, headless: bool = True) -> bool:
+    """Run a single workflow execution on the engine loop"""
+    start_time, node_results, run_id, request_blocking = None, None, uuid.uuid4().hex, None
+    publish = event_bus.publisher(run_id, source=workflow_id)
+    # Everything the run prints (here or in a worker process) goes to its ring-buffered log
+    with run_logs.capture(run_id, workflow_id=workflow_id) as run_log:
+        try:
+            # Database calls run in worker threads: other runs on the engine loop never wait on SQLite
+            workflow = await asyncio.to_thread(db_manager.get_workflow, workflow_id)
+            if not workflow:
+                return False
+            
+            await asyncio.to_thread(begin_workflow_execution, workflow, run_id)
+            start_time = time.time()
+            
+            # Workspace browser settings (e.g. request blocking profile) apply to every run in it
+            workspace = (await asyncio.to_thread(db_manager.get_workspace, workflow.workspace_id)
+                         if workflow.workspace_id else None)
+            browser_settings = workspace.browser_settings if workspace else None
+            
+            if process_pool is not None:
+                # Run in a worker process; node events and output come back over the pool's IPC channel
+                outcome = await process_pool.run(
+                    workflow.json_content,
+                    workflow.name,
+                    headless=headless,
+                    run_id=run_id,
+                    publish=publish,
+                    run_log=run_log,
+                    browser_settings=browser_settings
+                )
+                success, error_message = outcome['success'], outcome['error']
+                node_results = outcome['node_results']
+                request_blocking = (outcome['summary'] or {}).get('request_blocking')
+                if request_blocking:
+                    # Counted in the worker process; add to this process's totals for engine stats
+                    record_run(request_blocking)
+            else:
+                # Get compiled plan (parsed and built only when the JSON content changed; the
+                # persistent tier is read from SQLite)
+                plan = await asyncio.to_thread(plan_cache.get_or_compile, workflow.json_content)
+                
+                # Create workflow definition and a fresh run instance
+                engine = Workflow(workflow.name, plan=plan)
+                run = engine.create_run(run_id=run_id, publish=publish, browser_settings=browser_settings)
+                
+                # Execute workflow with a context leased from the shared browser pool
+                success = await run.run(browser_pool=get_browser_pool(headless))
+                error_message = run.error_message
+                node_results = run.get_node_results()
+                request_blocking = run.get_summary()['request_blocking']
+            
+            if not success:
+                raise Exception(error_message or "Workflow execution failed")
+            
+            await asyncio.to_thread(finish_workflow_execution, workflow_id, True, time.time() - start_time,
+                                    node_results=node_results, started_at=start_time, run_id=run_id,
+                                    request_blocking=request_blocking)
+            return True
+            
+        except Exception as e:
+            await asyncio.to_thread(finish_workflow_execution, workflow_id, False,
+                                    time.time() - start_time if start_time else None,
+                                    str(e), node_results, start_time, run_id, request_blocking)
+            return False
+
+def run_workflow_execution(workflow_id: int, headless: bool = True) -> bool:
+    """Run a single workflow execution through the durable queue and wait for the result"""
+    job_id = engine_service.enqueue('workflow', {'workflow_id': workflow_id, 'headless': headless})
+    job = engine_loop.run(engine_service.wait_for_job(job_id))
+    return bool(job and job.status == 'completed' and job.result)
+
+async def run_batch_execution(workspace_id: int, workflow_ids: List[int], headless: bool = True,
+                              max_concurrent: int = 3, batch_id: int = None, priority: int = 0):
+    """
+    Run batch workflow execution concurrently on the engine loop.
+    Each workflow is a durable child job keyed by the batch ID, so a batch resumed after
+    a restart reuses the children that already ran instead of starting them again.
+    """
     try:
         # Emit batch start event
-        socketio.emit('batch_execution_started', {
+        realtime.emit('batch_execution_started', {
             'workspace_id': workspace_id,
             'workflow_count': len(workflow_ids),
+            'max_concurrent': max_concurrent,
             'timestamp': datetime.now().isoformat()
-        })
+        }, room=workspace_room(workspace_id))
+        
+        # Queue every workflow in one transaction; queue slots were reserved when the batch was
+        # admitted, and the concurrency group leases at most `max_concurrent` of them at a time
+        group = f"batch:{batch_id or uuid.uuid4().hex}"
+        job_ids = await asyncio.to_thread(engine_service.enqueue_many, [
+            {
+                'kind': 'workflow',
+                'payload': {'workflow_id': workflow_id, 'headless': headless},
+                'priority': priority,
+                'idempotency_key': f"{group}:{workflow_id}",
+                'concurrency_key': group,
+                'concurrency_limit': max(1, max_concurrent)
+            }
+            for workflow_id in workflow_ids
+        ], admitted=True)
+        
+        async def run_one(workflow_id: int, job_id: int):
+            job = await engine_service.wait_for_job(job_id)
+            return workflow_id, bool(job and job.status == 'completed' and job.result)
         
-        # Execute workflows with concurrency limit
-        # For demo purposes, execute sequentially
         completed = 0
         failed = 0
+        tasks = [asyncio.ensure_future(run_one(workflow_id, job_id))
+                 for workflow_id, job_id in zip(workflow_ids, job_ids)]
         
-        for workflow_id in workflow_ids:
-            try:
-                run_workflow_execution(workflow_id, headless)
+        # Stream progress as each workflow finishes
+        for next_done in asyncio.as_completed(tasks):
+            workflow_id, success = await next_done
+            if success:
                 completed += 1
-            except Exception as e:
+            else:
                 failed += 1
-                print(f"Workflow {workflow_id} failed: {e}")
+                print(f"Workflow {workflow_id} failed")
             
             # Emit batch progress
             progress = int(((completed + failed) / len(workflow_ids)) * 100)
-            socketio.emit('batch_execution_progress', {
+            # Only the latest progress matters: replaces an undelivered earlier update
+            realtime.emit('batch_execution_progress', {
                 'workspace_id': workspace_id,
+                'workflow_id': workflow_id,
+                'success': success,
                 'progress': progress,
                 'completed': completed,
                 'failed': failed
-            })
+            }, room=workspace_room(workspace_id), coalesce_key=('batch_progress', workspace_id))
         
         # Update workspace statistics
-        db_manager.update_workspace_execution_stats(workspace_id)
+        await asyncio.to_thread(db_manager.update_workspace_execution_stats, workspace_id)
         
         # Emit batch completion
-        socketio.emit('batch_execution_completed', {
+        realtime.emit('batch_execution_completed', {
             'workspace_id': workspace_id,
             'completed': completed,
             'failed': failed,
             'timestamp': datetime.now().isoformat()
-        })
+        }, room=workspace_room(workspace_id))
         
     except Exception as e:
-        socketio.emit('batch_execution_error', {
+        realtime.emit('batch_execution_error', {
             'workspace_id': workspace_id,
             'error': str(e),
             'timestamp': datetime.now().isoformat()
-        })
+        }, room=workspace_room(workspace_id))
+
+async def handle_workflow_job(job) -> bool:
+    """Durable job handler: run one workflow (a failed run is a result, not a retry)"""
+    return await execute_workflow_async(job.payload['workflow_id'], job.payload.get('headless', True))
+
+async def handle_batch_job(job):
+    """Durable job handler: coordinate a workspace batch"""
+    payload = job.payload
+    await run_batch_execution(
+        payload['workspace_id'],
+        payload['workflow_ids'],
+        payload.get('headless', True),
+        payload.get('max_concurrent', 3),
+        batch_id=job.id,
+        priority=payload.get('priority', 0)
+    )
+
+def build_schedules(workspace_id: int, schedule_settings: Optional[Dict], validate: bool = False) -> Dict:
+    """
+    Schedules defined by a workspace's schedule_settings: the workspace schedule runs the whole
+    workspace as a batch, and optional per-workflow entries under `workflows` run single workflows
+    """
+    settings = schedule_settings or {}
+    schedules = {}
+    
+    schedule = parse_schedule(settings)
+    if schedule:
+        schedules[('workspace', workspace_id)] = schedule
+    for workflow_id, workflow_settings in (settings.get('workflows') or {}).items():
+        schedule = parse_schedule(workflow_settings)
+        if schedule:
+            schedules[('workflow', int(workflow_id))] = schedule
+    
+    if validate:
+        # Catch expressions that can never fire (e.g. Feb 30) before saving them
+        now = time.time()
+        for schedule in schedules.values():
+            schedule.next_fire(now)
+    return schedules
+
+def sync_schedules():
+    """Reload all schedules from the database; unchanged schedules keep their next fire time"""
+    schedules = {}
+    for workspace in db_manager.get_all_workspaces():
+        try:
+            for key, schedule in build_schedules(workspace.id, workspace.schedule_settings).items():
+                schedules[key] = (schedule, None)
+        except ValueError as e:
+            print(f"⚠️ Ignoring invalid schedule of workspace {workspace.id}: {e}")
+    scheduler.sync(schedules)
+
+def enqueue_scheduled_run(key, payload, fire_at: float, delay: float):
+    """Scheduler callback: enqueue a due run, keyed by its fire time so it is enqueued only once"""
+    kind, target_id = key
+    idempotency_key = f"schedule:{kind}:{target_id}:{int(fire_at)}"
+    
+    if kind == 'workspace':
+        workspace = db_manager.get_workspace(target_id)
+        workflows = db_manager.get_workflows_by_workspace(target_id) if workspace else []
+        if not workflows:
+            return
+        engine_service.enqueue(
+            'batch',
+            {
+                'workspace_id': target_id,
+                'workflow_ids': [wf.id for wf in workflows],
+                'headless': True,
+                'max_concurrent': workspace.max_concurrent_workflows or 3
+            },
+            idempotency_key=idempotency_key,
+            cost=len(workflows),
+            delay=delay
+        )
+    else:
+        engine_service.enqueue(
+            'workflow',
+            {'workflow_id': target_id, 'headless': True},
+            idempotency_key=idempotency_key,
+            delay=delay
+        )
+
+# Workspace / workflow schedules (schedule_settings) fire into the durable queue
+def on_workflow_files_changed(scan):
+    """Watcher callback: point synced workflows at the new content of edited files"""
+    changed = [scan.files[name] for name in scan.changed]
+    updated = db_manager.refresh_workflows_from_files(changed)
+    if updated:
+        print(f"🔄 Reloaded {len(updated)} workflows from changed files: {', '.join(scan.changed)}")
+    realtime.emit('workflow_files_changed', {
+        'added': scan.added,
+        'changed': scan.changed,
+        'removed': scan.removed,
+        'updated_workflow_ids': updated,
+        'timestamp': datetime.now().isoformat()
+    })
+
+def scan_workflow_files():
+    """
+    Scan workflows_json/ and apply any changes it found. The manifest is shared by the API and the
+    watcher and each change is reported by exactly one scan, so every caller must go through here.
+    """
+    scan = workflow_files.scan()
+    if scan.has_changes:
+        on_workflow_files_changed(scan)
+    return scan
 
 # WebSocket events
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
+    realtime.connect(request.sid)
     emit('connected', {'message': 'Connected to N8N-style automation server'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    realtime.disconnect(request.sid)
 
 @socketio.on('join_workspace')
 def handle_join_workspace(data):
     workspace_id = data.get('workspace_id')
-    join_room(f"workspace_{workspace_id}")
+    join_room(workspace_room(workspace_id))
+    realtime.join(request.sid, workspace_room(workspace_id))
     print(f"Client joined workspace {workspace_id}")
 
 @socketio.on('leave_workspace')
 def handle_leave_workspace(data):
     workspace_id = data.get('workspace_id')
-    leave_room(f"workspace_{workspace_id}")
+    leave_room(workspace_room(workspace_id))
+    realtime.leave(request.sid, workspace_room(workspace_id))
     print(f"Client left workspace {workspace_id}")
 
 # Static files
@@ -490,9 +1081,8 @@ def create_default_workspace():
             workspace_id = db_manager.create_workspace(default_workspace)
             
             # Sync workflows from directory
-            workflows_dir = Path('workflows_json')
-            if workflows_dir.exists():
-                db_manager.sync_workflows_from_directory(workspace_id, str(workflows_dir))
+            if workflow_files.directory.exists():
+                db_manager.sync_workflow_files(workspace_id, scan_workflow_files().files.values())
                 print(f"✅ Created default workspace and synced workflows")
             
             return workspace_id
@@ -501,7 +1091,94 @@ def create_default_workspace():
         print(f"❌ Error creating default workspace: {e}")
         return 1
 
+def init():
+    """Create the services, open the database and configure logging (called once by the server)"""
+    global db_manager, workflow_manager, plan_cache, job_queue, execution_recorder, event_bus, node_metrics
+    global run_logs, workflow_files, retention_manager, engine_loop, browser_pools, engine_service
+    global worker_processes, process_pool, fleet_registry, local_execution, workflows_watch_interval
+    global workflow_watcher, scheduler
+    
+    db_manager = DatabaseManager()
+    workflow_manager = WorkflowManager(headless=True)
+    plan_cache = PlanCache(store=db_manager)
+    job_queue = JobQueue(db_manager, lease_seconds=float(os.environ.get('ENGINE_LEASE_SECONDS', 300)))
+    execution_recorder = ExecutionRecorder(db_manager)
+    # Node lifecycle events: nodes append to a ring buffer, a dispatcher thread feeds the subscribers
+    event_bus = EventBus()
+    node_metrics = event_bus.subscribe(NodeMetrics())
+    # Per-run output in bounded ring buffers; older lines and evicted runs spill to gzip files
+    run_logs = RunLogManager(
+        os.environ.get('RUN_LOG_DIR', 'run_logs'),
+        capacity=int(os.environ.get('RUN_LOG_CAPACITY', 1000)),
+        max_runs=int(os.environ.get('RUN_LOG_MAX_RUNS', 200)),
+        retain_days=float(os.environ.get('RUN_LOG_RETAIN_DAYS', 7))
+    )
+    install_stdout_capture()
+    # Engine logs: levels and lazy formatting, written in batches by a background sink
+    # (LOG_FORMAT=human|json, LOG_LEVEL, LOG_QUIET=1 for warnings only)
+    configure_logging()
+    # Manifest of workflows_json/: syncs only re-read files whose size, mtime or hash changed
+    workflow_files = DirectoryManifest('workflows_json', store=db_manager)
+    # Execution history retention: node results are archived after N days, rows rolled up after M days;
+    # finished durable jobs are deleted after JOB_RETENTION_DAYS
+    retention_manager = RetentionManager(
+        db_manager,
+        archive_dir=os.environ.get('HISTORY_ARCHIVE_DIR', 'execution_archive'),
+        archive_after_days=int(os.environ.get('HISTORY_ARCHIVE_AFTER_DAYS', 7)),
+        retain_days=int(os.environ.get('HISTORY_RETENTION_DAYS', 90)),
+        job_queue=job_queue,
+        job_retain_days=float(os.environ.get('JOB_RETENTION_DAYS', 7))
+    )
+    
+    # Long-lived asyncio loop shared by all executions (owns the browser pools)
+    engine_loop = EngineLoop()
+    browser_pools = {True: workflow_manager.browser_pool}
+    
+    # Engine service: bounded, durable job queue in front of the engine loop.
+    # The default owner is unique per process (hostname:pid), so leases of a crashed process are recovered
+    # once they expire. Set ENGINE_OWNER_ID (stable across restarts, unique per process) to requeue them
+    # immediately on restart.
+    engine_service = EngineService(
+        engine_loop,
+        max_running=int(os.environ.get('ENGINE_MAX_RUNNING', 5)),
+        max_queue_size=int(os.environ.get('ENGINE_MAX_QUEUE', 100)),
+        job_queue=job_queue,
+        owner=os.environ.get('ENGINE_OWNER_ID')
+    )
+    
+    # Optional coordinator/worker mode: ENGINE_WORKER_PROCESSES > 0 runs workflows in worker processes,
+    # each with its own event loop and browser pool, instead of on the engine loop of this process
+    worker_processes = int(os.environ.get('ENGINE_WORKER_PROCESSES', 0))
+    process_pool = WorkerProcessPool(
+        processes=worker_processes,
+        max_concurrent_per_worker=max(1, -(-engine_service.max_running // worker_processes))
+    ) if worker_processes > 0 else None
+    
+    # Remote workers (main.py --fleet) claim workflow jobs over HTTP; ENGINE_LOCAL_EXECUTION=0 leaves
+    # all workflow jobs to the fleet so nothing runs on the host serving the UI
+    fleet_registry = FleetRegistry(heartbeat_timeout=float(os.environ.get('FLEET_HEARTBEAT_TIMEOUT', 30)))
+    local_execution = os.environ.get('ENGINE_LOCAL_EXECUTION', '1') != '0'
+    
+    event_bus.subscribe(emit_node_event)
+    
+    if local_execution:
+        engine_service.register_handler('workflow', handle_workflow_job)
+    else:
+        engine_service.register_remote_kind('workflow')
+    engine_service.register_handler('batch', handle_batch_job, coordinator=True)
+    
+    # Optional polling watcher for workflows_json/ (WORKFLOWS_WATCH_INTERVAL seconds, 0 = off)
+    workflows_watch_interval = float(os.environ.get('WORKFLOWS_WATCH_INTERVAL', 0))
+    workflow_watcher = DirectoryWatcher(workflow_files, on_workflow_files_changed, workflows_watch_interval)
+    
+    scheduler = Scheduler(
+        on_due=enqueue_scheduled_run,
+        max_jitter=float(os.environ.get('SCHEDULER_MAX_JITTER', 30))
+    )
+
 if __name__ == '__main__':
+    init()
+    
     print("🚀 Starting N8N-Style Web Automation UI...")
     
     # Ensure workflows_json directory exists
@@ -521,4 +1198,35 @@ if __name__ == '__main__':
     templates_dir.mkdir(exist_ok=True)
     static_dir.mkdir(exist_ok=True)
     
-    socketio.run(app, host='0.0.0.0', port=5001, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    # Recover from a previous crash: workflows stuck in 'running' and leases held by this engine
+    interrupted = db_manager.reset_interrupted_workflows()
+    if interrupted:
+        print(f"♻️ Reset {interrupted} interrupted workflows to pending")
+    execution_recorder.start()
+    retention_manager.start()
+    realtime.start()
+    event_bus.start()
+    engine_service.start()
+    if process_pool is not None:
+        process_pool.start()
+    sync_schedules()
+    scheduler.start()
+    if workflows_watch_interval > 0:
+        scan_workflow_files()
+        workflow_watcher.start()
+    
+    try:
+        # No reloader: it would start every background service (dispatcher, scheduler, process pool,
+        # recorder) a second time in the reloader child process
+        socketio.run(app, host='0.0.0.0', port=5001, debug=True, use_reloader=False,
+                     allow_unsafe_werkzeug=True)
+    finally:
+        workflow_watcher.stop()
+        scheduler.stop()
+        engine_loop.stop(shutdown_engine())
+        if process_pool is not None:
+            process_pool.stop()
+        retention_manager.stop()
+        event_bus.stop()
+        execution_recorder.stop()
+        realtime.stop()
@@ -0,0 +1,117 @@
+"""
+Benchmark: DatabaseManager queries per second, per-call connections vs the pooled WAL layer.
+
+Usage (from the worker directory):
+    python -m benchmarks.bench_db [--workflows 200] [--seconds 3]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.models import DatabaseManager, Workspace, Workflow
+
+
+class PerCallDatabaseManager(DatabaseManager):
+    """Baseline: the previous behaviour, a new sqlite3 connection for every call (rollback journal)"""
+
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+def seed(db: DatabaseManager, workflows: int) -> tuple:
+    workspace_id = db.create_workspace(Workspace(name="bench"))
+    content = '{"nodes": [], "connections": []}'
+    return [
+        db.create_workflow(Workflow(workspace_id=workspace_id, name=f"wf_{i}", json_content=content))
+        for i in range(workflows)
+    ], workspace_id
+
+
+def timed(label: str, count: int, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {count / elapsed:>10.0f} q/s")
+    return count / elapsed
+
+
+def run_mixed(db: DatabaseManager, workflow_ids: list, workspace_id: int, seconds: float, readers: int):
+    """One writer updating statuses while reader threads serve list endpoints"""
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            try:
+                db.update_workflow_status(workflow_ids[i % len(workflow_ids)], 'running', 1.0)
+                with lock:
+                    counts['writes'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts['errors'] += 1
+            i += 1
+
+    def reader():
+        while not stop.is_set():
+            try:
+                db.get_workflows_by_workspace(workspace_id)
+                with lock:
+                    counts['reads'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts['errors'] += 1
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"  {'mixed: list reads (' + str(readers) + ' threads)':<34} {counts['reads'] / seconds:>10.0f} q/s")
+    print(f"  {'mixed: status writes (1 thread)':<34} {counts['writes'] / seconds:>10.0f} q/s")
+    print(f"  {'mixed: errors':<34} {counts['errors']:>10d}")
+
+
+def bench(label: str, factory, args):
+    print(f"\n{label}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = factory(os.path.join(tmp, "bench.db"))
+        workflow_ids, workspace_id = seed(db, args.workflows)
+        n = args.iterations
+
+        timed("get_workflow", n, lambda: [db.get_workflow(workflow_ids[i % len(workflow_ids)]) for i in range(n)])
+        timed("update_workflow_status", n, lambda: [
+            db.update_workflow_status(workflow_ids[i % len(workflow_ids)], 'completed', 0.5) for i in range(n)
+        ])
+        timed("get_workflows_by_workspace", n // 10,
+              lambda: [db.get_workflows_by_workspace(workspace_id) for _ in range(n // 10)])
+        run_mixed(db, workflow_ids, workspace_id, args.seconds, args.readers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite access layer benchmark")
+    parser.add_argument('--workflows', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    bench("Before: connection per call", PerCallDatabaseManager, args)
+    bench("After: pooled connections (WAL, synchronous=NORMAL)", DatabaseManager, args)
+
+
+if __name__ == '__main__':
+    main()
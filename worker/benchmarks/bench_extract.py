@@ -0,0 +1,83 @@
+"""
+Benchmark: `extractMultiple` per-item extraction vs single-round-trip bulk extraction.
+
+Generates a local product list page with `--rows` items (set with page.set_content, no server),
+then extracts 3 fields per item with:
+  per-item - one Playwright call per item x command (the previous implementation)
+  bulk     - one evaluate over all items
+  chunked  - bulk extraction in chunks of `--chunk-size` items
+
+Requires Playwright with Chromium installed (`playwright install chromium`).
+
+Usage (from the worker directory):
+    python -m benchmarks.bench_extract [--rows 500] [--chunk-size 100] [--repeat 3]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from playwright.async_api import async_playwright
+
+from strategies.bulk_extract import compile_extract_commands, extract_per_item, extract_rows
+
+COMMANDS = (
+    'EXTRACT_TEXT:.name>name',
+    'EXTRACT_TEXT:.price>price',
+    'EXTRACT_ATTR:a@href>link',
+)
+
+
+def build_page(rows: int) -> str:
+    items = ''.join(
+        f'<li class="product"><a href="/p/{i}"><span class="name">Product {i}</span></a>'
+        f'<span class="price">{i * 1.5:.2f}</span></li>'
+        for i in range(rows)
+    )
+    return f'<html><body><ul id="products">{items}</ul></body></html>'
+
+
+async def measure(label: str, extract, repeat: int, rows: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await extract()
+        best = min(best, time.perf_counter() - start)
+    assert len(result) == rows, f"{label}: expected {rows} rows, got {len(result)}"
+    print(f"  {label:<22} {best * 1000:>9.1f} ms  ({rows / best:,.0f} rows/s)")
+    return best
+
+
+async def main_async(args):
+    commands = compile_extract_commands(COMMANDS)
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.set_content(build_page(args.rows))
+        locator = page.locator('#products .product')
+
+        print(f"{args.rows} items x {len(commands)} fields, best of {args.repeat}")
+        per_item = await measure('per-item', lambda: extract_per_item(locator, commands), args.repeat, args.rows)
+        bulk = await measure('bulk', lambda: extract_rows(locator, commands, 0), args.repeat, args.rows)
+        chunked = await measure(f'chunked ({args.chunk_size}/call)',
+                                lambda: extract_rows(locator, commands, args.chunk_size), args.repeat, args.rows)
+        print(f"  bulk speedup: {per_item / bulk:.1f}x, chunked speedup: {per_item / chunked:.1f}x")
+
+        if await extract_per_item(locator, commands) != await extract_rows(locator, commands, args.chunk_size):
+            print("  WARNING: bulk results differ from per-item results")
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--chunk-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: engine throughput (nodes/s) with different logging configurations.
+
+Runs many concurrent workflow runs of no-op `wait` nodes on one event loop and compares:
+  off    - logging disabled
+  quiet  - async sink, warnings only (production mode)
+  sync   - a plain StreamHandler writing and flushing every record (what per-line print did)
+  human  - async sink, human-readable format
+  json   - async sink, JSON lines
+
+`--write-latency` adds a delay to every write call on the log stream, to model a slow
+console or a log shipper applying backpressure (where synchronous writes stall the engine).
+
+Usage (from the worker directory):
+    python -m benchmarks.bench_logging [--runs 200] [--nodes 50] [--output /tmp/bench.log]
+                                       [--write-latency 0.0001]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.log import HumanFormatter, configure_logging, shutdown_logging
+from core.workflow import Workflow
+
+
+def build_workflow(nodes: int) -> Workflow:
+    steps = [{'id': 'start', 'type': 'start'}]
+    steps += [{'id': f'wait_{i}', 'type': 'wait', 'params': {'timeout': 0}} for i in range(nodes)]
+    steps.append({'id': 'stop', 'type': 'stop'})
+    connections = [
+        {'fromNode': a['id'], 'toNode': b['id']} for a, b in zip(steps, steps[1:])
+    ]
+    return Workflow('bench', {'nodes': steps, 'connections': connections})
+
+
+async def run_all(workflow: Workflow, runs: int) -> int:
+    async def one():
+        results = {}
+        await workflow.executor.run(None, {}, None, results)
+        return len(results)
+
+    return sum(await asyncio.gather(*(one() for _ in range(runs))))
+
+
+class SlowStream:
+    """Stream wrapper that sleeps `latency` seconds on every write"""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text: str):
+        time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def measure(mode: str, workflow: Workflow, runs: int, output: str, write_latency: float) -> float:
+    target = open(output, 'a', encoding='utf-8') if output != '-' else sys.stdout
+    stream = SlowStream(target, write_latency) if write_latency else target
+    root = logging.getLogger()
+    handler = sink = None
+    try:
+        if mode == 'off':
+            logging.disable(logging.CRITICAL)
+        elif mode == 'sync':
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(HumanFormatter())
+            root.addHandler(handler)
+            root.setLevel(logging.INFO)
+        else:
+            sink = configure_logging(fmt='json' if mode == 'json' else 'human', quiet=(mode == 'quiet'),
+                                     stream=stream, run_log_level='WARNING' if mode == 'quiet' else None)
+
+        start = time.perf_counter()
+        executed = asyncio.run(run_all(workflow, runs))
+        elapsed = time.perf_counter() - start
+    finally:
+        logging.disable(logging.NOTSET)
+        if handler is not None:
+            root.removeHandler(handler)
+        shutdown_logging()  # Drains the async sink, not counted in the elapsed time
+        if target is not sys.stdout:
+            target.close()
+
+    extra = ''
+    if sink is not None:
+        stats = sink.get_stats()
+        extra = f"  (written {stats['written']} in {stats['batches']} batches, dropped {stats['dropped']})"
+    print(f"  {mode:<6} {executed / elapsed:>12,.0f} nodes/s{extra}", file=sys.stderr)
+    return executed / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--nodes', type=int, default=50)
+    parser.add_argument('--output', default=None, help="log destination ('-' for stdout, default: temp file)")
+    parser.add_argument('--modes', nargs='+', default=['off', 'quiet', 'sync', 'human', 'json'])
+    parser.add_argument('--write-latency', type=float, default=0.0, help="seconds added to every write")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(tempfile.mkdtemp(prefix='bench_logging_'), 'engine.log')
+    workflow = build_workflow(args.nodes)
+    print(f"{args.runs} concurrent runs x {args.nodes + 2} nodes, logs -> {output} "
+          f"(write latency {args.write_latency * 1e6:.0f}µs)", file=sys.stderr)
+    results = {mode: measure(mode, workflow, args.runs, output, args.write_latency) for mode in args.modes}
+    if 'sync' in results:
+        for mode in ('quiet', 'human', 'json'):
+            if mode in results:
+                print(f"  {mode} vs sync: {results[mode] / results['sync']:.2f}x", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from playwright.async_api import async_playwright
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledBrowser:
+    """Một tiến trình Chromium dùng chung và bộ đếm vòng đời của nó."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.active_contexts = 0
+        self.contexts_served = 0
+        self.retiring = False
+
+    def is_usable(self) -> bool:
+        return not self.retiring and self.browser.is_connected()
+
+
+class BrowserLease:
+    """
+    Một lượt thuê BrowserContext cô lập từ BrowserPool.
+    Context bị đóng khi trả lại, nên cookie/storage không rò rỉ giữa các lần chạy.
+    """
+
+    def __init__(self, pooled: _PooledBrowser, context, page):
+        self._pooled = pooled
+        self.context = context
+        self.page = page
+
+    def __repr__(self):
+        return f"BrowserLease(pages={len(self.context.pages)})"
+
+
+class BrowserPool:
+    """
+    Pool Chromium sống lâu dài, thuộc sở hữu của WorkflowManager.
+    Mỗi lần chạy workflow thuê một BrowserContext riêng thay vì khởi động browser mới;
+    browser được tái chế sau `contexts_per_browser` context để tránh rò rỉ bộ nhớ.
+    """
+
+    def __init__(self, headless: bool = True, max_browsers: int = 2,
+                 contexts_per_browser: int = 100, max_active_contexts: int = 10,
+                 launch_args: Optional[List[str]] = None):
+        self.headless = headless
+        self.max_browsers = max_browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.max_active_contexts = max_active_contexts
+        self.launch_args = launch_args or ['--no-sandbox', '--disable-setuid-sandbox']
+
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+        # Thống kê
+        self.hits = 0
+        self.misses = 0
+        self.launches = 0
+        self.recycled = 0
+        self.total_launch_time = 0.0
+        self.max_launch_time = 0.0
+
+    async def _launch(self) -> _PooledBrowser:
+        """Khởi động một browser mới và ghi lại độ trễ khởi động."""
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        start_time = time.perf_counter()
+        browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=self.launch_args
+        )
+        launch_time = time.perf_counter() - start_time
+
+        self.launches += 1
+        self.total_launch_time += launch_time
+        self.max_launch_time = max(self.max_launch_time, launch_time)
+
+        pooled = _PooledBrowser(browser)
+        self._browsers.append(pooled)
+        usable = sum(1 for b in self._browsers if b.is_usable())
+        logger.info("🌐 BrowserPool: khởi động browser mới trong %.2fs (%s/%s)",
+                    launch_time, usable, self.max_browsers)
+        return pooled
+
+    async def _pick_browser(self) -> _PooledBrowser:
+        """Chọn browser ít tải nhất, khởi động thêm nếu tất cả đã đầy."""
+        async with self._lock:
+            # Loại bỏ các browser đã crash/mất kết nối
+            self._browsers = [b for b in self._browsers if b.browser.is_connected()]
+
+            candidates = [b for b in self._browsers if b.is_usable()]
+            available = [b for b in candidates if b.active_contexts < self.max_active_contexts]
+
+            if available:
+                self.hits += 1
+                pooled = min(available, key=lambda b: b.active_contexts)
+            elif candidates and len(candidates) >= self.max_browsers:
+                # Đã đạt giới hạn browser (không tính browser đang tái chế): chia sẻ browser ít tải nhất
+                self.hits += 1
+                pooled = min(candidates, key=lambda b: b.active_contexts)
+            else:
+                self.misses += 1
+                pooled = await self._launch()
+
+            pooled.active_contexts += 1
+            pooled.contexts_served += 1
+            if pooled.contexts_served >= self.contexts_per_browser:
+                pooled.retiring = True
+            return pooled
+
+    async def acquire(self, proxy_settings: dict = None, user_agent: str = None) -> BrowserLease:
+        """Thuê một BrowserContext (kèm một page) cô lập từ pool."""
+        if self._closed:
+            raise RuntimeError("BrowserPool đã bị đóng.")
+
+        pooled = await self._pick_browser()
+        try:
+            context_options = {}
+            if proxy_settings:
+                context_options['proxy'] = proxy_settings
+            if user_agent:
+                context_options['user_agent'] = user_agent
+
+            context = await pooled.browser.new_context(**context_options)
+            page = await context.new_page()
+        except Exception:
+            await self._return_browser(pooled)
+            raise
+
+        return BrowserLease(pooled, context, page)
+
+    async def release(self, lease: BrowserLease):
+        """Trả context về pool: đóng context và tái chế browser nếu cần."""
+        try:
+            await lease.context.close()
+        except Exception as e:
+            logger.warning("⚠️ BrowserPool: lỗi khi đóng context: %s", e)
+        finally:
+            await self._return_browser(lease._pooled)
+
+    async def _return_browser(self, pooled: _PooledBrowser):
+        async with self._lock:
+            pooled.active_contexts -= 1
+            if pooled.retiring and pooled.active_contexts <= 0:
+                if pooled in self._browsers:
+                    self._browsers.remove(pooled)
+                self.recycled += 1
+                try:
+                    await pooled.browser.close()
+                except Exception as e:
+                    logger.warning("⚠️ BrowserPool: lỗi khi đóng browser: %s", e)
+
+    @asynccontextmanager
+    async def lease(self, proxy_settings: dict = None, user_agent: str = None):
+        """Context manager tiện lợi: `async with pool.lease() as lease: ...`."""
+        lease = await self.acquire(proxy_settings, user_agent)
+        try:
+            yield lease
+        finally:
+            await self.release(lease)
+
+    async def close(self):
+        """Đóng tất cả browser và dừng Playwright."""
+        self._closed = True
+        async with self._lock:
+            for pooled in self._browsers:
+                try:
+                    await pooled.browser.close()
+                except Exception:
+                    pass
+            self._browsers.clear()
+
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    def get_stats(self) -> Dict:
+        """Thống kê hit/miss và độ trễ khởi động của pool."""
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'launches': self.launches,
+            'recycled': self.recycled,
+            'open_browsers': len(self._browsers),
+            'active_contexts': sum(b.active_contexts for b in self._browsers),
+            'avg_launch_time': self.total_launch_time / self.launches if self.launches else 0.0,
+            'max_launch_time': self.max_launch_time,
+            'total_launch_time': self.total_launch_time
+        }
+
+    def __repr__(self):
+        return (f"BrowserPool(browsers={len(self._browsers)}/{self.max_browsers}, "
+                f"hits={self.hits}, misses={self.misses})")
@@ -0,0 +1,204 @@
+import re
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+_MONTH_NAMES = {name: index for index, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+_DAY_NAMES = {name: index for index, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}
+
+_MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+_INTERVAL_PATTERN = re.compile(r'^(?:@every\s+|every\s+)?(\d+)\s*(s|m|h|d)$', re.IGNORECASE)
+_INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Giới hạn số bước tìm kiếm (tránh lặp vô hạn với biểu thức không bao giờ khớp, ví dụ 30/2)
+_MAX_SEARCH_STEPS = 10000
+
+
+def _parse_field(text: str, low: int, high: int, names: Dict[str, int] = None) -> Tuple[int, ...]:
+    """Parse một trường cron (`*`, `*/n`, `a-b`, `a-b/n`, danh sách `a,b`) thành tuple đã sắp xếp."""
+    values = set()
+    for part in text.lower().split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Bước không hợp lệ: {text}")
+
+        if part == '*':
+            start, end = low, high
+        else:
+            bounds = part.split('-', 1)
+            start = _parse_value(bounds[0], names)
+            end = _parse_value(bounds[1], names) if len(bounds) == 2 else start
+            if step > 1 and len(bounds) == 1:
+                end = high  # `a/n` nghĩa là từ a đến hết khoảng
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Giá trị ngoài khoảng [{low}-{high}]: {text}")
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+def _parse_value(text: str, names: Dict[str, int] = None) -> int:
+    if names and text in names:
+        return names[text]
+    if not text.isdigit():
+        raise ValueError(f"Giá trị cron không hợp lệ: {text}")
+    return int(text)
+
+
+class CronExpression:
+    """
+    Biểu thức cron 5 trường: phút, giờ, ngày trong tháng, tháng, ngày trong tuần.
+    Hỗ trợ `*`, `*/n`, khoảng, danh sách, tên tháng/thứ và các macro `@hourly`, `@daily`...
+    Khi cả ngày trong tháng và ngày trong tuần đều bị giới hạn, khớp một trong hai (như Vixie cron).
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = _MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Biểu thức cron phải có 5 trường: '{expression}'")
+
+        minute, hour, day, month, weekday = fields
+        self.minutes = _parse_field(minute, 0, 59)
+        self.hours = _parse_field(hour, 0, 23)
+        self.days = _parse_field(day, 1, 31)
+        self.months = _parse_field(month, 1, 12, _MONTH_NAMES)
+        # 7 cũng là Chủ nhật
+        self.weekdays = tuple(sorted({value % 7 for value in _parse_field(weekday, 0, 7, _DAY_NAMES)}))
+        self._day_restricted = day != '*'
+        self._weekday_restricted = weekday != '*'
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        if self._day_restricted:
+            return day_ok
+        if self._weekday_restricted:
+            return weekday_ok
+        return True
+
+    def next_after(self, dt: datetime) -> datetime:
+        """Thời điểm khớp đầu tiên sau `dt` (độ phân giải phút), nhảy theo từng trường thay vì từng phút."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(_MAX_SEARCH_STEPS):
+            if t.month not in self.months:
+                index = bisect_left(self.months, t.month)
+                if index < len(self.months):
+                    t = t.replace(month=self.months[index], day=1, hour=0, minute=0)
+                else:
+                    t = t.replace(year=t.year + 1, month=self.months[0], day=1, hour=0, minute=0)
+                continue
+
+            if not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+
+            if t.hour not in self.hours:
+                index = bisect_left(self.hours, t.hour)
+                if index < len(self.hours):
+                    t = t.replace(hour=self.hours[index], minute=0)
+                else:
+                    t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+
+            if t.minute not in self.minutes:
+                index = bisect_left(self.minutes, t.minute)
+                if index < len(self.minutes):
+                    t = t.replace(minute=self.minutes[index])
+                else:
+                    t = (t + timedelta(hours=1)).replace(minute=0)
+                continue
+
+            return t
+        raise ValueError(f"Biểu thức cron không bao giờ khớp: '{self.expression}'")
+
+    def __repr__(self):
+        return f"CronExpression('{self.expression}')"
+
+
+@lru_cache(maxsize=4096)
+def parse_cron(expression: str) -> CronExpression:
+    """Parse biểu thức cron (có cache: nhiều lịch thường dùng chung một biểu thức)."""
+    return CronExpression(expression)
+
+
+class CronSchedule:
+    """Lịch theo biểu thức cron, tính theo múi giờ `tz` (mặc định giờ địa phương)."""
+
+    def __init__(self, expression: str, tz: str = None):
+        self.cron = parse_cron(expression.strip())
+        self.tz = None
+        if tz:
+            if ZoneInfo is None:
+                raise ValueError("Cần Python 3.9+ (zoneinfo) để dùng múi giờ")
+            self.tz = ZoneInfo(tz)
+
+    def next_fire(self, after: float) -> float:
+        """Timestamp lần chạy kế tiếp sau timestamp `after`."""
+        if self.tz is not None:
+            dt = datetime.fromtimestamp(after, self.tz)
+        else:
+            dt = datetime.fromtimestamp(after)
+        return self.cron.next_after(dt).timestamp()
+
+    def __repr__(self):
+        tz = f", tz={self.tz.key}" if self.tz is not None else ""
+        return f"CronSchedule('{self.cron.expression}'{tz})"
+
+
+class IntervalSchedule:
+    """Lịch lặp lại sau mỗi `seconds` giây."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Khoảng thời gian phải lớn hơn 0")
+        self.seconds = seconds
+
+    def next_fire(self, after: float) -> float:
+        return after + self.seconds
+
+    def __repr__(self):
+        return f"IntervalSchedule({self.seconds}s)"
+
+
+def parse_schedule(settings: Optional[Dict]):
+    """
+    Dựng lịch từ `schedule_settings` (dạng của UI: `{enabled, cron_expression}`).
+    `cron_expression` có thể là biểu thức cron, macro (`@daily`) hoặc khoảng (`@every 5m`, `every 30s`);
+    cũng chấp nhận `interval_seconds` và `timezone`. Trả về None nếu lịch bị tắt hoặc trống.
+    """
+    if not settings or not settings.get('enabled'):
+        return None
+
+    if settings.get('interval_seconds'):
+        return IntervalSchedule(float(settings['interval_seconds']))
+
+    expression = (settings.get('cron_expression') or '').strip()
+    if not expression:
+        return None
+
+    match = _INTERVAL_PATTERN.match(expression)
+    if match:
+        return IntervalSchedule(int(match.group(1)) * _INTERVAL_UNITS[match.group(2).lower()])
+    return CronSchedule(expression, settings.get('timezone'))
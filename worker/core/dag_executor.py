@@ -0,0 +1,139 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+
+def build_successor_table(nodes: Dict, start_node_id: str) -> Tuple[Dict[str, Tuple[str, ...]], Dict[str, int]]:
+    """
+    Phân tích đồ thị một lần: bảng node kế tiếp và số input của các node đạt tới được từ Start Node.
+    Stop node kết thúc nhánh nên các cạnh đi ra từ nó bị bỏ qua: không được tính vào số input
+    của node đích (nếu không, node hợp nhánh sau nó sẽ chờ mãi). Ném ValueError nếu đồ thị chứa chu trình.
+    """
+    successors: Dict[str, Tuple[str, ...]] = {}
+    stack = [start_node_id]
+    while stack:
+        node_id = stack.pop()
+        if node_id in successors or node_id not in nodes:
+            continue
+        node = nodes[node_id]
+        if node.type == 'stop':
+            successors[node_id] = ()
+            continue
+        targets = tuple(t for t in node.get_successor_ids() if t in nodes)
+        successors[node_id] = targets
+        stack.extend(targets)
+
+    in_degree = {node_id: 0 for node_id in successors}
+    for targets in successors.values():
+        for target_id in targets:
+            in_degree[target_id] += 1
+
+    # Kiểm tra đồ thị không có chu trình (thuật toán Kahn)
+    remaining = dict(in_degree)
+    queue = [node_id for node_id, degree in remaining.items() if degree == 0]
+    visited = 0
+    while queue:
+        node_id = queue.pop()
+        visited += 1
+        for target_id in successors[node_id]:
+            remaining[target_id] -= 1
+            if remaining[target_id] == 0:
+                queue.append(target_id)
+
+    if visited != len(remaining):
+        cyclic = sorted(node_id for node_id, degree in remaining.items() if degree > 0)
+        raise ValueError(f"Workflow chứa vòng lặp giữa các node: {cyclic}")
+
+    return successors, in_degree
+
+
+class DagExecutor:
+    """
+    Bộ lập lịch DAG cho đồ thị workflow.
+    Giữ tất cả các cạnh, chạy các nhánh độc lập đồng thời trên các page riêng
+    trong cùng một BrowserContext; node hợp nhánh (join) chờ đủ tất cả input.
+    """
+
+    def __init__(self, nodes: Dict, start_node_id: str, max_branches: int = 4,
+                 successors: Dict[str, Tuple[str, ...]] = None, in_degree: Dict[str, int] = None):
+        self.nodes = nodes
+        self.start_node_id = start_node_id
+        self.max_branches = max(1, max_branches)
+
+        # Dùng bảng đã biên dịch sẵn (ExecutionPlan) nếu có, nếu không thì phân tích đồ thị
+        if successors is None or in_degree is None:
+            successors, in_degree = build_successor_table(nodes, start_node_id)
+        self.successors = successors
+        self.in_degree = in_degree
+
+    @property
+    def reachable(self):
+        return self.successors.keys()
+
+    async def run(self, page, context: dict, new_page: Callable[[], Awaitable] = None,
+                  results: Dict = None, on_result: Callable = None,
+                  publish: Callable = None) -> List[str]:
+        """
+        Thực thi DAG bắt đầu từ Start Node.
+        :param page: Page chính của lần chạy.
+        :param context: Context chung giữa các node.
+        :param new_page: Hàm tạo page mới trong cùng BrowserContext cho các nhánh song song.
+        :param results: Dict nhận NodeResult của từng node (thuộc về WorkflowRun).
+        :param on_result: Callback nhận NodeResult ngay khi mỗi node kết thúc (kể cả khi thất bại).
+        :param publish: Hàm phát sự kiện vòng đời node (xem core.event_bus), truyền cho Node.execute.
+        :return: Danh sách ID các node đã thực thi theo thứ tự hoàn thành.
+        """
+        remaining_inputs = dict(self.in_degree)
+        semaphore = asyncio.Semaphore(self.max_branches)
+        executed: List[str] = []
+
+        async def run_node(node_id: str, node_page):
+            node = self.nodes[node_id]
+            async with semaphore:
+                try:
+                    await node.execute(node_page, context, results, publish)
+                finally:
+                    if on_result is not None and results is not None and node_id in results:
+                        on_result(results[node_id])
+            executed.append(node_id)
+
+            # Stop node không có node kế tiếp trong bảng: nhánh hiện tại kết thúc
+            ready = []
+            for target_id in self.successors[node_id]:
+                remaining_inputs[target_id] -= 1
+                if remaining_inputs[target_id] == 0:
+                    ready.append(target_id)
+            return node_page, ready
+
+        async def spawn_ready(node_page, ready: List[str]) -> List[asyncio.Task]:
+            spawned = []
+            for index, target_id in enumerate(ready):
+                # Nhánh đầu tiên tiếp tục trên page hiện tại, các nhánh khác mở page mới
+                if index == 0 or new_page is None:
+                    branch_page = node_page
+                else:
+                    branch_page = await new_page()
+                spawned.append(asyncio.ensure_future(run_node(target_id, branch_page)))
+
+            # Nhánh kết thúc (hoặc chờ join ở nhánh khác): đóng page phụ
+            if not ready and node_page is not page:
+                await node_page.close()
+            return spawned
+
+        tasks = {asyncio.ensure_future(run_node(self.start_node_id, page))}
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node_page, ready = task.result()
+                    tasks.update(await spawn_ready(node_page, ready))
+        except BaseException:
+            # Một nhánh thất bại: hủy tất cả các nhánh còn lại
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return executed
+
+    def __repr__(self):
+        return f"DagExecutor(nodes={len(self.reachable)}, max_branches={self.max_branches})"
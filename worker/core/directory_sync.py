@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkflowFile:
+    """Trạng thái một file workflow JSON trong manifest."""
+    name: str
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    node_count: int
+    content: Optional[str] = field(default=None, repr=False)  # Chỉ có khi file vừa được đọc lại
+
+    def read_content(self) -> str:
+        """Nội dung file (đọc lại từ đĩa nếu lần quét này không đọc)."""
+        if self.content is None:
+            self.content = Path(self.path).read_text(encoding='utf-8')
+        return self.content
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.pop('content')
+        return data
+
+
+@dataclass
+class ManifestScan:
+    """Kết quả một lần quét thư mục."""
+    files: Dict[str, WorkflowFile]
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    errors: List[str]
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+class DirectoryManifest:
+    """
+    Manifest (đường dẫn, kích thước, mtime, hash nội dung) của các file `*.json` trong một thư mục.
+    Mỗi lần quét chỉ `stat` các file; file chỉ được đọc, hash và parse lại khi kích thước hoặc
+    mtime thay đổi, và chỉ được coi là thay đổi khi hash nội dung khác.
+
+    `store` (tùy chọn) lưu manifest bền vững, cần có `load_file_manifest(directory)` và
+    `save_file_manifest(directory, files, removed)` (ví dụ DatabaseManager).
+    """
+
+    def __init__(self, directory, store=None):
+        self.directory = Path(directory)
+        self.store = store
+        self._lock = threading.Lock()
+        self._files: Optional[Dict[str, WorkflowFile]] = None
+
+        # Thống kê
+        self.scans = 0
+        self.files_read = 0
+
+    def _load(self) -> Dict[str, WorkflowFile]:
+        if self._files is None:
+            self._files = {}
+            if self.store is not None:
+                for entry in self.store.load_file_manifest(str(self.directory)):
+                    self._files[entry['name']] = WorkflowFile(**entry)
+        return self._files
+
+    def scan(self) -> ManifestScan:
+        """Quét thư mục, cập nhật manifest và trả về các file đã thêm, thay đổi hoặc bị xóa."""
+        with self._lock:
+            previous = self._load()
+            current: Dict[str, WorkflowFile] = {}
+            added, changed, errors = [], [], []
+
+            paths = sorted(self.directory.glob("*.json")) if self.directory.exists() else []
+            for path in paths:
+                name = path.stem
+                try:
+                    stat = path.stat()
+                    known = previous.get(name)
+                    if (known is not None and known.path == str(path) and known.size == stat.st_size
+                            and known.mtime_ns == stat.st_mtime_ns):
+                        current[name] = known
+                        continue
+
+                    content = path.read_text(encoding='utf-8')
+                    self.files_read += 1
+                    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+                    if known is not None and known.content_hash == content_hash:
+                        # Chỉ mtime thay đổi (ví dụ `touch`): không cần parse lại
+                        node_count = known.node_count
+                    else:
+                        node_count = len(json.loads(content).get('nodes', []))
+
+                    current[name] = WorkflowFile(name, str(path), stat.st_size, stat.st_mtime_ns,
+                                                 content_hash, node_count, content)
+                    if known is None:
+                        added.append(name)
+                    elif known.content_hash != content_hash:
+                        changed.append(name)
+                except Exception as e:
+                    errors.append(f"{path.name}: {e}")
+                    # Giữ phiên bản hợp lệ trước đó (ví dụ file đang được ghi dở)
+                    if name in previous:
+                        current[name] = previous[name]
+
+            removed = [name for name in previous if name not in current]
+            touched = [entry for name, entry in current.items() if previous.get(name) is not entry]
+            if self.store is not None and (touched or removed):
+                self.store.save_file_manifest(
+                    str(self.directory), [entry.to_dict() for entry in touched], removed
+                )
+
+            self._files = current
+            self.scans += 1
+            return ManifestScan(dict(current), added, changed, removed, errors)
+
+    def get_stats(self) -> Dict:
+        return {
+            'directory': str(self.directory),
+            'files': len(self._files or {}),
+            'scans': self.scans,
+            'files_read': self.files_read
+        }
+
+
+class DirectoryWatcher:
+    """
+    Thread nền quét lại manifest mỗi `interval` giây (chỉ `stat`, rất rẻ) và gọi
+    `on_change(scan)` khi có file được thêm, thay đổi hoặc bị xóa.
+    """
+
+    def __init__(self, manifest: DirectoryManifest, on_change: Callable[[ManifestScan], None],
+                 interval: float = 2.0):
+        self.manifest = manifest
+        self.on_change = on_change
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                scan = self.manifest.scan()
+                if scan.has_changes:
+                    self.on_change(scan)
+            except Exception as e:
+                logger.warning("⚠️ DirectoryWatcher: lỗi khi quét %s: %s", self.manifest.directory, e)
+
+    def start(self):
+        """Khởi động thread theo dõi (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="directory-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
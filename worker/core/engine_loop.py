@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EngineLoop:
+    """
+    Event loop asyncio sống lâu dài chạy trên một thread riêng.
+    Các thread đồng bộ (ví dụ request handler của Flask) gửi coroutine vào loop
+    thay vì tạo loop mới bằng `asyncio.run` cho mỗi lần chạy, nhờ đó tài nguyên
+    gắn với loop (browser pool, semaphore) được dùng chung.
+    """
+
+    def __init__(self, name: str = "engine-loop"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Khởi động thread chứa event loop (idempotent)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run_loop, name=self.name, daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        # Báo hiệu sau khi loop thực sự bắt đầu chạy
+        self.loop.call_soon(self._started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive() and self.loop and self.loop.is_running())
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Gửi coroutine vào loop từ bất kỳ thread nào; trả về concurrent.futures.Future."""
+        if not self.is_running:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: float = None):
+        """Gửi coroutine và chờ kết quả (chặn thread gọi)."""
+        return self.submit(coro).result(timeout)
+
+    def stop(self, shutdown_coro: Coroutine = None, timeout: float = 10):
+        """Chạy coroutine dọn dẹp (nếu có) rồi dừng loop."""
+        if not self.is_running:
+            return
+        if shutdown_coro is not None:
+            try:
+                self.run(shutdown_coro, timeout)
+            except Exception as e:
+                logger.warning("⚠️ EngineLoop: lỗi khi dọn dẹp: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+    def __repr__(self):
+        return f"EngineLoop(name={self.name}, running={self.is_running})"
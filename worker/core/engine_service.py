@@ -0,0 +1,408 @@
+import asyncio
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, List, Optional
+from database.job_queue import QueueCapacityError
+from .engine_loop import EngineLoop
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Hàng đợi job đã đầy; `retry_after` là số giây gợi ý trước khi thử lại."""
+
+    def __init__(self, retry_after: int, message: str = "Hàng đợi job đã đầy"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Job:
+    """Một job chờ thực thi trên engine loop."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, factory: Callable[[], Awaitable], name: str, counted: bool = True,
+                 queued_for: float = 0.0):
+        self.id = next(self._ids)
+        self.name = name
+        self.factory = factory
+        self.counted = counted  # False với job bền vững: chỗ trong hàng đợi được tính trong SQLite
+        # `queued_for`: thời gian job đã chờ trước đó (job bền vững chờ trong SQLite trước khi được thuê)
+        self.enqueued_at = time.monotonic() - queued_for
+        self.started_at = None
+        self.future: Optional[asyncio.Future] = None
+
+    def __repr__(self):
+        return f"Job(id={self.id}, name={self.name})"
+
+
+class EngineService:
+    """
+    Dịch vụ thực thi dùng một EngineLoop duy nhất và hàng đợi job có giới hạn.
+    Số job đang chạy bị giới hạn bởi `max_running` worker; số job được nhận nhưng chưa chạy
+    bị giới hạn bởi `max_queue_size`, vượt quá thì ném QueueFullError (API trả về HTTP 429).
+
+    Nếu có `job_queue` (JobQueue trên SQLite), job đưa vào bằng `enqueue` được lưu bền vững:
+    dispatcher thuê (lease) job theo độ ưu tiên khi còn worker rảnh, gia hạn lease trong lúc chạy
+    và khi khởi động lại thì các lease còn treo của `owner` được đưa lại vào hàng đợi (chỉ có tác dụng
+    khi `owner` được cấu hình cố định; owner mặc định chứa PID nên lease cũ được thu hồi khi hết hạn).
+    """
+
+    def __init__(self, engine_loop: EngineLoop, max_running: int = 5, max_queue_size: int = 100,
+                 job_queue=None, owner: str = None, poll_interval: float = 1.0):
+        self.engine_loop = engine_loop
+        self.max_running = max_running
+        self.max_queue_size = max_queue_size
+
+        # Hàng đợi bền vững (tùy chọn)
+        self.job_queue = job_queue
+        # Mặc định duy nhất cho mỗi tiến trình: hai tiến trình cùng máy không bao giờ thu hồi lease
+        # của nhau; lease của tiến trình đã chết được thu hồi khi hết hạn
+        self.owner = owner or f"engine@{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, Callable] = {}
+        self._coordinator_kinds = set()
+        self._remote_kinds = set()
+        self._last_sweep = 0.0
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._coordinators = set()
+        self._job_waiters: Dict[int, List[asyncio.Future]] = {}
+
+        self._lock = threading.Lock()
+        self._pending = 0  # Đã nhận (admitted) nhưng chưa bắt đầu chạy
+        self._running = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+        # Thống kê
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.total_run_time = 0.0
+
+    def start(self):
+        """Khởi động engine loop và các worker tiêu thụ hàng đợi."""
+        if self.job_queue is not None:
+            recovered = self.job_queue.requeue_stale_leases(self.owner)
+            if recovered:
+                logger.info("♻️ Đã đưa lại %s job bị gián đoạn vào hàng đợi", recovered)
+        self.engine_loop.start()
+        if not self._workers:
+            self.engine_loop.run(self._start_workers())
+
+    async def _start_workers(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.ensure_future(self._worker(index))
+            for index in range(self.max_running)
+        ]
+        if self.job_queue is not None:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.ensure_future(self._dispatch_loop())
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            job.started_at = time.monotonic()
+            wait_time = job.started_at - job.enqueued_at
+
+            with self._lock:
+                if job.counted:
+                    self._pending -= 1
+                self._running += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+
+            try:
+                result = await job.factory()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                if job.future is not None and not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                with self._lock:
+                    self.completed += 1
+                if job.future is not None and not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self.total_run_time += time.monotonic() - job.started_at
+                self._queue.task_done()
+
+    def _estimate_retry_after(self, queued: int = None) -> int:
+        finished = self.completed + self.failed
+        avg_run_time = self.total_run_time / finished if finished else 5.0
+        queued = self._pending if queued is None else queued
+        waves = (queued + self._running) / max(1, self.max_running)
+        return max(1, int(avg_run_time * waves + 0.5))
+
+    def admit(self, count: int = 1):
+        """Nhận trước chỗ cho `count` job; ném QueueFullError nếu hàng đợi không đủ chỗ."""
+        with self._lock:
+            if self._pending + count > self.max_queue_size:
+                self.rejected += count
+                raise QueueFullError(
+                    self._estimate_retry_after(),
+                    f"Hàng đợi job đã đầy ({self._pending}/{self.max_queue_size})"
+                )
+            self._pending += count
+            self.submitted += count
+
+    async def execute(self, factory: Callable[[], Awaitable], name: str = "job",
+                      admitted: bool = False):
+        """Đưa job vào hàng đợi và chờ kết quả (gọi từ bên trong engine loop)."""
+        if not admitted:
+            self.admit(1)
+        if self._queue is None:
+            await self._start_workers()
+
+        job = Job(factory, name)
+        job.future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(job)
+        return await job.future
+
+    def submit(self, factory: Callable[[], Awaitable], name: str = "job") -> Future:
+        """Gửi job từ thread bất kỳ (ví dụ request handler Flask); áp dụng backpressure."""
+        self.admit(1)
+        return self.engine_loop.submit(self.execute(factory, name, admitted=True))
+
+    def release(self, count: int = 1):
+        """Trả lại chỗ đã nhận trước nhưng không dùng tới."""
+        with self._lock:
+            self._pending -= count
+
+    # --- Hàng đợi bền vững ---
+
+    def register_handler(self, kind: str, handler: Callable[..., Awaitable], coordinator: bool = False):
+        """
+        Đăng ký handler `async handler(job)` cho loại job bền vững `kind`.
+        Job điều phối (`coordinator=True`, ví dụ batch) không chiếm worker mà chạy như task riêng.
+        """
+        self._handlers[kind] = handler
+        if coordinator:
+            self._coordinator_kinds.add(kind)
+
+    def register_remote_kind(self, kind: str):
+        """Cho phép enqueue loại job `kind` nhưng không chạy tại chỗ (worker từ xa sẽ nhận nó)."""
+        self._remote_kinds.add(kind)
+
+    def enqueue(self, kind: str, payload: Dict, priority: int = 0, idempotency_key: str = None,
+                max_attempts: int = 3, cost: int = 1, admitted: bool = False, delay: float = 0.0) -> int:
+        """
+        Lưu job bền vững vào SQLite (gọi từ thread bất kỳ) và đánh thức dispatcher.
+        `cost` là số chỗ hàng đợi job chiếm (ví dụ số workflow của một batch); ném QueueFullError khi đầy.
+        `delay` hoãn thời điểm job có thể được nhận (dùng cho jitter của lịch chạy).
+        """
+        return self.enqueue_many([{
+            'kind': kind, 'payload': payload, 'priority': priority, 'idempotency_key': idempotency_key,
+            'max_attempts': max_attempts, 'cost': cost, 'delay': delay
+        }], admitted=admitted)[0]
+
+    def enqueue_many(self, jobs: List[Dict], admitted: bool = False) -> List[int]:
+        """
+        Lưu nhiều job bền vững trong một transaction (các khóa như `JobQueue.enqueue_many`) và trả
+        về ID theo thứ tự. Sức chứa được kiểm tra trong cùng transaction theo tổng `cost` của các job
+        đang chờ; `admitted=True` khi chỗ đã được giữ trước (ví dụ các workflow con của một batch).
+        """
+        if self.job_queue is None:
+            raise RuntimeError("EngineService chưa được cấu hình job_queue")
+        for job in jobs:
+            if job['kind'] not in self._handlers and job['kind'] not in self._remote_kinds:
+                raise ValueError(f"Không có handler cho loại job: {job['kind']}")
+
+        cost = sum(job.get('cost', 1) for job in jobs)
+        try:
+            job_ids = self.job_queue.enqueue_many(jobs, None if admitted else self.max_queue_size)
+        except QueueCapacityError as e:
+            with self._lock:
+                self.rejected += cost
+            raise QueueFullError(
+                self._estimate_retry_after(e.queued),
+                f"Hàng đợi job đã đầy ({e.queued}/{self.max_queue_size})"
+            ) from None
+
+        if not admitted:
+            with self._lock:
+                self.submitted += cost
+        self._notify_dispatcher()
+        return job_ids
+
+    def _notify_dispatcher(self):
+        loop = self.engine_loop.loop
+        if self._wakeup is not None and loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _dispatch_loop(self):
+        """Thuê job từ SQLite khi còn worker rảnh; chờ tín hiệu enqueue hoặc hết `poll_interval`."""
+        while True:
+            self._wakeup.clear()
+            try:
+                await self._dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠️ EngineService: lỗi khi lấy job từ hàng đợi bền vững: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_once(self):
+        # Thu hồi định kỳ các lease đã hết hạn (ví dụ của worker từ xa đã mất kết nối)
+        now = time.monotonic()
+        if now - self._last_sweep > self.job_queue.lease_seconds / 2:
+            self._last_sweep = now
+            recovered = await asyncio.to_thread(self.job_queue.requeue_stale_leases)
+            if recovered:
+                logger.info("♻️ Đã đưa lại %s job có lease hết hạn vào hàng đợi", recovered)
+
+        if self._coordinator_kinds:
+            jobs = await asyncio.to_thread(
+                self.job_queue.claim, self.owner, 10, sorted(self._coordinator_kinds)
+            )
+            for job in jobs:
+                task = asyncio.ensure_future(self._run_durable(job))
+                self._coordinators.add(task)
+                task.add_done_callback(self._coordinator_done)
+
+        worker_kinds = [kind for kind in self._handlers if kind not in self._coordinator_kinds]
+        free = self.max_running - self._running - self._queue.qsize()
+        if worker_kinds and free > 0:
+            jobs = await asyncio.to_thread(self.job_queue.claim, self.owner, free, worker_kinds)
+            claimed_at = time.time()
+            for job in jobs:
+                # Thời gian chờ tính từ lúc job có thể được nhận (tạo, hoặc hết thời gian chờ retry)
+                ready_at = job.available_at or job.created_at or claimed_at
+                self._queue.put_nowait(
+                    Job(lambda job=job: self._run_durable(job), f"{job.kind}_{job.id}", counted=False,
+                        queued_for=max(0.0, claimed_at - ready_at))
+                )
+
+    def _coordinator_done(self, task: asyncio.Task):
+        self._coordinators.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("⚠️ EngineService: job điều phối lỗi: %s", task.exception())
+
+    async def _keep_lease(self, job_id: int):
+        interval = max(1.0, self.job_queue.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self.job_queue.extend_lease, job_id, self.owner):
+                logger.warning("⚠️ EngineService: mất lease của job %s", job_id)
+                return
+
+    async def _run_durable(self, job):
+        """Chạy handler của job bền vững, gia hạn lease trong lúc chạy rồi ghi kết quả."""
+        heartbeat = asyncio.ensure_future(self._keep_lease(job.id))
+        try:
+            result = await self._handlers[job.kind](job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            retried = await asyncio.to_thread(self.job_queue.fail, job.id, self.owner, str(e))
+            if not retried:
+                job.status, job.last_error = 'failed', str(e)
+                self._resolve_waiters(job)
+            raise
+        else:
+            await asyncio.to_thread(self.job_queue.complete, job.id, self.owner, result)
+            job.status, job.result = 'completed', result
+            self._resolve_waiters(job)
+            return result
+        finally:
+            heartbeat.cancel()
+            self._wakeup.set()
+
+    def notify_job_finished(self, job):
+        """Báo job đã kết thúc ở nơi khác (ví dụ worker từ xa) cho các coroutine đang chờ (thread-safe)."""
+        loop = self.engine_loop.loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._resolve_waiters, job)
+        self._notify_dispatcher()
+
+    def _resolve_waiters(self, job):
+        for waiter in self._job_waiters.pop(job.id, []):
+            if not waiter.done():
+                waiter.set_result(job)
+
+    async def wait_for_job(self, job_id: int):
+        """Chờ job bền vững kết thúc (completed/failed) và trả về QueuedJob cuối cùng."""
+        while True:
+            waiter = asyncio.get_running_loop().create_future()
+            self._job_waiters.setdefault(job_id, []).append(waiter)
+            try:
+                job = await asyncio.to_thread(self.job_queue.get_job, job_id)
+                if job is None or job.status in ('completed', 'failed'):
+                    return job
+                # Job có thể được một tiến trình khác xử lý nên vẫn kiểm tra lại định kỳ
+                try:
+                    return await asyncio.wait_for(asyncio.shield(waiter), self.poll_interval * 5)
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                waiters = self._job_waiters.get(job_id)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._job_waiters[job_id]
+
+    def spawn(self, coro) -> Future:
+        """Chạy một coroutine điều phối (không chiếm chỗ trong hàng đợi) trên engine loop."""
+        return self.engine_loop.submit(coro)
+
+    async def shutdown(self):
+        """Hủy dispatcher và các worker (gọi từ bên trong engine loop)."""
+        tasks = list(self._workers) + list(self._coordinators)
+        if self._dispatcher is not None:
+            tasks.append(self._dispatcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._dispatcher = None
+
+        # Trả lại các job đang thuê để lần khởi động sau (hoặc worker khác) chạy tiếp
+        if self.job_queue is not None:
+            await asyncio.to_thread(self.job_queue.requeue_stale_leases, self.owner)
+
+    def get_stats(self) -> Dict:
+        """
+        Độ sâu hàng đợi (job đã nhận trong bộ nhớ cộng job bền vững đang chờ trong SQLite),
+        thời gian chờ và số job đang chạy.
+        """
+        durable = self.job_queue.get_stats() if self.job_queue is not None else None
+        durable_queued = self.job_queue.count_queued() if self.job_queue is not None else 0
+        with self._lock:
+            started = self.completed + self.failed + self._running
+            return {
+                'queue_depth': self._pending + durable_queued,
+                'running': self._running,
+                'max_running': self.max_running,
+                'max_queue_size': self.max_queue_size,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'avg_wait_time': self.total_wait_time / started if started else 0.0,
+                'max_wait_time': self.max_wait_time,
+                'durable': durable
+            }
+
+    def __repr__(self):
+        return (f"EngineService(running={self._running}/{self.max_running}, "
+                f"queued={self._pending}/{self.max_queue_size})")
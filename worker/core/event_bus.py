@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+NODE_STARTED = 'node_started'
+NODE_COMPLETED = 'node_completed'
+NODE_ERROR = 'node_error'
+
+
+@dataclass(slots=True)
+class NodeEvent:
+    """Một sự kiện vòng đời node trong một lần chạy."""
+    kind: str  # node_started, node_completed, node_error
+    run_id: str
+    node_id: str
+    node_type: str
+    timestamp: float
+    execution_time: Optional[float] = None
+    error: Optional[str] = None
+    source: Any = None  # Khóa do bên tạo lần chạy gắn vào (ví dụ ID workflow trong database)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# Hàm phát sự kiện được truyền tới Node.execute:
+# publish(kind, node_id, node_type, execution_time=None, error=None, timestamp=None)
+Publisher = Callable[..., None]
+
+
+class _Barrier:
+    """Mốc trong buffer (xem `EventBus.flush`): dispatcher gọi `release` khi tới nó."""
+    __slots__ = ('release',)
+
+    def __init__(self, release: Callable[[], None]):
+        self.release = release
+
+
+class EventBus:
+    """
+    Bus sự kiện trong tiến trình cho vòng đời node.
+
+    `publish()` chỉ tạo NodeEvent và append vào một ring buffer (`deque(maxlen=capacity)`,
+    append/popleft là nguyên tử nên không cần lock), nên node không bao giờ chờ I/O của subscriber.
+    Thread dispatcher lấy sự kiện ra mỗi `poll_interval` giây và gọi các subscriber theo thứ tự.
+    Khi buffer đầy, sự kiện cũ nhất bị ghi đè (và được đếm trong `overwritten`).
+    """
+
+    def __init__(self, capacity: int = 65536, poll_interval: float = 0.01):
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+
+        self._buffer: deque = deque(maxlen=capacity)
+        self._subscribers: List[tuple] = []  # (handler, kinds hoặc None); thay thế cả list khi đổi
+        self._dispatch_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()  # Gọi dispatcher ngay, không chờ hết `poll_interval`
+        self._thread: Optional[threading.Thread] = None
+
+        # Thống kê
+        self.published = 0
+        self.dispatched = 0
+        self.overwritten = 0
+        self.handler_errors = 0
+
+    def publish(self, event: NodeEvent):
+        """Đưa một sự kiện vào ring buffer (an toàn từ mọi thread, không chặn)."""
+        buffer = self._buffer
+        if len(buffer) == self.capacity:
+            self.overwritten += 1
+        buffer.append(event)
+        self.published += 1
+
+    def publisher(self, run_id: str, source: Any = None) -> Publisher:
+        """Hàm phát sự kiện gắn với một lần chạy, dùng trong hot path của Node.execute."""
+        buffer = self._buffer
+
+        def publish(kind: str, node_id: str, node_type: str, execution_time: float = None,
+                    error: str = None, timestamp: float = None):
+            if len(buffer) == self.capacity:
+                self.overwritten += 1
+            buffer.append(NodeEvent(kind, run_id, node_id, node_type, timestamp or time.time(),
+                                    execution_time, error, source))
+            self.published += 1
+
+        return publish
+
+    def subscribe(self, handler: Callable[[NodeEvent], None], kinds: Iterable[str] = None):
+        """Đăng ký `handler(event)`; `kinds` giới hạn loại sự kiện nhận (mặc định: tất cả)."""
+        self._subscribers = self._subscribers + [(handler, frozenset(kinds) if kinds else None)]
+        return handler
+
+    def unsubscribe(self, handler: Callable[[NodeEvent], None]):
+        self._subscribers = [entry for entry in self._subscribers if entry[0] is not handler]
+
+    def dispatch(self) -> int:
+        """Giao mọi sự kiện đang chờ cho subscriber; trả về số sự kiện đã giao."""
+        with self._dispatch_lock:
+            buffer = self._buffer
+            subscribers = self._subscribers
+            count = 0
+            while buffer:
+                event = buffer.popleft()
+                if event.__class__ is _Barrier:
+                    event.release()
+                    continue
+                for handler, kinds in subscribers:
+                    if kinds is not None and event.kind not in kinds:
+                        continue
+                    try:
+                        handler(event)
+                    except Exception as e:
+                        self.handler_errors += 1
+                        logger.warning("⚠️ EventBus: subscriber %s lỗi: %s",
+                                       getattr(handler, '__name__', handler), e)
+                count += 1
+            self.dispatched += count
+            return count
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            self.dispatch()
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """
+        Chờ tới khi mọi sự kiện đã phát trước lời gọi này được giao. Subscriber vẫn chạy trên
+        thread dispatcher (hoặc ngay tại đây nếu dispatcher chưa chạy), nên không được gọi từ
+        event loop của engine. False nếu hết `timeout` (ví dụ mốc bị ghi đè khi buffer đầy).
+        """
+        if not (self._thread and self._thread.is_alive()):
+            self.dispatch()
+            return True
+        done = threading.Event()
+        if len(self._buffer) == self.capacity:
+            self.overwritten += 1
+        self._buffer.append(_Barrier(done.set))
+        self._wake.set()
+        return done.wait(timeout)
+
+    def start(self):
+        """Khởi động thread dispatcher (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.dispatch()
+
+    def get_stats(self) -> Dict:
+        return {
+            'capacity': self.capacity,
+            'pending': len(self._buffer),
+            'subscribers': len(self._subscribers),
+            'published': self.published,
+            'dispatched': self.dispatched,
+            'overwritten': self.overwritten,
+            'handler_errors': self.handler_errors
+        }
+
+
+class NodeMetrics:
+    """Subscriber thống kê số lần chạy, lỗi và thời gian thực thi theo loại node."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_type: Dict[str, Dict] = {}
+        self.running = 0
+
+    def __call__(self, event: NodeEvent):
+        with self._lock:
+            if event.kind == NODE_STARTED:
+                self.running += 1
+                return
+            self.running = max(0, self.running - 1)
+            stats = self._by_type.get(event.node_type)
+            if stats is None:
+                stats = self._by_type[event.node_type] = {
+                    'completed': 0, 'failed': 0, 'total_time': 0.0, 'max_time': 0.0
+                }
+            stats['completed' if event.kind == NODE_COMPLETED else 'failed'] += 1
+            execution_time = event.execution_time or 0.0
+            stats['total_time'] += execution_time
+            stats['max_time'] = max(stats['max_time'], execution_time)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            by_type = {}
+            for node_type, stats in self._by_type.items():
+                count = stats['completed'] + stats['failed']
+                by_type[node_type] = dict(stats, avg_time=stats['total_time'] / count if count else 0.0)
+            return {'running': self.running, 'by_type': by_type}
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+from .workflow import Workflow
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FleetWorkerInfo:
+    """Thông tin một worker từ xa đã đăng ký với control plane."""
+    worker_id: str
+    hostname: str
+    capacity: int
+    free_slots: int
+    running_jobs: List[int] = field(default_factory=list)
+    labels: Dict = field(default_factory=dict)
+    registered_at: float = field(default_factory=time.time)
+    last_heartbeat: float = field(default_factory=time.time)
+    claimed: int = 0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class FleetRegistry:
+    """
+    Danh sách worker đang hoạt động của control plane (trong bộ nhớ, thread-safe).
+    Mỗi worker báo số slot browser còn trống qua heartbeat; khi nhận job, phần của mỗi worker
+    được chia theo tỷ lệ slot trống để một batch được rải ra nhiều máy thay vì dồn vào một máy.
+    """
+
+    def __init__(self, heartbeat_timeout: float = 30.0):
+        self.heartbeat_timeout = heartbeat_timeout
+        self._workers: Dict[str, FleetWorkerInfo] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def heartbeat_interval(self) -> float:
+        return max(1.0, self.heartbeat_timeout / 3)
+
+    def register(self, worker_id: str, hostname: str, capacity: int, labels: Dict = None) -> FleetWorkerInfo:
+        """Đăng ký (hoặc đăng ký lại) một worker."""
+        with self._lock:
+            info = FleetWorkerInfo(worker_id, hostname, capacity, capacity, labels=labels or {})
+            self._workers[worker_id] = info
+            return info
+
+    def heartbeat(self, worker_id: str, free_slots: int, running_jobs: List[int] = None) -> Optional[FleetWorkerInfo]:
+        """Cập nhật slot trống và job đang chạy; trả về None nếu worker chưa đăng ký (hoặc đã hết hạn)."""
+        with self._lock:
+            info = self._workers.get(worker_id)
+            if info is None:
+                return None
+            info.free_slots = max(0, min(info.capacity, free_slots))
+            info.running_jobs = list(running_jobs or [])
+            info.last_heartbeat = time.time()
+            return info
+
+    def get(self, worker_id: str) -> Optional[FleetWorkerInfo]:
+        with self._lock:
+            return self._workers.get(worker_id)
+
+    def expire(self) -> List[str]:
+        """Loại bỏ các worker quá hạn heartbeat; trả về ID của chúng để thu hồi lease."""
+        cutoff = time.time() - self.heartbeat_timeout
+        with self._lock:
+            expired = [worker_id for worker_id, info in self._workers.items() if info.last_heartbeat < cutoff]
+            for worker_id in expired:
+                del self._workers[worker_id]
+            return expired
+
+    def claim_limit(self, worker_id: str, requested: int, queued: int) -> int:
+        """
+        Số job tối đa worker được nhận lần này: không vượt quá slot trống của nó
+        và phần chia theo tỷ lệ slot trống trên toàn fleet của các job đang chờ.
+        """
+        with self._lock:
+            info = self._workers.get(worker_id)
+            if info is None or queued <= 0:
+                return 0
+            free = min(info.free_slots, requested)
+            total_free = sum(worker.free_slots for worker in self._workers.values())
+            if total_free <= 0:
+                return 0
+            share = math.ceil(queued * info.free_slots / total_free)
+            return max(0, min(free, share))
+
+    def record_claim(self, worker_id: str, job_ids: List[int]):
+        """Giữ chỗ các slot vừa được giao cho tới heartbeat tiếp theo."""
+        with self._lock:
+            info = self._workers.get(worker_id)
+            if info is not None:
+                info.free_slots = max(0, info.free_slots - len(job_ids))
+                info.running_jobs.extend(job_ids)
+                info.claimed += len(job_ids)
+
+    def release(self, worker_id: str, job_id: int):
+        with self._lock:
+            info = self._workers.get(worker_id)
+            if info is not None and job_id in info.running_jobs:
+                info.running_jobs.remove(job_id)
+                info.free_slots = min(info.capacity, info.free_slots + 1)
+
+    def list_workers(self) -> List[Dict]:
+        with self._lock:
+            return [info.to_dict() for info in self._workers.values()]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'capacity': sum(info.capacity for info in self._workers.values()),
+                'free_slots': sum(info.free_slots for info in self._workers.values()),
+                'running_jobs': sum(len(info.running_jobs) for info in self._workers.values())
+            }
+
+
+class FleetWorker:
+    """
+    Worker chạy trên một máy bất kỳ, nhận job workflow từ control plane (app.py) qua HTTP.
+    Worker đăng ký, gửi heartbeat kèm số slot trống, nhận job theo lease và báo kết quả;
+    việc thực thi dùng WorkflowManager (browser pool, cache plan) của chính máy đó.
+    """
+
+    def __init__(self, manager, control_url: str, worker_id: str = None,
+                 poll_interval: float = 1.0, labels: Dict = None):
+        self.manager = manager
+        self.control_url = control_url.rstrip('/')
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.labels = labels or {}
+        self.heartbeat_interval = 10.0
+        self.running: Dict[int, asyncio.Task] = {}
+        self._stopping = False
+
+        # Thống kê
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.manager.max_concurrent_workflows
+
+    @property
+    def free_slots(self) -> int:
+        return max(0, self.capacity - len(self.running))
+
+    def _request(self, method: str, path: str, body: Dict = None):
+        """Gửi request JSON đồng bộ (được gọi qua asyncio.to_thread); trả về (status, dict)."""
+        data = json.dumps(body or {}).encode('utf-8')
+        request = urllib.request.Request(
+            f"{self.control_url}{path}", data=data, method=method,
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read() or b'{}')
+            except ValueError:
+                return e.code, {}
+
+    async def _call(self, method: str, path: str, body: Dict = None):
+        return await asyncio.to_thread(self._request, method, path, body)
+
+    async def register(self):
+        status, data = await self._call('POST', '/api/fleet/workers/register', {
+            'worker_id': self.worker_id,
+            'hostname': socket.gethostname(),
+            'capacity': self.capacity,
+            'labels': self.labels
+        })
+        if status != 200:
+            raise RuntimeError(f"Không thể đăng ký worker: {data.get('error', status)}")
+        self.heartbeat_interval = data.get('heartbeat_interval', self.heartbeat_interval)
+        logger.info("🛰️ Worker %s đã đăng ký với %s (capacity %s)",
+                    self.worker_id, self.control_url, self.capacity)
+
+    async def _heartbeat_loop(self):
+        while not self._stopping:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                status, _ = await self._call('POST', '/api/fleet/workers/heartbeat', {
+                    'worker_id': self.worker_id,
+                    'free_slots': self.free_slots,
+                    'running_jobs': list(self.running)
+                })
+                if status == 404:
+                    # Control plane đã quên worker (khởi động lại hoặc hết hạn): đăng ký lại
+                    await self.register()
+            except (urllib.error.URLError, OSError) as e:
+                logger.warning("⚠️ Heartbeat thất bại: %s", e)
+
+    async def _claim(self) -> List[Dict]:
+        status, data = await self._call('POST', '/api/fleet/jobs/claim', {
+            'worker_id': self.worker_id,
+            'max_jobs': self.free_slots
+        })
+        if status == 404:
+            await self.register()
+            return []
+        if status != 200:
+            logger.warning("⚠️ Không thể nhận job: %s", data.get('error', status))
+            return []
+        return data.get('jobs', [])
+
+    async def _execute(self, job: Dict):
+        job_id = job['id']
+        workflow_data = job['workflow']
+        body = {'worker_id': self.worker_id}
+        try:
+            plan = self.manager.plan_cache.get_or_compile(workflow_data['json_content'])
+            workflow = Workflow(workflow_data['name'], max_branches=self.manager.max_branches_per_run, plan=plan)
+            # Cấu hình browser của workspace (ví dụ profile chặn request) áp dụng như khi chạy tại chỗ
+            run = workflow.create_run(browser_settings=workflow_data.get('browser_settings'))
+            success = await self.manager._run_with_semaphore(run)
+            body.update(status='completed', result={
+                'success': success,
+                'error': run.error_message,
+                'execution_time': run.execution_time,
+                'run_id': run.run_id,
+                'node_results': run.get_node_results(),
+                'request_blocking': run.get_summary()['request_blocking']
+            })
+            if success:
+                self.completed += 1
+            else:
+                self.failed += 1
+        except Exception as e:
+            # Lỗi hạ tầng (không biên dịch được, browser...): control plane sẽ thử lại job
+            self.failed += 1
+            body.update(status='failed', error=str(e))
+
+        try:
+            status, data = await self._call('POST', f'/api/fleet/jobs/{job_id}/complete', body)
+            if status != 200:
+                logger.warning("⚠️ Control plane từ chối kết quả job %s: %s", job_id, data.get('error', status))
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning("⚠️ Không thể gửi kết quả job %s: %s", job_id, e)
+
+    async def run_forever(self):
+        """Vòng lặp chính: nhận job khi còn slot trống, chờ `poll_interval` khi hàng đợi rỗng."""
+        await self.register()
+        heartbeat = asyncio.ensure_future(self._heartbeat_loop())
+        try:
+            while not self._stopping:
+                jobs = []
+                if self.free_slots > 0:
+                    try:
+                        jobs = await self._claim()
+                    except (urllib.error.URLError, OSError) as e:
+                        logger.warning("⚠️ Control plane không phản hồi: %s", e)
+
+                for job in jobs:
+                    task = asyncio.ensure_future(self._execute(job))
+                    self.running[job['id']] = task
+                    task.add_done_callback(lambda _, job_id=job['id']: self.running.pop(job_id, None))
+
+                if not jobs:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            heartbeat.cancel()
+            if self.running:
+                await asyncio.gather(*self.running.values(), return_exceptions=True)
+
+    def stop(self):
+        self._stopping = True
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+@dataclass(slots=True)
+class HttpResponse:
+    """Phản hồi đã đọc hết body (dùng được sau khi connection trả về pool và lưu được vào cache)."""
+    status: int
+    url: str
+    headers: Mapping[str, str]
+    body: bytes
+    from_cache: bool = False
+    elapsed: float = 0.0
+
+    def text(self, encoding: str = 'utf-8') -> str:
+        return self.body.decode(encoding, errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    response: HttpResponse
+    expires_at: float  # Trước thời điểm này dùng thẳng từ cache, sau đó phải xác thực lại
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+@dataclass(slots=True)
+class _HostStats:
+    requests: int = 0
+    errors: int = 0
+    hits: int = 0  # Trả từ cache, không gửi request
+    revalidated: int = 0  # 304 Not Modified
+    misses: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    statuses: Dict[int, int] = field(default_factory=dict)
+
+    def add(self, other: '_HostStats'):
+        for name in ('requests', 'errors', 'hits', 'revalidated', 'misses', 'total_time'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_time = max(self.max_time, other.max_time)
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+    def to_dict(self) -> Dict:
+        cacheable = self.hits + self.revalidated + self.misses
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'cache_hits': self.hits,
+            'cache_revalidated': self.revalidated,
+            'cache_misses': self.misses,
+            'hit_rate': (self.hits + self.revalidated) / cacheable if cacheable else 0.0,
+            'avg_time': self.total_time / self.requests if self.requests else 0.0,
+            'max_time': self.max_time,
+            'statuses': dict(self.statuses)
+        }
+
+
+def _cache_ttl(headers: Mapping[str, str], default_ttl: float) -> Optional[float]:
+    """Thời gian tươi của phản hồi theo Cache-Control / Expires; None nếu không được lưu."""
+    cache_control = headers.get('Cache-Control', '').lower()
+    directives = {}
+    for part in cache_control.split(','):
+        name, _, value = part.strip().partition('=')
+        directives[name] = value.strip('"')
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0.0
+    if 'max-age' in directives:
+        try:
+            return max(0.0, float(directives['max-age']))
+        except ValueError:
+            return 0.0
+    if 'Expires' in headers:
+        try:
+            return max(0.0, parsedate_to_datetime(headers['Expires']).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return default_ttl
+
+
+class HttpClient:
+    """
+    HTTP client dùng chung cho một event loop: một `aiohttp.ClientSession` với connection pool
+    keep-alive (giới hạn tổng và theo host), cache DNS và TLS session được tái sử dụng.
+
+    GET không có body gọi với `cache=True` được cache (LRU, tối đa `cache_size` phản hồi, mỗi
+    phản hồi tối đa `max_entry_bytes`): trong thời gian tươi (Cache-Control max-age / Expires, hoặc `default_ttl`
+    giây) phản hồi được trả ngay; hết hạn mà có ETag / Last-Modified thì gửi request có điều kiện
+    và dùng lại body khi nhận 304.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, timeout: float = 30,
+                 connect_timeout: float = 10, dns_ttl: int = 300, cache_size: int = 256,
+                 default_ttl: float = 0, max_entry_bytes: int = 1024 * 1024):
+        if aiohttp is None:
+            raise RuntimeError("Cần cài đặt aiohttp để dùng HttpClient")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.dns_ttl = dns_ttl
+        self.cache_size = cache_size
+        self.default_ttl = default_ttl
+        self.max_entry_bytes = max_entry_bytes
+
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._hosts: Dict[str, _HostStats] = {}
+        self.evicted = 0
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=self.dns_ttl, use_dns_cache=True)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout)
+            )
+        return self._session
+
+    def _host_stats(self, url: str) -> _HostStats:
+        host = urlsplit(url).netloc or '?'
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = _HostStats()
+        return stats
+
+    async def request(self, method: str, url: str, json_body: Any = None, headers: Dict = None,
+                      cache: bool = False, ttl: float = None, timeout: float = None) -> HttpResponse:
+        """
+        Gửi request và đọc hết body. `cache=True` dùng cache cho GET (mặc định tắt); `ttl` ghi đè
+        thời gian tươi (giây) cho phản hồi này; `timeout` ghi đè timeout tổng.
+        """
+        method = method.upper()
+        stats = self._host_stats(url)
+        cacheable = cache and self.cache_size > 0 and method == 'GET' and json_body is None
+        request_headers = dict(headers or {})
+
+        entry = self._cache.get(url) if cacheable else None
+        if entry is not None:
+            self._cache.move_to_end(url)
+            if time.time() < entry.expires_at:
+                stats.hits += 1
+                return entry.response
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+
+        options = {}
+        if json_body is not None:
+            options['json'] = json_body
+        if timeout is not None:
+            options['timeout'] = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, self.connect_timeout))
+
+        start = time.perf_counter()
+        stats.requests += 1
+        try:
+            async with self._get_session().request(method, url, headers=request_headers, **options) as response:
+                body = await response.read()
+                result = HttpResponse(response.status, str(response.url), response.headers, body)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+        result.elapsed = elapsed
+        stats.statuses[result.status] = stats.statuses.get(result.status, 0) + 1
+
+        if not cacheable:
+            return result
+        if result.status == 304 and entry is not None:
+            stats.revalidated += 1
+            fresh_for = ttl if ttl is not None else _cache_ttl(result.headers, self.default_ttl)
+            entry.expires_at = time.time() + (fresh_for or 0.0)
+            return entry.response
+        stats.misses += 1
+        if result.status == 200:
+            self._store(url, result, ttl)
+        return result
+
+    def _store(self, url: str, response: HttpResponse, ttl: float = None):
+        fresh_for = ttl if ttl is not None else _cache_ttl(response.headers, self.default_ttl)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        # Không lưu phản hồi không tươi mà cũng không xác thực lại được
+        if fresh_for is None or (fresh_for <= 0 and not etag and not last_modified):
+            self._cache.pop(url, None)
+            return
+        if len(response.body) > self.max_entry_bytes:
+            return
+        cached = HttpResponse(response.status, response.url, response.headers, response.body, from_cache=True)
+        self._cache[url] = _CacheEntry(cached, time.time() + fresh_for, etag, last_modified)
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.evicted += 1
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_stats(self) -> Dict:
+        return {
+            'cache_entries': len(self._cache),
+            'cache_size': self.cache_size,
+            'cache_evicted': self.evicted,
+            'hosts': {host: stats.to_dict() for host, stats in list(self._hosts.items())}
+        }
+
+
+class HostRateLimiter:
+    """
+    Token bucket theo host: mỗi host được tối đa `rate` request/giây, cho phép dồn tối đa `burst`
+    request. Dùng trong một event loop (không có await giữa lúc kiểm tra và lúc lấy token).
+    """
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._buckets: Dict[str, list] = {}  # host -> [token còn lại, thời điểm cập nhật]
+        self.waited = 0.0
+
+    async def acquire(self, url: str):
+        """Chờ tới khi host của `url` còn token."""
+        if self.rate <= 0:
+            return
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = [float(self.burst), time.monotonic()]
+        while True:
+            now = time.monotonic()
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return
+            delay = (1 - bucket[0]) / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+
+# Một client cho mỗi event loop: session aiohttp gắn với loop tạo ra nó
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HttpClient]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _client_from_env() -> HttpClient:
+    return HttpClient(
+        limit=int(os.environ.get('HTTP_POOL_LIMIT', 100)),
+        limit_per_host=int(os.environ.get('HTTP_POOL_LIMIT_PER_HOST', 10)),
+        timeout=float(os.environ.get('HTTP_TIMEOUT', 30)),
+        cache_size=int(os.environ.get('HTTP_CACHE_SIZE', 256)),
+        default_ttl=float(os.environ.get('HTTP_CACHE_TTL', 0))
+    )
+
+
+def get_http_client() -> HttpClient:
+    """HTTP client dùng chung của event loop đang chạy (tạo khi cần)."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None:
+            client = _clients[loop] = _client_from_env()
+        return client
+
+
+async def close_http_client():
+    """Đóng client của event loop đang chạy (gọi khi dọn dẹp loop)."""
+    with _clients_lock:
+        client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def get_http_stats() -> Dict:
+    """Thống kê gộp theo host của mọi client trong tiến trình."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    hosts: Dict[str, _HostStats] = {}
+    for client in clients:
+        # Cùng host trên nhiều loop: cộng dồn các bộ đếm
+        for host, stats in list(client._hosts.items()):
+            hosts.setdefault(host, _HostStats()).add(stats)
+    return {
+        'clients': len(clients),
+        'cache_entries': sum(len(client._cache) for client in clients),
+        'hosts': {host: stats.to_dict() for host, stats in hosts.items()}
+    }
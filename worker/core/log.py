@@ -0,0 +1,240 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from .run_log import CURRENT_NODE_ID, CURRENT_RUN_LOG
+
+# Mã hóa một chuỗi thành chuỗi JSON (giữ nguyên ký tự không phải ASCII, như ensure_ascii=False)
+_json_string = json.encoder.encode_basestring
+
+
+class HumanFormatter(logging.Formatter):
+    """Định dạng cho người đọc: `HH:MM:SS LEVEL   message`."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(message)s', datefmt='%H:%M:%S')
+        self._second = None
+        self._second_text = ''
+
+    def formatTime(self, record: logging.LogRecord, datefmt: str = None) -> str:
+        # Nhiều bản ghi trong cùng một giây: chỉ gọi strftime một lần
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._second_text = time.strftime(self.datefmt, self.converter(second))
+        return self._second_text
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Một object JSON mỗi dòng (JSON lines), kèm run_id / node_id của lần chạy. Các khóa cố định nên
+    dòng được ghép trực tiếp, chỉ các chuỗi được mã hóa (bằng bộ mã hóa C của module json), thay vì
+    dựng dict rồi gọi json.dumps cho từng bản ghi.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._levels: Dict[str, str] = {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        level = self._levels.get(record.levelname)
+        if level is None:
+            level = self._levels[record.levelname] = _json_string(record.levelname.lower())
+        run_id = getattr(record, 'run_id', None)
+        node_id = getattr(record, 'node_id', None)
+        line = (f'{{"ts": {record.created!r}, "level": {level}, "logger": {_json_string(record.name)}, '
+                f'"message": {_json_string(record.getMessage())}, '
+                f'"run_id": {"null" if run_id is None else _json_string(str(run_id))}, '
+                f'"node_id": {"null" if node_id is None else _json_string(str(node_id))}')
+        if record.exc_info:
+            line += f', "exc": {_json_string(self.formatException(record.exc_info))}'
+        return line + '}'
+
+
+class RunLogHandler(logging.Handler):
+    """
+    Ghi bản ghi vào log của lần chạy hiện tại (core.run_log) ngay trong task phát log,
+    vì context (run, node) chỉ có ở đó. Bản ghi ngoài lần chạy bị bỏ qua với chi phí gần bằng 0.
+    """
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Không lấy lock của Handler: RunLog tự đồng bộ
+        run_log = CURRENT_RUN_LOG.get()
+        if run_log is None or record.levelno < self.level:
+            return False
+        try:
+            run_log.append(record.levelname.lower(), record.getMessage(), CURRENT_NODE_ID.get(),
+                           record.created)
+        except Exception:
+            self.handleError(record)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        self.handle(record)
+
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Handler không chặn: bản ghi (chưa định dạng) được đưa vào một SimpleQueue; thread nền thức dậy
+    khi có bản ghi, gom thêm trong `flush_interval` giây rồi định dạng và ghi cả lô (tối đa
+    `max_batch` bản ghi) bằng một lần write/flush, nên engine không bị tranh GIL theo từng dòng.
+    Khi đã có `max_queue` bản ghi chờ, bản ghi mới bị bỏ và được đếm trong `dropped`.
+    """
+
+    def __init__(self, formatter: logging.Formatter, level: int = logging.INFO, stream=None,
+                 max_queue: int = 100000, max_batch: int = 4096, flush_interval: float = 0.05):
+        super().__init__(level)
+        self.setFormatter(formatter)
+        self.stream = stream  # None: sys.stdout tại thời điểm ghi
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+
+        # Thống kê
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Định dạng bị hoãn sang thread nền; chỉ gắn context của lần chạy (không có ở thread nền)
+        if record.levelno < self.level:
+            return False
+        run_log = CURRENT_RUN_LOG.get()
+        record.run_id = getattr(run_log, 'run_id', None)
+        record.node_id = CURRENT_NODE_ID.get()
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return True
+        self._queue.put(record)
+        self.enqueued += 1
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        self.handle(record)
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            time.sleep(self.flush_interval)
+            batch = [record]
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        stream = self.stream or sys.stdout
+        try:
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
+        except Exception:
+            pass
+        self.written += len(lines)
+        self.batches += 1
+
+    def close(self, timeout: float = 5):
+        """Ghi hết các bản ghi đang chờ rồi dừng thread nền."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        super().close()
+
+    def get_stats(self) -> Dict:
+        return {
+            'level': logging.getLevelName(self.level),
+            'queued': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped
+        }
+
+
+_lock = threading.Lock()
+_sink: Optional[AsyncLogHandler] = None
+_run_handler: Optional[RunLogHandler] = None
+
+
+def _level(value, default: int) -> int:
+    if value is None:
+        return default
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+    return logging.getLevelName(str(value).upper())
+
+
+def configure_logging(level=None, fmt: str = None, quiet: bool = None, stream=None,
+                      run_log_level=None) -> AsyncLogHandler:
+    """
+    Cấu hình logging cho engine (idempotent). Giá trị mặc định lấy từ biến môi trường:
+    LOG_LEVEL (INFO), LOG_FORMAT (human | json), LOG_QUIET (1: console chỉ ghi WARNING trở lên)
+    và RUN_LOG_LEVEL (INFO, mức ghi vào log của từng lần chạy).
+    """
+    global _sink, _run_handler
+    with _lock:
+        if _sink is not None:
+            return _sink
+
+        fmt = fmt or os.environ.get('LOG_FORMAT', 'human')
+        if quiet is None:
+            quiet = os.environ.get('LOG_QUIET', '0').lower() in ('1', 'true', 'yes')
+        console_level = _level(level or os.environ.get('LOG_LEVEL'), logging.INFO)
+        if quiet:
+            console_level = max(console_level, logging.WARNING)
+        run_level = _level(run_log_level or os.environ.get('RUN_LOG_LEVEL'), logging.INFO)
+
+        formatter = JsonFormatter() if fmt == 'json' else HumanFormatter()
+        _sink = AsyncLogHandler(formatter, console_level, stream)
+        _run_handler = RunLogHandler(run_level)
+
+        root = logging.getLogger()
+        root.addHandler(_run_handler)
+        root.addHandler(_sink)
+        root.setLevel(min(console_level, run_level))
+        atexit.register(shutdown_logging)
+        return _sink
+
+
+def shutdown_logging():
+    """Ghi hết log đang chờ và gỡ các handler của engine."""
+    global _sink, _run_handler
+    with _lock:
+        root = logging.getLogger()
+        for handler in (_run_handler, _sink):
+            if handler is not None:
+                root.removeHandler(handler)
+                handler.close()
+        _sink = _run_handler = None
+
+
+def get_log_stats() -> Dict:
+    sink = _sink
+    return sink.get_stats() if sink is not None else {'configured': False}
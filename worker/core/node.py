@@ -1,9 +1,32 @@
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional
 from strategies.node_strategies import get_strategy
+from .run_log import CURRENT_NODE_ID
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NodeResult:
+    """Kết quả thực thi một node trong một lần chạy (WorkflowRun)."""
+    node_id: str
+    node_type: str
+    status: str  # completed, failed
+    execution_time: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
 
 class Node:
     """
     Đại diện cho một node trong workflow.
     Áp dụng Strategy Pattern để thực thi các hành động khác nhau.
+    Node là một phần của định nghĩa dùng chung nên không giữ trạng thái thực thi;
+    kết quả của từng lần chạy được ghi vào `results` của WorkflowRun.
     """
     
     def __init__(self, node_data: dict):
@@ -17,57 +40,85 @@ class Node:
         # Áp dụng Strategy Pattern: Gán strategy thực thi dựa trên loại node
         self.strategy = get_strategy(self.type)
         
-        # Lưu các kết nối ra khỏi node này
-        self.outputs = {}  # key: port_name, value: target_node_id
-        
-        # Metadata cho việc thực thi
-        self.executed = False
-        self.execution_time = None
+        # Lưu các kết nối ra khỏi node này (một port có thể nối tới nhiều node)
+        self.outputs = {}  # key: port_name, value: list target_node_id
 
     def add_connection(self, from_port: str, to_node_id: str):
         """Thêm kết nối từ port này tới node khác."""
-        self.outputs[from_port] = to_node_id
+        targets = self.outputs.setdefault(from_port, [])
+        if to_node_id not in targets:
+            targets.append(to_node_id)
 
-    async def execute(self, page, context: dict = None):
-        """Thực thi node với strategy tương ứng."""
-        print(f"\n--- Đang thực thi node: {self.display_name} ({self.type}) ---")
+    async def execute(self, page, context: dict = None, results: dict = None,
+                      publish=None) -> NodeResult:
+        """
+        Thực thi node với strategy tương ứng.
+        Kết quả (kể cả khi thất bại) được ghi vào `results[node_id]` nếu có.
+        `publish` (xem core.event_bus.EventBus.publisher) nhận các sự kiện
+        node_started / node_completed / node_error; lời gọi chỉ ghi vào ring buffer, không chờ I/O.
+        """
+        CURRENT_NODE_ID.set(self.id)  # Gắn node vào các dòng log của task này
+        logger.info("--- Đang thực thi node: %s (%s) ---", self.display_name, self.type)
         
-        import time
         start_time = time.time()
+        if publish is not None:
+            publish('node_started', self.id, self.type, timestamp=start_time)
         
         try:
             await self.strategy.execute(page, self.params, context)
-            self.executed = True
-            self.execution_time = time.time() - start_time
-            print(f"✅ Node {self.display_name} hoàn thành trong {self.execution_time:.2f}s")
         except Exception as e:
-            self.execution_time = time.time() - start_time
-            print(f"❌ Node {self.display_name} thất bại: {e}")
+            result = NodeResult(self.id, self.type, 'failed', time.time() - start_time, str(e))
+            if results is not None:
+                results[self.id] = result
+            if publish is not None:
+                publish('node_error', self.id, self.type, result.execution_time, result.error)
+            logger.error("❌ Node %s thất bại: %s", self.display_name, e)
             raise
+        
+        result = NodeResult(self.id, self.type, 'completed', time.time() - start_time)
+        if results is not None:
+            results[self.id] = result
+        if publish is not None:
+            publish('node_completed', self.id, self.type, result.execution_time)
+        logger.info("✅ Node %s hoàn thành trong %.2fs", self.display_name, result.execution_time)
+        return result
 
-    def get_next_node_id(self, from_port: str = 'out') -> str | None:
-        """Lấy ID của node tiếp theo dựa trên port output."""
+    def _selected_ports(self) -> list:
+        """Các port output được đi theo sau khi node này thực thi."""
         # Xử lý các node có logic đặc biệt
         if self.type in ['if', 'advancedCondition']:
             # TODO: Cần logic để quyết định đi theo 'then' hay 'else'
             # Ở đây ta mặc định là 'then' cho đơn giản
-            return self.outputs.get('then') or self.outputs.get('out')
+            return ['then'] if 'then' in self.outputs else ['out']
         elif self.type == 'forEach':
             # TODO: Cần logic lặp, ở đây ta giả sử đi tiếp khi xong
-            return self.outputs.get('next') or self.outputs.get('out')
+            return ['next'] if 'next' in self.outputs else ['out']
+        
+        # Các node thông thường đi theo tất cả các port (fan-out)
+        return list(self.outputs.keys())
+
+    def get_successor_ids(self) -> list:
+        """Lấy ID của tất cả các node kế tiếp (không trùng lặp, giữ thứ tự kết nối)."""
+        successors = []
+        for port in self._selected_ports():
+            for target_id in self.outputs.get(port, []):
+                if target_id not in successors:
+                    successors.append(target_id)
+        return successors
+
+    def get_next_node_id(self, from_port: str = 'out') -> str | None:
+        """Lấy ID của node tiếp theo đầu tiên dựa trên port output."""
+        if self.type in ['if', 'advancedCondition', 'forEach']:
+            successors = self.get_successor_ids()
+            return successors[0] if successors else None
         
         # Các node thông thường - thử các port theo thứ tự ưu tiên
         port_priority = [from_port, 'out', 'out_right', 'out_bottom']
         for port in port_priority:
-            if port in self.outputs:
-                return self.outputs[port]
+            if self.outputs.get(port):
+                return self.outputs[port][0]
         
         return None
 
-    def reset(self):
-        """Reset trạng thái thực thi của node."""
-        self.executed = False
-        self.execution_time = None
-    
     def __repr__(self):
         return f"Node(id={self.id}, type={self.type}, display_name={self.display_name})"
\ No newline at end of file
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+from .node import Node
+from .dag_executor import build_successor_table
+
+logger = logging.getLogger(__name__)
+
+# Tăng khi định dạng plan đã biên dịch thay đổi để vô hiệu hóa cache cũ
+PLAN_VERSION = 2
+
+
+def hash_workflow_json(json_content: str) -> str:
+    """Hash nội dung JSON của workflow, dùng làm khóa cache cho plan."""
+    return hashlib.sha256(json_content.encode('utf-8')).hexdigest()
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """
+    Plan thực thi bất biến được biên dịch từ JSON của workflow:
+    strategy đã được gán, tham số đã được kiểm tra và bảng node kế tiếp đã được tính sẵn.
+    """
+    content_hash: str
+    start_node_id: str
+    nodes: Mapping[str, Node]
+    successors: Mapping[str, Tuple[str, ...]]
+    in_degree: Mapping[str, int]
+
+    def to_dict(self) -> Dict:
+        """Dạng đã chuẩn hóa của plan để lưu vào SQLite."""
+        return {
+            'version': PLAN_VERSION,
+            'start_node_id': self.start_node_id,
+            'nodes': [
+                {
+                    'id': node.id,
+                    'type': node.type,
+                    'params': node.params,
+                    'displayName': node.display_name,
+                    'x': node.x,
+                    'y': node.y,
+                    'outputs': node.outputs
+                }
+                for node in self.nodes.values()
+            ],
+            'successors': {node_id: list(targets) for node_id, targets in self.successors.items()},
+            'in_degree': dict(self.in_degree)
+        }
+
+    @classmethod
+    def from_dict(cls, content_hash: str, data: Dict) -> 'ExecutionPlan':
+        """Dựng lại plan từ dạng đã chuẩn hóa mà không cần kiểm tra lại đồ thị."""
+        if data.get('version') != PLAN_VERSION:
+            raise ValueError(f"Phiên bản plan không tương thích: {data.get('version')}")
+
+        nodes = {}
+        for node_data in data['nodes']:
+            node = Node(node_data)
+            for port, targets in node_data.get('outputs', {}).items():
+                for target_id in targets:
+                    node.add_connection(port, target_id)
+            nodes[node.id] = node
+
+        return cls(
+            content_hash=content_hash,
+            start_node_id=data['start_node_id'],
+            nodes=MappingProxyType(nodes),
+            successors=MappingProxyType({k: tuple(v) for k, v in data['successors'].items()}),
+            in_degree=MappingProxyType(dict(data['in_degree']))
+        )
+
+    def __repr__(self):
+        return f"ExecutionPlan(hash={self.content_hash[:12]}, nodes={len(self.nodes)})"
+
+
+def compile_workflow(workflow_data: dict, content_hash: str = None) -> ExecutionPlan:
+    """Biên dịch dữ liệu JSON của workflow thành ExecutionPlan bất biến."""
+    if content_hash is None:
+        content_hash = hash_workflow_json(json.dumps(workflow_data, sort_keys=True))
+
+    # Tạo tất cả các node
+    nodes_data = workflow_data.get('nodes', [])
+    if not nodes_data:
+        raise ValueError("Workflow phải có ít nhất một node.")
+
+    nodes = {}
+    start_node_id = None
+    for node_data in nodes_data:
+        node = Node(node_data)
+        if node.id in nodes:
+            raise ValueError(f"ID node bị trùng lặp: {node.id}")
+
+        # Kiểm tra tham số bắt buộc của strategy
+        missing = [name for name in node.strategy.required_params if node.params.get(name) is None]
+        if missing:
+            raise ValueError(f"Node '{node.type}' ({node.id}) thiếu tham số: {', '.join(missing)}")
+
+        nodes[node.id] = node
+
+        # Tìm start node
+        if node.type == 'start':
+            if start_node_id:
+                raise ValueError("Workflow chỉ được phép có một Start Node.")
+            start_node_id = node.id
+
+    if not start_node_id:
+        raise ValueError("Workflow phải có một Start Node.")
+
+    # Thêm các kết nối
+    for conn in workflow_data.get('connections', []):
+        from_node = nodes.get(conn['fromNode'])
+        if from_node:
+            to_node_id = conn['toNode']
+            if to_node_id not in nodes:
+                logger.warning("⚠️ Bỏ qua kết nối tới node không tồn tại: %s", to_node_id)
+                continue
+            from_node.add_connection(conn.get('fromPort', 'out'), to_node_id)
+
+    # Bảng node kế tiếp và số input, đồng thời kiểm tra chu trình
+    successors, in_degree = build_successor_table(nodes, start_node_id)
+
+    return ExecutionPlan(
+        content_hash=content_hash,
+        start_node_id=start_node_id,
+        nodes=MappingProxyType(nodes),
+        successors=MappingProxyType(successors),
+        in_degree=MappingProxyType(in_degree)
+    )
+
+
+class PlanCache:
+    """
+    Cache plan thực thi theo hash nội dung JSON.
+    Tầng 1 là LRU trong bộ nhớ; tầng 2 (tùy chọn) là `store` bền vững có
+    `load_execution_plan(hash)` và `save_execution_plan(hash, plan_json)` (ví dụ DatabaseManager).
+    """
+
+    def __init__(self, store=None, max_entries: int = 256):
+        self.store = store
+        self.max_entries = max_entries
+        self._plans: 'OrderedDict[str, ExecutionPlan]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Thống kê
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.compiles = 0
+
+    def _remember(self, plan: ExecutionPlan):
+        with self._lock:
+            self._plans[plan.content_hash] = plan
+            self._plans.move_to_end(plan.content_hash)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+    def get(self, content_hash: str) -> Optional[ExecutionPlan]:
+        """Lấy plan từ bộ nhớ hoặc store bền vững, không biên dịch."""
+        with self._lock:
+            plan = self._plans.get(content_hash)
+            if plan is not None:
+                self._plans.move_to_end(content_hash)
+                self.memory_hits += 1
+                return plan
+
+        if self.store is not None:
+            plan_json = self.store.load_execution_plan(content_hash)
+            if plan_json:
+                try:
+                    plan = ExecutionPlan.from_dict(content_hash, json.loads(plan_json))
+                except (ValueError, KeyError) as e:
+                    logger.warning("⚠️ Bỏ qua plan đã lưu không hợp lệ (%s): %s", content_hash[:12], e)
+                    return None
+                self.store_hits += 1
+                self._remember(plan)
+                return plan
+        return None
+
+    def get_or_compile(self, json_content: str, content_hash: str = None) -> ExecutionPlan:
+        """Lấy plan cho nội dung JSON, chỉ parse và biên dịch khi chưa có trong cache."""
+        content_hash = content_hash or hash_workflow_json(json_content)
+        plan = self.get(content_hash)
+        if plan is not None:
+            return plan
+
+        plan = compile_workflow(json.loads(json_content), content_hash)
+        self.compiles += 1
+        self._remember(plan)
+
+        if self.store is not None:
+            try:
+                self.store.save_execution_plan(content_hash, json.dumps(plan.to_dict()))
+            except Exception as e:
+                logger.warning("⚠️ Không thể lưu plan vào store: %s", e)
+        return plan
+
+    def get_stats(self) -> Dict:
+        return {
+            'cached_plans': len(self._plans),
+            'memory_hits': self.memory_hits,
+            'store_hits': self.store_hits,
+            'compiles': self.compiles
+        }
+
+    def __repr__(self):
+        return f"PlanCache(plans={len(self._plans)}, compiles={self.compiles})"
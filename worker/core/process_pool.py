@@ -0,0 +1,369 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from .browser_pool import BrowserPool
+from .http_client import close_http_client
+from .log import configure_logging
+from .plan import PlanCache
+from .run_log import CURRENT_RUN_LOG, ForwardedRunLog, install_stdout_capture
+from .workflow import Workflow
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashedError(Exception):
+    """Tiến trình worker đang chạy job đã dừng đột ngột quá số lần cho phép."""
+
+
+def _worker_main(index: int, task_queue, result_queue, max_concurrent: int, max_branches: int):
+    """
+    Điểm vào của tiến trình worker: một event loop riêng chạy đến khi nhận tín hiệu dừng.
+    Module này (và các module nó import) không có side effect khi import; với `spawn`, module
+    `__main__` của coordinator cũng được import lại nên phải tạo dịch vụ trong hàm, không ở cấp module.
+    """
+    runtime = _WorkerRuntime(index, result_queue, max_concurrent, max_branches)
+    install_stdout_capture()
+    configure_logging()  # Cấu hình (LOG_FORMAT, LOG_QUIET...) kế thừa qua biến môi trường
+    try:
+        asyncio.run(runtime.serve(task_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+class _WorkerRuntime:
+    """Tài nguyên bên trong một tiến trình worker: browser pool, cache plan và giới hạn đồng thời."""
+
+    def __init__(self, index: int, result_queue, max_concurrent: int, max_branches: int):
+        self.index = index
+        self.result_queue = result_queue
+        self.max_concurrent = max_concurrent
+        self.max_branches = max_branches
+        self.plan_cache = PlanCache()
+        self.browser_pools: Dict[bool, BrowserPool] = {}
+        self.semaphore: Optional[asyncio.Semaphore] = None
+
+    def get_browser_pool(self, headless: bool) -> BrowserPool:
+        if headless not in self.browser_pools:
+            self.browser_pools[headless] = BrowserPool(
+                headless=headless,
+                max_active_contexts=self.max_concurrent
+            )
+        return self.browser_pools[headless]
+
+    async def serve(self, task_queue):
+        loop = asyncio.get_running_loop()
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        tasks = set()
+        self.result_queue.put(('ready', self.index, os.getpid()))
+        try:
+            while True:
+                # Chờ job trên thread phụ để event loop vẫn chạy các workflow đang dở
+                message = await loop.run_in_executor(None, task_queue.get)
+                if message is None:
+                    break
+                task = asyncio.ensure_future(self.run_job(message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for pool in self.browser_pools.values():
+                await pool.close()
+            await close_http_client()
+
+    async def run_job(self, message: Dict):
+        job_id = message['job_id']
+
+        def publish(kind, node_id, node_type, execution_time=None, error=None, timestamp=None):
+            # Sự kiện vòng đời node được chuyển về coordinator và phát lại trên EventBus bên đó
+            self.result_queue.put(('event', job_id, (kind, node_id, node_type, execution_time, error,
+                                                     timestamp or time.time())))
+
+        # Output của lần chạy được chuyển về coordinator để ghi vào log của run
+        log_token = CURRENT_RUN_LOG.set(ForwardedRunLog(
+            lambda *record: self.result_queue.put(('log', job_id, record)), run_id=message.get('run_id')
+        ))
+        outcome = {'success': False, 'error': None, 'summary': None, 'node_results': {}}
+        try:
+            async with self.semaphore:
+                plan = self.plan_cache.get_or_compile(message['json_content'])
+                workflow = Workflow(message['name'], proxy_settings=message.get('proxy_settings'),
+                                    max_branches=self.max_branches, plan=plan)
+                run = workflow.create_run(message.get('initial_context'), run_id=message.get('run_id'),
+                                          publish=publish, browser_settings=message.get('browser_settings'))
+                outcome['success'] = await run.run(
+                    browser_pool=self.get_browser_pool(message.get('headless', True))
+                )
+                outcome['error'] = run.error_message
+                outcome['summary'] = run.get_summary()
+                outcome['node_results'] = run.get_node_results()
+        except Exception as e:
+            outcome['error'] = str(e)
+        finally:
+            CURRENT_RUN_LOG.reset(log_token)
+        self.result_queue.put(('result', job_id, outcome))
+
+
+class _PendingJob:
+    def __init__(self, message: Dict, future: Future, on_node_result: Optional[Callable],
+                 publish: Optional[Callable] = None, run_log=None):
+        self.message = message
+        self.future = future
+        self.on_node_result = on_node_result
+        self.publish = publish
+        self.run_log = run_log
+        self.restarts = 0
+
+
+class _WorkerHandle:
+    def __init__(self, index: int, process, task_queue):
+        self.index = index
+        self.process = process
+        self.task_queue = task_queue
+        self.inflight: Dict[int, _PendingJob] = {}
+        self.started_at = time.time()
+
+
+class WorkerProcessPool:
+    """
+    Chế độ coordinator/worker: N tiến trình worker, mỗi tiến trình có event loop và browser pool riêng,
+    nên việc chạy workflow (print, JSON, Playwright) không tranh GIL với tiến trình web.
+    Coordinator giao job cho worker ít việc nhất qua hàng đợi riêng của worker; kết quả và sự kiện node
+    quay về qua một hàng đợi IPC chung. Worker chết được khởi động lại và các job dở được giao lại.
+    """
+
+    def __init__(self, processes: int = 2, max_concurrent_per_worker: int = 5, max_branches: int = 4,
+                 start_method: str = 'spawn', max_job_restarts: int = 1, monitor_interval: float = 1.0):
+        self.processes = processes
+        self.max_concurrent_per_worker = max_concurrent_per_worker
+        self.max_branches = max_branches
+        self.max_job_restarts = max_job_restarts
+        self.monitor_interval = monitor_interval
+
+        self._ctx = multiprocessing.get_context(start_method)
+        self._result_queue = None
+        self._workers: List[_WorkerHandle] = []
+        self._jobs: Dict[int, _PendingJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._reader: Optional[threading.Thread] = None
+        self._monitor: Optional[threading.Thread] = None
+
+        # Thống kê
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.requeued = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers) and not self._stop_event.is_set()
+
+    def start(self):
+        """Khởi động các tiến trình worker, thread đọc kết quả và thread giám sát (idempotent)."""
+        with self._lock:
+            if self._workers:
+                return
+            self._stop_event.clear()
+            self._result_queue = self._ctx.Queue()
+            self._workers = [self._spawn_worker(index) for index in range(self.processes)]
+
+        self._reader = threading.Thread(target=self._read_results, name="process-pool-reader", daemon=True)
+        self._monitor = threading.Thread(target=self._watch_workers, name="process-pool-monitor", daemon=True)
+        self._reader.start()
+        self._monitor.start()
+        logger.info("🧵 Đã khởi động %s tiến trình worker", self.processes)
+
+    def _spawn_worker(self, index: int) -> _WorkerHandle:
+        task_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, task_queue, self._result_queue,
+                  self.max_concurrent_per_worker, self.max_branches),
+            name=f"workflow-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        return _WorkerHandle(index, process, task_queue)
+
+    def _dispatch(self, job_id: int, job: _PendingJob):
+        """Giao job cho worker còn sống có ít job đang chạy nhất (gọi khi đang giữ lock)."""
+        alive = [worker for worker in self._workers if worker.process.is_alive()] or self._workers
+        worker = min(alive, key=lambda w: len(w.inflight))
+        worker.inflight[job_id] = job
+        worker.task_queue.put(job.message)
+
+    def submit(self, json_content: str, name: str, initial_context: dict = None,
+               proxy_settings: dict = None, headless: bool = True,
+               on_node_result: Callable[[dict], None] = None, run_id: str = None,
+               publish: Callable = None, run_log=None, browser_settings: dict = None) -> Future:
+        """
+        Gửi một lần chạy workflow tới tiến trình worker (thread-safe).
+        Future nhận dict `success`, `error`, `summary`, `node_results`; `on_node_result`
+        được gọi trên thread đọc kết quả với dict NodeResult mỗi khi một node kết thúc,
+        `publish` (xem core.event_bus) nhận mọi sự kiện vòng đời node của lần chạy `run_id`,
+        `run_log` (xem core.run_log.RunLog) nhận output của lần chạy trong tiến trình worker.
+        """
+        if not self.is_running:
+            self.start()
+
+        future = Future()
+        with self._lock:
+            job_id = next(self._ids)
+            message = {
+                'job_id': job_id,
+                'name': name,
+                'json_content': json_content,
+                'initial_context': initial_context,
+                'proxy_settings': proxy_settings,
+                'headless': headless,
+                'run_id': run_id,
+                'browser_settings': browser_settings
+            }
+            job = _PendingJob(message, future, on_node_result, publish, run_log)
+            self._jobs[job_id] = job
+            self.submitted += 1
+            self._dispatch(job_id, job)
+        return future
+
+    async def run(self, json_content: str, name: str, **kwargs) -> Dict:
+        """Phiên bản async của `submit` (chờ trên event loop hiện tại)."""
+        return await asyncio.wrap_future(self.submit(json_content, name, **kwargs))
+
+    def _read_results(self):
+        while True:
+            try:
+                message = self._result_queue.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+
+            kind = message[0]
+            if kind == 'event':
+                _, job_id, event = message
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                try:
+                    if job.publish:
+                        job.publish(*event)
+                    event_kind, node_id, node_type, execution_time, error, _ = event
+                    if job.on_node_result and event_kind != 'node_started':
+                        job.on_node_result({
+                            'node_id': node_id,
+                            'node_type': node_type,
+                            'status': 'completed' if event_kind == 'node_completed' else 'failed',
+                            'execution_time': execution_time,
+                            'error': error
+                        })
+                except Exception as e:
+                    logger.warning("⚠️ WorkerProcessPool: lỗi trong callback sự kiện node: %s", e)
+            elif kind == 'log':
+                _, job_id, record = message
+                job = self._jobs.get(job_id)
+                if job and job.run_log is not None:
+                    job.run_log.append(*record)
+            elif kind == 'result':
+                _, job_id, outcome = message
+                with self._lock:
+                    job = self._jobs.pop(job_id, None)
+                    for worker in self._workers:
+                        worker.inflight.pop(job_id, None)
+                    if job is None:
+                        continue
+                    if outcome['success']:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                if not job.future.done():
+                    job.future.set_result(outcome)
+            elif kind == 'ready':
+                _, index, pid = message
+                logger.info("✅ Worker %s sẵn sàng (pid %s)", index, pid)
+
+    def _watch_workers(self):
+        while not self._stop_event.wait(self.monitor_interval):
+            with self._lock:
+                for index, worker in enumerate(self._workers):
+                    if worker.process.is_alive() or self._stop_event.is_set():
+                        continue
+
+                    logger.warning("⚠️ Worker %s (pid %s) đã dừng với mã %s, đang khởi động lại...",
+                                   index, worker.process.pid, worker.process.exitcode)
+                    orphaned = list(worker.inflight.items())
+                    self._workers[index] = self._spawn_worker(index)
+                    self.restarts += 1
+
+                    for job_id, job in orphaned:
+                        job.restarts += 1
+                        if job.restarts > self.max_job_restarts:
+                            self._jobs.pop(job_id, None)
+                            self.failed += 1
+                            if not job.future.done():
+                                job.future.set_exception(WorkerCrashedError(
+                                    f"Worker dừng đột ngột khi chạy '{job.message['name']}'"
+                                ))
+                        else:
+                            self.requeued += 1
+                            self._dispatch(job_id, job)
+
+    def stop(self, timeout: float = 10):
+        """Dừng các worker (chờ job đang chạy xong trong `timeout` giây) và các thread nền."""
+        if not self._workers:
+            return
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.task_queue.put(None)
+        deadline = time.time() + timeout
+        for worker in self._workers:
+            worker.process.join(max(0.0, deadline - time.time()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(1)
+
+        self._result_queue.put(None)
+        if self._reader:
+            self._reader.join(timeout)
+        if self._monitor:
+            self._monitor.join(timeout)
+
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.future.done():
+                    job.future.set_exception(WorkerCrashedError("Process pool đã dừng"))
+            self._jobs.clear()
+            self._workers = []
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'alive': sum(1 for worker in self._workers if worker.process.is_alive()),
+                'workers': [
+                    {
+                        'index': worker.index,
+                        'pid': worker.process.pid,
+                        'alive': worker.process.is_alive(),
+                        'inflight': len(worker.inflight),
+                        'uptime': time.time() - worker.started_at
+                    }
+                    for worker in self._workers
+                ],
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'restarts': self.restarts,
+                'requeued': self.requeued
+            }
+
+    def __repr__(self):
+        return f"WorkerProcessPool(processes={self.processes}, jobs={len(self._jobs)})"
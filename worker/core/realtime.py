@@ -0,0 +1,225 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class _ClientQueue:
+    """Hàng đợi gửi của một client (sid)."""
+    __slots__ = ('sid', 'rooms', 'items', 'keys', 'in_flight_since', 'dropped')
+
+    def __init__(self, sid: str):
+        self.sid = sid
+        self.rooms: Set[str] = set()
+        self.items: "OrderedDict[int, tuple]" = OrderedDict()  # seq -> (event, data, droppable, key)
+        self.keys: Dict[Hashable, int] = {}  # coalesce key -> seq của bản đang chờ
+        self.in_flight_since: Optional[float] = None  # Lô đã gửi nhưng client chưa xác nhận
+        self.dropped = 0
+
+
+class RealtimeEmitter:
+    """
+    Gửi sự kiện Socket.IO theo room, gom thành lô mỗi `flush_interval` giây.
+
+    Mỗi client có một hàng đợi riêng tối đa `max_queue` sự kiện. Sự kiện có `coalesce_key`
+    (ví dụ trạng thái workflow, tiến độ batch) thay thế bản cũ cùng khóa còn trong hàng đợi.
+    Khi hàng đợi đầy, sự kiện `droppable` (ví dụ sự kiện node) bị bỏ trước; nếu không còn sự
+    kiện nào như vậy thì bỏ sự kiện cũ nhất, nên hàng đợi không bao giờ vượt quá `max_queue`.
+    Client nhận lô qua sự kiện `events` và xác nhận (ack); khi lô trước chưa được xác nhận thì
+    không gửi thêm, nên tab trình duyệt chậm chỉ làm hàng đợi của chính nó bị gộp/cắt bớt.
+    Số sự kiện bị bỏ được báo lại bằng sự kiện `events_dropped` để UI tải lại trạng thái.
+    """
+
+    def __init__(self, socketio, flush_interval: float = 0.1, max_queue: int = 256,
+                 ack_timeout: float = 10.0, batch_event: str = 'events'):
+        self.socketio = socketio
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.ack_timeout = ack_timeout
+        self.batch_event = batch_event
+
+        self._clients: Dict[str, _ClientQueue] = {}
+        self._rooms: Dict[str, Set[str]] = {}
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # Thống kê
+        self.emitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.batches_sent = 0
+        self.events_sent = 0
+        self.ack_timeouts = 0
+
+    # Quản lý client và room
+    def connect(self, sid: str):
+        with self._condition:
+            self._clients.setdefault(sid, _ClientQueue(sid))
+
+    def disconnect(self, sid: str):
+        with self._condition:
+            client = self._clients.pop(sid, None)
+            if client is not None:
+                for room in client.rooms:
+                    members = self._rooms.get(room)
+                    if members is not None:
+                        members.discard(sid)
+                        if not members:
+                            del self._rooms[room]
+
+    def join(self, sid: str, room: str):
+        with self._condition:
+            client = self._clients.setdefault(sid, _ClientQueue(sid))
+            client.rooms.add(room)
+            self._rooms.setdefault(room, set()).add(sid)
+
+    def leave(self, sid: str, room: str):
+        with self._condition:
+            client = self._clients.get(sid)
+            if client is not None:
+                client.rooms.discard(room)
+            members = self._rooms.get(room)
+            if members is not None:
+                members.discard(sid)
+                if not members:
+                    del self._rooms[room]
+
+    # Gửi sự kiện
+    def emit(self, event: str, data, room: str = None, coalesce_key: Hashable = None,
+             droppable: bool = False):
+        """Đưa sự kiện vào hàng đợi của các client trong `room` (mọi client nếu `room=None`)."""
+        with self._condition:
+            sids = self._clients.keys() if room is None else self._rooms.get(room, ())
+            for sid in sids:
+                self._enqueue(self._clients[sid], event, data, coalesce_key, droppable)
+            self.emitted += 1
+            self._condition.notify()
+
+    def _enqueue(self, client: _ClientQueue, event: str, data, key: Hashable, droppable: bool):
+        if key is not None:
+            previous = client.keys.pop(key, None)
+            if previous is not None and client.items.pop(previous, None) is not None:
+                self.coalesced += 1
+
+        if len(client.items) >= self.max_queue:
+            # Hàng đợi đầy: bỏ sự kiện có thể bỏ cũ nhất, rồi đến chính sự kiện mới nếu nó
+            # có thể bỏ, cuối cùng là sự kiện cũ nhất; `events_dropped` báo UI tải lại trạng thái
+            victim = next((seq for seq, item in client.items.items() if item[2]), None)
+            if victim is None and droppable:
+                client.dropped += 1
+                self.dropped += 1
+                return
+            if victim is None:
+                victim = next(iter(client.items))
+            _, _, _, victim_key = client.items.pop(victim)
+            if victim_key is not None:
+                client.keys.pop(victim_key, None)
+            client.dropped += 1
+            self.dropped += 1
+
+        seq = next(self._seq)
+        client.items[seq] = (event, data, droppable, key)
+        if key is not None:
+            client.keys[key] = seq
+
+    def _take_batches(self, now: float) -> list:
+        """Lấy lô cần gửi của các client không có lô đang chờ xác nhận (gọi khi giữ lock)."""
+        batches = []
+        for client in self._clients.values():
+            if client.in_flight_since is not None:
+                if now - client.in_flight_since < self.ack_timeout:
+                    continue
+                self.ack_timeouts += 1  # Mất ack (ví dụ client cũ): cho phép gửi tiếp
+            if not client.items and not client.dropped:
+                continue
+
+            batch = [{'event': event, 'data': data} for event, data, _, _ in client.items.values()]
+            if client.dropped:
+                batch.append({'event': 'events_dropped', 'data': {'count': client.dropped}})
+                client.dropped = 0
+            client.items.clear()
+            client.keys.clear()
+            client.in_flight_since = now
+            batches.append((client.sid, batch))
+        return batches
+
+    def _acknowledge(self, sid: str):
+        with self._condition:
+            client = self._clients.get(sid)
+            if client is not None:
+                client.in_flight_since = None
+                if client.items:
+                    self._condition.notify()
+
+    def flush(self):
+        """Gửi ngay các lô đang chờ."""
+        with self._condition:
+            batches = self._take_batches(time.time())
+        for sid, batch in batches:
+            try:
+                self.socketio.emit(self.batch_event, batch, to=sid,
+                                   callback=lambda *args, sid=sid: self._acknowledge(sid))
+                self.batches_sent += 1
+                self.events_sent += len(batch)
+            except Exception as e:
+                logger.warning("⚠️ RealtimeEmitter: không thể gửi tới %s: %s", sid, e)
+                self._acknowledge(sid)
+
+    def _has_sendable(self) -> bool:
+        return any((client.items or client.dropped) and client.in_flight_since is None
+                   for client in self._clients.values())
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping and not self._has_sendable():
+                    # Vẫn thức dậy định kỳ để xử lý ack bị mất
+                    self._condition.wait(self.ack_timeout)
+                    if any(client.items and client.in_flight_since is not None
+                           and time.time() - client.in_flight_since >= self.ack_timeout
+                           for client in self._clients.values()):
+                        break
+                if self._stopping:
+                    return
+            # Gom các sự kiện đến trong cửa sổ flush_interval thành một lô
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def start(self):
+        """Khởi động thread gửi (idempotent)."""
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="realtime-emitter", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        self.flush()
+
+    def get_stats(self) -> Dict:
+        with self._condition:
+            queued = [len(client.items) for client in self._clients.values()]
+            return {
+                'clients': len(self._clients),
+                'rooms': len(self._rooms),
+                'queued': sum(queued),
+                'max_client_queue': max(queued, default=0),
+                'emitted': self.emitted,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'batches_sent': self.batches_sent,
+                'events_sent': self.events_sent,
+                'ack_timeouts': self.ack_timeouts
+            }
@@ -0,0 +1,224 @@
+import json
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+# Domain analytics / quảng cáo phổ biến (khớp cả subdomain)
+ANALYTICS_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'googlesyndication.com',
+    'doubleclick.net', 'adservice.google.com', 'facebook.net', 'hotjar.com', 'clarity.ms',
+    'segment.io', 'segment.com', 'mixpanel.com', 'amplitude.com', 'fullstory.com', 'nr-data.net',
+    'scorecardresearch.com', 'quantserve.com', 'criteo.com', 'taboola.com', 'outbrain.com'
+)
+
+MEDIA_TYPES = ('image', 'media', 'font')
+
+# Profile có sẵn; cấu hình tùy chỉnh được cộng thêm vào profile đã chọn
+PROFILES = {
+    'none': {},
+    'media': {'resource_types': MEDIA_TYPES},
+    'analytics': {'block_domains': ANALYTICS_DOMAINS},
+    'lean': {'resource_types': MEDIA_TYPES, 'block_domains': ANALYTICS_DOMAINS},
+}
+
+# Kích thước trung bình ước lượng (byte) theo loại tài nguyên, để ước tính dung lượng tiết kiệm
+# (request bị chặn không có response để đo)
+ESTIMATED_BYTES = {
+    'image': 40_000, 'media': 500_000, 'font': 30_000, 'script': 25_000, 'stylesheet': 12_000,
+    'xhr': 3_000, 'fetch': 3_000, 'document': 30_000
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+_HOST_CACHE_SIZE = 4096
+
+
+def _glob_regex(patterns: Iterable[str]) -> Optional['re.Pattern']:
+    """Gộp các URL glob (cú pháp của Playwright: `**` khớp mọi ký tự, `*` không khớp `/`) thành một regex."""
+    parts = []
+    for pattern in patterns:
+        regex = ''
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**', i):
+                regex += '.*'
+                i += 2
+                continue
+            char = pattern[i]
+            regex += '[^/]*' if char == '*' else '.' if char == '?' else re.escape(char)
+            i += 1
+        parts.append(f'(?:{regex})')
+    return re.compile('|'.join(parts)) if parts else None
+
+
+class BlockingRules:
+    """
+    Luật chặn request đã biên dịch. Domain được lưu trong frozenset (khớp domain và mọi subdomain
+    bằng tra cứu theo từng hậu tố) và kết quả theo host được cache, nên mỗi request tốn O(1);
+    các URL glob được gộp thành một regex. Allowlist luôn được ưu tiên.
+    """
+
+    def __init__(self, resource_types: Iterable[str] = (), block_domains: Iterable[str] = (),
+                 block_urls: Iterable[str] = (), allow_domains: Iterable[str] = (),
+                 allow_urls: Iterable[str] = ()):
+        self.resource_types = frozenset(resource_types)
+        self.block_domains = frozenset(domain.lower().lstrip('.') for domain in block_domains)
+        self.allow_domains = frozenset(domain.lower().lstrip('.') for domain in allow_domains)
+        self.block_urls = _glob_regex(block_urls)
+        self.allow_urls = _glob_regex(allow_urls)
+        self._hosts: Dict[str, Optional[bool]] = {}  # host -> True (chặn), False (cho phép), None
+
+    @property
+    def empty(self) -> bool:
+        return not (self.resource_types or self.block_domains or self.block_urls)
+
+    @staticmethod
+    def _in_domains(host: str, domains: frozenset) -> bool:
+        while True:
+            if host in domains:
+                return True
+            dot = host.find('.')
+            if dot < 0:
+                return False
+            host = host[dot + 1:]
+
+    def _host_rule(self, host: str) -> Optional[bool]:
+        rule = self._hosts.get(host, ...)
+        if rule is ...:
+            if self._in_domains(host, self.allow_domains):
+                rule = False
+            elif self._in_domains(host, self.block_domains):
+                rule = True
+            else:
+                rule = None
+            if len(self._hosts) >= _HOST_CACHE_SIZE:
+                self._hosts.clear()
+            self._hosts[host] = rule
+        return rule
+
+    def match(self, url: str, resource_type: str) -> Optional[str]:
+        """Lý do chặn request (`type`, `domain`, `url`) hoặc None nếu cho phép."""
+        host_rule = self._host_rule(urlsplit(url).hostname or '')
+        if host_rule is False or (self.allow_urls is not None and self.allow_urls.fullmatch(url)):
+            return None
+        if resource_type in self.resource_types:
+            return 'type'
+        if host_rule:
+            return 'domain'
+        if self.block_urls is not None and self.block_urls.fullmatch(url):
+            return 'url'
+        return None
+
+
+_FIELDS = ('resource_types', 'block_domains', 'block_urls', 'allow_domains', 'allow_urls')
+
+
+def _string_list(name: str, value) -> tuple:
+    """Giá trị của một tùy chọn: list các chuỗi khác rỗng (domain không tính dấu `.` ở đầu)."""
+    if value is None:
+        return ()
+    if not isinstance(value, list):
+        raise ValueError(f"Tùy chọn chặn request '{name}' phải là list các chuỗi")
+    for item in value:
+        if not isinstance(item, str):
+            raise ValueError(f"Tùy chọn chặn request '{name}' phải là list các chuỗi: {item!r}")
+        if not (item.lstrip('.') if name.endswith('_domains') else item):
+            raise ValueError(f"Tùy chọn chặn request '{name}' chứa giá trị rỗng")
+    return tuple(value)
+
+
+@lru_cache(maxsize=64)
+def _compile(key: str) -> BlockingRules:
+    config = json.loads(key)
+    if isinstance(config, str):
+        config = {'profile': config}
+    if not isinstance(config, dict):
+        raise ValueError("Cấu hình chặn request phải là tên profile hoặc object")
+    profile_name = config.get('profile', 'none')
+    if not isinstance(profile_name, str) or profile_name not in PROFILES:
+        raise ValueError(f"Profile chặn request không hợp lệ: {profile_name} (hỗ trợ: {', '.join(PROFILES)})")
+    profile = PROFILES[profile_name]
+    for name in config:
+        if name != 'profile' and name not in _FIELDS:
+            raise ValueError(f"Tùy chọn chặn request không hợp lệ: {name}")
+    return BlockingRules(**{
+        name: tuple(profile.get(name, ())) + _string_list(name, config.get(name)) for name in _FIELDS
+    })
+
+
+def compile_blocking_rules(browser_settings: Optional[dict]) -> Optional[BlockingRules]:
+    """
+    Luật chặn từ `browser_settings['request_blocking']`: tên profile (none, media, analytics, lean)
+    hoặc dict `{profile, resource_types, block_domains, block_urls, allow_domains, allow_urls}`.
+    None nếu không chặn gì; ValueError nếu cấu hình không hợp lệ.
+    """
+    if browser_settings is not None and not isinstance(browser_settings, dict):
+        raise ValueError("browser_settings phải là object")
+    config = (browser_settings or {}).get('request_blocking')
+    if not config:
+        return None
+    rules = _compile(json.dumps(config, sort_keys=True))
+    return None if rules.empty else rules
+
+
+class RequestBlocker:
+    """Chặn request của một lần chạy theo BlockingRules và thống kê số request / dung lượng đã tiết kiệm."""
+
+    def __init__(self, rules: BlockingRules):
+        self.rules = rules
+        self.allowed = 0
+        self.blocked = 0
+        self.bytes_saved = 0
+        self.by_type: Dict[str, int] = {}
+        self.by_reason: Dict[str, int] = {}
+        self.by_domain: Dict[str, int] = {}
+
+    async def attach(self, context):
+        """Bắt mọi request của BrowserContext (các page mới trong context cũng được áp dụng)."""
+        await context.route('**/*', self._handle)
+
+    async def _handle(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        reason = self.rules.match(request.url, resource_type)
+        if reason is None:
+            self.allowed += 1
+            await route.fallback()
+            return
+        self.blocked += 1
+        self.bytes_saved += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        self.by_type[resource_type] = self.by_type.get(resource_type, 0) + 1
+        self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+        host = urlsplit(request.url).hostname or ''
+        self.by_domain[host] = self.by_domain.get(host, 0) + 1
+        await route.abort('blockedbyclient')
+
+    def get_stats(self) -> Dict:
+        top_domains = sorted(self.by_domain.items(), key=lambda item: item[1], reverse=True)[:10]
+        return {
+            'allowed': self.allowed,
+            'blocked': self.blocked,
+            'estimated_bytes_saved': self.bytes_saved,
+            'by_type': dict(self.by_type),
+            'by_reason': dict(self.by_reason),
+            'top_domains': dict(top_domains)
+        }
+
+
+# Tổng của mọi lần chạy trong tiến trình (cho /api/engine/stats)
+_totals_lock = threading.Lock()
+_totals = {'runs': 0, 'allowed': 0, 'blocked': 0, 'estimated_bytes_saved': 0}
+
+
+def record_run(stats: Dict):
+    """Cộng thống kê (`RequestBlocker.get_stats()`) của một lần chạy vào tổng của tiến trình."""
+    with _totals_lock:
+        _totals['runs'] += 1
+        for name in ('allowed', 'blocked', 'estimated_bytes_saved'):
+            _totals[name] += stats.get(name, 0)
+
+
+def get_blocking_stats() -> Dict:
+    with _totals_lock:
+        return dict(_totals)
@@ -0,0 +1,320 @@
+import gzip
+import json
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Log của lần chạy và node đang thực thi trong task hiện tại (asyncio sao chép context cho task con,
+# nên các nhánh song song của DagExecutor ghi vào đúng log của lần chạy)
+CURRENT_RUN_LOG: ContextVar = ContextVar('current_run_log', default=None)
+CURRENT_NODE_ID: ContextVar = ContextVar('current_node_id', default=None)
+
+
+@dataclass(slots=True)
+class LogRecord:
+    """Một dòng log có cấu trúc của một lần chạy."""
+    offset: int  # Số thứ tự trong log của lần chạy, bắt đầu từ 0
+    timestamp: float
+    level: str  # info, warning, error
+    node_id: Optional[str]
+    message: str
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def infer_level(message: str) -> str:
+    """Mức log của một dòng print (theo emoji quy ước trong engine)."""
+    if message.startswith(('❌', '🚨')):
+        return 'error'
+    if message.startswith('⚠️'):
+        return 'warning'
+    return 'info'
+
+
+class _LineWriter(ABC):
+    """Nhận văn bản từ stdout và gọi `append` (do lớp con cài đặt) cho mỗi dòng hoàn chỉnh."""
+    _partial = ''  # Phần dòng print chưa kết thúc
+
+    def write(self, text: str):
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        node_id = CURRENT_NODE_ID.get()
+        for line in lines:
+            if line.strip():
+                self.append(infer_level(line), line, node_id)
+
+    @abstractmethod
+    def append(self, level: str, message: str, node_id: str = None, timestamp: float = None):
+        pass
+
+
+class ForwardedRunLog(_LineWriter):
+    """Log lần chạy trong tiến trình worker: mỗi dòng được chuyển qua `sink` về coordinator."""
+
+    def __init__(self, sink, run_id: str = None):
+        self.sink = sink
+        self.run_id = run_id
+
+    def append(self, level: str, message: str, node_id: str = None, timestamp: float = None):
+        self.sink(level, message, node_id, timestamp or time.time())
+
+
+class RunLog(_LineWriter):
+    """
+    Log của một lần chạy trong một ring buffer cố định `capacity` dòng.
+    Khi buffer đầy, `spill_batch` dòng cũ nhất được nén thành một gzip member và ghi nối vào
+    `spill_path`; chỉ mục (offset đầu, vị trí, độ dài) cho phép đọc lại từ offset bất kỳ.
+    """
+
+    def __init__(self, run_id: str, spill_path: Path, capacity: int = 1000, spill_batch: int = 250,
+                 meta: Dict = None):
+        self.run_id = run_id
+        self.spill_path = spill_path
+        self.capacity = capacity
+        self.spill_batch = max(1, min(spill_batch, capacity))
+        self.meta = dict(meta or {})
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+        self._records: deque = deque()
+        self._chunks: List[tuple] = []  # (offset đầu, vị trí trong file, độ dài) của các phần đã ghi ra file
+        self._next_offset = 0
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def next_offset(self) -> int:
+        return self._next_offset
+
+    def append(self, level: str, message: str, node_id: str = None, timestamp: float = None) -> LogRecord:
+        with self._condition:
+            record = LogRecord(self._next_offset, timestamp or time.time(), level, node_id, message)
+            self._next_offset += 1
+            self._records.append(record)
+            if len(self._records) > self.capacity:
+                self._spill(self.spill_batch)
+            self._condition.notify_all()
+            return record
+
+    def _spill(self, count: int):
+        """Ghi `count` dòng cũ nhất ra file nén (gọi khi đang giữ lock)."""
+        records = [self._records.popleft() for _ in range(min(count, len(self._records)))]
+        if not records:
+            return
+        data = gzip.compress(''.join(
+            json.dumps(record.to_dict(), ensure_ascii=False, separators=(',', ':')) + '\n' for record in records
+        ).encode('utf-8'))
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, 'ab') as f:
+            position = f.tell()
+            f.write(data)
+        self._chunks.append((records[0].offset, position, len(data)))
+
+    def _read_chunk(self, position: int, length: int) -> List[LogRecord]:
+        try:
+            with open(self.spill_path, 'rb') as f:
+                f.seek(position)
+                data = f.read(length)
+        except FileNotFoundError:
+            return []
+        return [LogRecord(**json.loads(line)) for line in gzip.decompress(data).decode('utf-8').splitlines()]
+
+    def read(self, offset: int = 0, limit: int = 500) -> List[LogRecord]:
+        """Các dòng có offset >= `offset` (tối đa `limit`), đọc từ file nếu đã bị đẩy khỏi buffer."""
+        with self._condition:
+            records = list(self._records)
+            chunks = list(self._chunks)
+        result: List[LogRecord] = []
+        first_in_memory = records[0].offset if records else self._next_offset
+        if offset < first_in_memory:
+            for index, (chunk_offset, position, length) in enumerate(chunks):
+                chunk_end = chunks[index + 1][0] if index + 1 < len(chunks) else first_in_memory
+                if chunk_end <= offset:
+                    continue
+                result.extend(r for r in self._read_chunk(position, length) if r.offset >= offset)
+                if len(result) >= limit:
+                    return result[:limit]
+        result.extend(r for r in records if r.offset >= offset)
+        return result[:limit]
+
+    def wait(self, offset: int, timeout: float) -> bool:
+        """Chờ tới khi có dòng mới sau `offset` hoặc lần chạy kết thúc; trả về True nếu có dòng mới."""
+        with self._condition:
+            if self._next_offset <= offset and not self.finished:
+                self._condition.wait(timeout)
+            return self._next_offset > offset
+
+    def finish(self):
+        with self._condition:
+            if self._partial.strip():
+                line, self._partial = self._partial, ''
+                self.append(infer_level(line), line)
+            self.finished_at = time.time()
+            self._condition.notify_all()
+
+    def spill_all(self):
+        """Ghi toàn bộ buffer ra file (trước khi bỏ log khỏi bộ nhớ)."""
+        with self._condition:
+            self._spill(len(self._records))
+
+    def get_summary(self) -> Dict:
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'lines': self._next_offset,
+            'in_memory': len(self._records),
+            **self.meta
+        }
+
+
+class _RunLogStream:
+    """Thay thế sys.stdout: ghi ra stdout gốc và sao chép vào log của lần chạy hiện tại (nếu có)."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text: str):
+        run_log = CURRENT_RUN_LOG.get()
+        if run_log is not None:
+            try:
+                run_log.write(text)
+            except Exception:
+                pass
+        return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def install_stdout_capture():
+    """Cài đặt sao chép stdout vào log lần chạy (idempotent)."""
+    if not isinstance(sys.stdout, _RunLogStream):
+        sys.stdout = _RunLogStream(sys.stdout)
+
+
+class RunLogManager:
+    """
+    Quản lý log của các lần chạy: log đang chạy luôn nằm trong bộ nhớ, tối đa `max_runs` log đã
+    kết thúc được giữ lại (LRU); log bị loại được ghi hết ra `<log_dir>/<run_id>.jsonl.gz` và
+    vẫn đọc được từ file. File cũ hơn `retain_days` ngày bị xóa, nên bộ nhớ và dung lượng
+    đĩa không tăng theo thời gian hoạt động.
+    """
+
+    def __init__(self, log_dir='run_logs', capacity: int = 1000, max_runs: int = 200,
+                 retain_days: float = 7, cleanup_interval: float = 3600):
+        self.log_dir = Path(log_dir)
+        self.capacity = capacity
+        self.max_runs = max_runs
+        self.retain_days = retain_days
+        self.cleanup_interval = cleanup_interval
+
+        self._lock = threading.Lock()
+        self._active: Dict[str, RunLog] = {}
+        self._finished: "OrderedDict[str, RunLog]" = OrderedDict()
+        self._last_cleanup = 0.0
+
+        # Thống kê
+        self.runs = 0
+        self.evicted = 0
+        self.files_removed = 0
+
+    def _path(self, run_id: str) -> Path:
+        # run_id đến từ URL: chỉ giữ ký tự an toàn cho tên file
+        safe = ''.join(c for c in run_id if c.isalnum() or c in '-_')
+        return self.log_dir / f"{safe}.jsonl.gz"
+
+    def open(self, run_id: str, **meta) -> RunLog:
+        """Tạo log cho một lần chạy mới."""
+        run_log = RunLog(run_id, self._path(run_id), self.capacity, meta=meta)
+        with self._lock:
+            self._active[run_id] = run_log
+            self.runs += 1
+        return run_log
+
+    def finish(self, run_id: str):
+        """Đánh dấu lần chạy kết thúc và loại các log cũ khỏi bộ nhớ nếu vượt `max_runs`."""
+        with self._lock:
+            run_log = self._active.pop(run_id, None)
+            if run_log is None:
+                return
+            self._finished[run_id] = run_log
+            evicted = []
+            while len(self._finished) > self.max_runs:
+                evicted.append(self._finished.popitem(last=False)[1])
+        run_log.finish()
+        for old in evicted:
+            old.spill_all()
+            self.evicted += 1
+        self._cleanup()
+
+    @contextmanager
+    def capture(self, run_id: str, **meta):
+        """Ghi mọi print trong task hiện tại (và task con) vào log của lần chạy `run_id`."""
+        run_log = self.open(run_id, **meta)
+        token = CURRENT_RUN_LOG.set(run_log)
+        try:
+            yield run_log
+        finally:
+            CURRENT_RUN_LOG.reset(token)
+            self.finish(run_id)
+
+    def get(self, run_id: str) -> Optional[RunLog]:
+        with self._lock:
+            return self._active.get(run_id) or self._finished.get(run_id)
+
+    def read(self, run_id: str, offset: int = 0, limit: int = 500) -> Optional[List[LogRecord]]:
+        """Đọc log từ `offset`; None nếu không có log của lần chạy này."""
+        run_log = self.get(run_id)
+        if run_log is not None:
+            return run_log.read(offset, limit)
+
+        path = self._path(run_id)
+        if not path.exists():
+            return None
+        records = []
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record['offset'] >= offset:
+                    records.append(LogRecord(**record))
+                    if len(records) >= limit:
+                        break
+        return records
+
+    def _cleanup(self):
+        now = time.time()
+        if now - self._last_cleanup < self.cleanup_interval or not self.log_dir.exists():
+            return
+        self._last_cleanup = now
+        cutoff = now - self.retain_days * 86400
+        for path in self.log_dir.glob("*.jsonl.gz"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    self.files_removed += 1
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            active, finished = len(self._active), len(self._finished)
+        return {
+            'active_runs': active,
+            'finished_in_memory': finished,
+            'capacity_per_run': self.capacity,
+            'runs': self.runs,
+            'evicted': self.evicted,
+            'files_removed': self.files_removed
+        }
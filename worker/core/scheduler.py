@@ -0,0 +1,170 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _ScheduleEntry:
+    __slots__ = ('key', 'schedule', 'payload', 'jitter', 'version', 'next_fire', 'fired')
+
+    def __init__(self, key, schedule, payload, jitter, version, next_fire):
+        self.key = key
+        self.schedule = schedule
+        self.payload = payload
+        self.jitter = jitter
+        self.version = version
+        self.next_fire = next_fire
+        self.fired = 0
+
+
+class Scheduler:
+    """
+    Bộ lập lịch dùng heap thời điểm chạy kế tiếp: thread nền chỉ ngủ tới lịch gần nhất
+    thay vì duyệt mọi lịch mỗi nhịp, nên chi phí mỗi lần chạy là O(log n) với n lịch.
+    Cập nhật hoặc xóa lịch không sửa heap mà tăng `version`; mục cũ bị bỏ qua khi lấy ra.
+
+    Khi đến hạn, `on_due(key, payload, fire_at, delay)` được gọi ngoài lock; `delay` là độ trễ
+    ngẫu nhiên (jitter) để các lịch trùng giờ không cùng lúc dồn vào hàng đợi.
+    """
+
+    def __init__(self, on_due: Callable, max_jitter: float = 30.0, jitter_ratio: float = 0.1):
+        self.on_due = on_due
+        self.max_jitter = max_jitter
+        self.jitter_ratio = jitter_ratio
+
+        self._entries: Dict[Hashable, _ScheduleEntry] = {}
+        self._heap: List[tuple] = []
+        self._versions = itertools.count(1)
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # Thống kê
+        self.fired = 0
+        self.errors = 0
+
+    def set(self, key: Hashable, schedule, payload=None, jitter: float = None, now: float = None):
+        """Thêm hoặc thay thế lịch `key`; `schedule=None` sẽ xóa lịch."""
+        if schedule is None:
+            self.remove(key)
+            return
+
+        next_fire = schedule.next_fire(now if now is not None else time.time())
+        with self._condition:
+            entry = _ScheduleEntry(key, schedule, payload, jitter, next(self._versions), next_fire)
+            self._entries[key] = entry
+            self._push(entry)
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._compact()
+            # Đánh thức thread nếu lịch mới đến hạn sớm hơn lịch đang chờ
+            if self._heap[0][1] == entry.version:
+                self._condition.notify()
+
+    def remove(self, key: Hashable) -> bool:
+        with self._condition:
+            return self._entries.pop(key, None) is not None
+
+    def sync(self, schedules: Dict[Hashable, tuple]):
+        """
+        Đồng bộ toàn bộ lịch với `{key: (schedule, payload)}`: lịch không còn bị xóa,
+        lịch có cùng biểu thức được giữ nguyên thời điểm chạy kế tiếp.
+        """
+        with self._condition:
+            for key in list(self._entries):
+                if key not in schedules:
+                    del self._entries[key]
+
+        for key, (schedule, payload) in schedules.items():
+            current = self._entries.get(key)
+            if current is not None and repr(current.schedule) == repr(schedule):
+                current.payload = payload
+                continue
+            self.set(key, schedule, payload)
+
+    def _push(self, entry: _ScheduleEntry):
+        heapq.heappush(self._heap, (entry.next_fire, entry.version, entry.key))
+
+    def _compact(self):
+        """Dựng lại heap chỉ với các mục còn hiệu lực (gọi khi đang giữ lock)."""
+        self._heap = [(entry.next_fire, entry.version, entry.key) for entry in self._entries.values()]
+        heapq.heapify(self._heap)
+
+    def _jitter(self, entry: _ScheduleEntry, fire_at: float) -> float:
+        if entry.jitter is not None:
+            limit = entry.jitter
+        else:
+            # Không vượt quá một phần nhỏ chu kỳ để lịch dày (ví dụ mỗi 10 giây) không bị trễ nhịp
+            limit = min(self.max_jitter, (entry.next_fire - fire_at) * self.jitter_ratio)
+        return random.uniform(0, limit) if limit > 0 else 0.0
+
+    def _pop_due(self, now: float) -> List[tuple]:
+        """Lấy các lịch đến hạn và đẩy lần chạy kế tiếp vào heap (gọi khi đang giữ lock)."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, version, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                continue  # Lịch đã bị xóa hoặc thay thế
+
+            # Lịch lỡ nhiều nhịp (ví dụ máy ngủ) chỉ chạy bù một lần
+            entry.next_fire = entry.schedule.next_fire(max(fire_at, now))
+            entry.fired += 1
+            self._push(entry)
+            due.append((entry.key, entry.payload, fire_at, self._jitter(entry, fire_at)))
+        return due
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    now = time.time()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+                due = self._pop_due(time.time())
+
+            for key, payload, fire_at, delay in due:
+                try:
+                    self.on_due(key, payload, fire_at, delay)
+                    self.fired += 1
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning("⚠️ Scheduler: lỗi khi chạy lịch %s: %s", key, e)
+
+    def start(self):
+        """Khởi động thread lập lịch (idempotent)."""
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        with self._condition:
+            upcoming = min((entry.next_fire for entry in self._entries.values()), default=None)
+            return {
+                'schedules': len(self._entries),
+                'heap_size': len(self._heap),
+                'fired': self.fired,
+                'errors': self.errors,
+                'next_fire_in': max(0.0, upcoming - time.time()) if upcoming is not None else None
+            }
+
+    def __repr__(self):
+        return f"Scheduler(schedules={len(self._entries)})"
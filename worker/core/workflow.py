@@ -1,159 +1,84 @@
-import json
-import time
+import logging
 from datetime import datetime
-from playwright.async_api import async_playwright
-from .node import Node
-from states.workflow_states import PendingState, RunningState, CompletedState, FailedState
+from .dag_executor import DagExecutor
+from .plan import ExecutionPlan, compile_workflow
+from .workflow_run import WorkflowRun
+from states.workflow_states import PendingState
+
+logger = logging.getLogger(__name__)
 
 class Workflow:
     """
-    Đại diện cho một workflow với khả năng quản lý trạng thái và thực thi đồng thời.
-    Áp dụng State Pattern để quản lý vòng đời của workflow.
+    Định nghĩa workflow chỉ đọc, dựng từ một ExecutionPlan dùng chung.
+    Trạng thái thực thi nằm trong từng WorkflowRun (State Pattern áp dụng cho mỗi lần chạy),
+    nên một định nghĩa có thể chạy nhiều bản đồng thời và chạy lại mà không cần reset.
     """
     
-    def __init__(self, name: str, workflow_data: dict, proxy_settings: dict = None):
+    def __init__(self, name: str, workflow_data: dict = None, proxy_settings: dict = None,
+                 max_branches: int = 4, plan: ExecutionPlan = None, browser_settings: dict = None):
         self.name = name
         self.proxy_settings = proxy_settings
-        self.nodes = {}
-        self.start_node_id = None
-        self.state = PendingState()
-        self.context = {}  # Shared context giữa các nodes
+        self.browser_settings = browser_settings  # Ví dụ cấu hình chặn request (xem core.request_blocking)
+        self.max_branches = max_branches
         
         # Metadata
         self.created_at = datetime.now()
-        self.last_run_at = None
-        self.execution_time = None
-        self.error_message = None
+        self.last_run = None  # WorkflowRun gần nhất (để báo cáo trạng thái)
         
-        # Build workflow graph
-        self._build_graph(workflow_data)
+        # Build workflow graph (hoặc dùng plan đã biên dịch sẵn từ cache)
+        if plan is None:
+            if workflow_data is None:
+                raise ValueError("Cần cung cấp workflow_data hoặc plan.")
+            plan = compile_workflow(workflow_data)
+        self._use_plan(plan)
 
-    def _build_graph(self, workflow_data: dict):
-        """Xây dựng đồ thị các node và kết nối từ dữ liệu JSON."""
-        # Tạo tất cả các node
-        nodes_data = workflow_data.get('nodes', [])
-        if not nodes_data:
-            raise ValueError("Workflow phải có ít nhất một node.")
-        
-        for node_data in nodes_data:
-            node = Node(node_data)
-            self.nodes[node.id] = node
-            
-            # Tìm start node
-            if node.type == 'start':
-                if self.start_node_id:
-                    raise ValueError("Workflow chỉ được phép có một Start Node.")
-                self.start_node_id = node.id
-        
-        if not self.start_node_id:
-            raise ValueError("Workflow phải có một Start Node.")
+    def _use_plan(self, plan: ExecutionPlan):
+        """Gắn đồ thị node và bộ lập lịch DAG từ plan đã biên dịch."""
+        self.plan = plan
+        self.nodes = plan.nodes
+        self.start_node_id = plan.start_node_id
+        self.executor = DagExecutor(
+            plan.nodes, plan.start_node_id, self.max_branches,
+            successors=plan.successors, in_degree=plan.in_degree
+        )
 
-        # Thêm các kết nối
-        connections = workflow_data.get('connections', [])
-        for conn in connections:
-            from_node = self.nodes.get(conn['fromNode'])
-            if from_node:
-                from_port = conn.get('fromPort', 'out')
-                to_node_id = conn['toNode']
-                from_node.add_connection(from_port, to_node_id)
+    @property
+    def state(self):
+        """Trạng thái của lần chạy gần nhất (Pending nếu chưa từng chạy)."""
+        return self.last_run.state if self.last_run else PendingState()
 
-    def can_run(self) -> bool:
-        """Kiểm tra xem workflow có thể chạy không dựa trên trạng thái hiện tại."""
-        return self.state.can_run()
+    @property
+    def last_run_at(self):
+        return self.last_run.started_at if self.last_run else None
 
-    async def run(self):
-        """Chạy workflow với Playwright và proxy (nếu có)."""
-        if not self.can_run():
-            print(f"❌ Không thể chạy workflow '{self.name}' vì trạng thái hiện tại là {self.state}.")
-            return False
+    @property
+    def execution_time(self):
+        return self.last_run.execution_time if self.last_run else None
 
-        # Chuyển sang trạng thái Running
-        self.state = self.state.get_next_state(True)
-        self.last_run_at = datetime.now()
-        start_time = time.time()
-        
-        # Reset tất cả nodes
-        for node in self.nodes.values():
-            node.reset()
-        
-        # Clear context
-        self.context.clear()
-        
-        print(f"🚀 Bắt đầu thực thi workflow: {self.name}")
-        
-        success = False
-        browser = None
-        
-        try:
-            async with async_playwright() as p:
-                # Khởi tạo browser với proxy settings nếu có
-                launch_options = {
-                    'headless': False,  # Đặt là True để chạy ẩn
-                    'args': ['--no-sandbox', '--disable-setuid-sandbox']
-                }
-                
-                if self.proxy_settings:
-                    launch_options['proxy'] = self.proxy_settings
-                
-                browser = await p.chromium.launch(**launch_options)
-                page = await browser.new_page()
+    @property
+    def error_message(self):
+        return self.last_run.error_message if self.last_run else None
 
-                # Thiết lập user agent nếu có trong proxy settings
-                if self.proxy_settings and self.proxy_settings.get('userAgent'):
-                    await page.set_extra_http_headers({
-                        'User-Agent': self.proxy_settings['userAgent']
-                    })
-
-                # Thực thi workflow
-                current_node = self.nodes.get(self.start_node_id)
-                executed_nodes = set()
-                
-                while current_node:
-                    # Kiểm tra vòng lặp vô tận
-                    if current_node.id in executed_nodes and current_node.type != 'forEach':
-                        print(f"⚠️ Phát hiện vòng lặp tại node {current_node.id}")
-                        break
-                    
-                    executed_nodes.add(current_node.id)
-                    
-                    # Thực thi node hiện tại
-                    await current_node.execute(page, self.context)
-                    
-                    # Dừng nếu là stop node
-                    if current_node.type == 'stop':
-                        break
-                    
-                    # Tìm node tiếp theo
-                    next_node_id = current_node.get_next_node_id()
-                    if not next_node_id:
-                        print("🏁 Không tìm thấy node tiếp theo, kết thúc workflow.")
-                        break
-                    
-                    current_node = self.nodes.get(next_node_id)
-                    if not current_node:
-                        print(f"❌ Không tìm thấy node với ID: {next_node_id}")
-                        break
+    def can_run(self) -> bool:
+        """
+        Định nghĩa workflow luôn có thể tạo lần chạy mới (kể cả khi đang có lần chạy khác);
+        máy trạng thái được áp dụng cho từng WorkflowRun.
+        """
+        return True
 
-                success = True
-                print(f"✅ Workflow '{self.name}' hoàn thành thành công!")
-                
-        except Exception as e:
-            self.error_message = str(e)
-            print(f"🚨 Lỗi xảy ra khi chạy workflow '{self.name}': {e}")
-            success = False
-            
-        finally:
-            if browser:
-                await browser.close()
-            
-            # Cập nhật thời gian thực thi và trạng thái
-            self.execution_time = time.time() - start_time
-            self.state = self.state.get_next_state(success)
-            
-            status_emoji = "✅" if success else "❌"
-            print(f"{status_emoji} Workflow '{self.name}' kết thúc với trạng thái: {self.state} (Thời gian: {self.execution_time:.2f}s)")
+    def create_run(self, initial_context: dict = None, proxy_settings: dict = None,
+                   on_node_result=None, run_id: str = None, publish=None,
+                   browser_settings: dict = None) -> WorkflowRun:
+        """Tạo một lần chạy mới từ định nghĩa dùng chung."""
+        return WorkflowRun(self, initial_context, proxy_settings, run_id=run_id,
+                           on_node_result=on_node_result, publish=publish,
+                           browser_settings=browser_settings)
 
-        return success
+    async def run(self, browser_pool=None, initial_context: dict = None) -> bool:
+        """Tạo và chạy một WorkflowRun mới, ghi nhận nó là lần chạy gần nhất."""
+        run = self.create_run(initial_context)
+        self.last_run = run
+        return await run.run(browser_pool)
 
     def get_summary(self) -> dict:
         """Trả về tóm tắt thông tin của workflow."""
@@ -170,14 +95,9 @@ class Workflow:
         }
 
     def reset(self):
-        """Reset workflow về trạng thái ban đầu."""
-        self.state = PendingState()
-        self.context.clear()
-        self.error_message = None
-        self.execution_time = None
-        for node in self.nodes.values():
-            node.reset()
-        print(f"🔄 Workflow '{self.name}' đã được reset về trạng thái Pending.")
+        """Reset workflow về trạng thái ban đầu (quên lần chạy gần nhất)."""
+        self.last_run = None
+        logger.info("🔄 Workflow '%s' đã được reset về trạng thái Pending.", self.name)
 
     def __repr__(self):
-        return f"Workflow(name={self.name}, state={self.state}, nodes={len(self.nodes)})"
\ No newline at end of file
+        return f"Workflow(name={self.name}, state={self.state}, nodes={len(self.nodes)})"
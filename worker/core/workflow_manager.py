@@ -1,11 +1,20 @@
 import asyncio
 import json
+import logging
 import os
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
 from .workflow import Workflow
-from states.workflow_states import PendingState, RunningState
+from .workflow_run import WorkflowRun
+from .browser_pool import BrowserPool
+from .http_client import close_http_client
+from .plan import PlanCache
+from .directory_sync import DirectoryManifest, DirectoryWatcher, ManifestScan
+from states.workflow_states import PendingState
+
+logger = logging.getLogger(__name__)
 
 class WorkflowManager:
     """
@@ -13,14 +22,32 @@ class WorkflowManager:
     Hỗ trợ tải workflow từ file JSON và quản lý proxy settings.
     """
     
-    def __init__(self, max_concurrent_workflows: int = 5):
+    def __init__(self, max_concurrent_workflows: int = 5, headless: bool = False,
+                 browser_pool: Optional[BrowserPool] = None, max_branches_per_run: int = 4):
+        # Copy-on-write: dict không bao giờ bị sửa tại chỗ, mỗi thay đổi gán một dict mới (dưới
+        # `_workflows_lock`) nên thread đang duyệt dict cũ (watcher, API) không bị ảnh hưởng
         self.workflows: Dict[str, Workflow] = {}
+        self._workflows_lock = threading.Lock()
         self.max_concurrent_workflows = max_concurrent_workflows
-        self.running_workflows: set = set()
+        self.max_branches_per_run = max_branches_per_run
+        self.active_runs: Dict[str, WorkflowRun] = {}  # run_id -> WorkflowRun đang chạy
         self.workflow_results: Dict[str, bool] = {}
         
         # Semaphore để giới hạn số workflow chạy đồng thời
         self._semaphore = asyncio.Semaphore(max_concurrent_workflows)
+        
+        # Pool browser dùng chung: mỗi lần chạy thuê một BrowserContext thay vì khởi động Chromium
+        self.browser_pool = browser_pool or BrowserPool(
+            headless=headless,
+            max_active_contexts=max_concurrent_workflows
+        )
+        
+        # Cache plan đã biên dịch theo hash nội dung JSON
+        self.plan_cache = PlanCache()
+        
+        # Manifest theo thư mục: chỉ đọc lại file đã thay đổi; watcher cập nhật định nghĩa khi đang chạy
+        self._manifests: Dict[str, DirectoryManifest] = {}
+        self._watchers: Dict[str, DirectoryWatcher] = {}
 
     def load_workflow(self, json_path: str, proxy_settings: dict = None, workflow_name: str = None):
         """Tải một workflow từ file JSON và thêm vào manager."""
@@ -30,47 +57,123 @@ class WorkflowManager:
                 raise FileNotFoundError(f"File không tồn tại: {json_path}")
             
             with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+                json_content = f.read()
             
             # Sử dụng tên được chỉ định hoặc tên file làm tên workflow
             if not workflow_name:
                 workflow_name = json_path.stem
             
             if workflow_name in self.workflows:
-                print(f"⚠️ Workflow '{workflow_name}' đã tồn tại, đang ghi đè...")
+                logger.warning("⚠️ Workflow '%s' đã tồn tại, đang ghi đè...", workflow_name)
             
-            workflow = Workflow(workflow_name, data, proxy_settings)
-            self.workflows[workflow_name] = workflow
-            print(f"✅ Đã tải thành công workflow: {workflow_name}")
-            print(f"   - Nodes: {len(workflow.nodes)}")
-            print(f"   - Proxy: {'Có' if proxy_settings else 'Không'}")
+            workflow = self._install_workflow(workflow_name, json_content, proxy_settings)
+            logger.info("✅ Đã tải thành công workflow: %s", workflow_name)
+            logger.info("   - Nodes: %s", len(workflow.nodes))
+            logger.info("   - Proxy: %s", 'Có' if proxy_settings else 'Không')
             
         except Exception as e:
-            print(f"❌ Lỗi khi tải workflow từ {json_path}: {e}")
+            logger.error("❌ Lỗi khi tải workflow từ %s: %s", json_path, e)
             raise
 
+    def _install_workflow(self, name: str, json_content: str, proxy_settings: dict = None,
+                          content_hash: str = None) -> Workflow:
+        """
+        Biên dịch (nếu chưa có trong cache) và thay định nghĩa `name` bằng một phép gán duy nhất:
+        các lần chạy đang dở vẫn giữ định nghĩa cũ, lần chạy mới dùng định nghĩa mới.
+        """
+        plan = self.plan_cache.get_or_compile(json_content, content_hash)
+        workflow = Workflow(name, proxy_settings=proxy_settings,
+                            max_branches=self.max_branches_per_run, plan=plan)
+        self._update_workflows(install={name: workflow})
+        return workflow
+
+    def _update_workflows(self, install: Dict[str, Workflow] = None, remove=()) -> List[str]:
+        """
+        Thêm/thay `install` và gỡ các tên trong `remove` bằng một dict mới. Đọc-sao chép-gán được
+        tuần tự hóa bằng lock để watcher và thread chính không làm mất thay đổi của nhau.
+        Trả về các tên đã được gỡ.
+        """
+        with self._workflows_lock:
+            workflows = dict(self.workflows)
+            workflows.update(install or {})
+            removed = [name for name in remove if workflows.pop(name, None) is not None]
+            self.workflows = workflows
+            return removed
+
+    def _get_manifest(self, directory: Path) -> DirectoryManifest:
+        key = str(directory.resolve())
+        if key not in self._manifests:
+            self._manifests[key] = DirectoryManifest(directory)
+        return self._manifests[key]
+
     def load_workflows_from_directory(self, directory_path: str, proxy_settings: dict = None):
-        """Tải tất cả workflow JSON từ một thư mục."""
+        """Tải tất cả workflow JSON từ một thư mục (các lần gọi sau chỉ tải lại file đã thay đổi)."""
         directory = Path(directory_path)
         if not directory.exists():
             raise FileNotFoundError(f"Thư mục không tồn tại: {directory}")
         
-        json_files = list(directory.glob("*.json"))
-        if not json_files:
-            print(f"⚠️ Không tìm thấy file JSON nào trong thư mục: {directory}")
+        scan = self._get_manifest(directory).scan()
+        if not scan.files and not scan.errors:
+            logger.warning("⚠️ Không tìm thấy file JSON nào trong thư mục: %s", directory)
             return
         
-        print(f"📁 Đang tải {len(json_files)} workflow từ: {directory}")
+        total = len(scan.files) + len(scan.errors)
+        logger.info("📁 Đang tải %s workflow từ: %s", total, directory)
+        for error in scan.errors:
+            logger.error("❌ Bỏ qua file %s", error)
         
         loaded_count = 0
-        for json_file in json_files:
+        for entry in scan.files.values():
+            current = self.workflows.get(entry.name)
+            if (current is not None and current.plan.content_hash == entry.content_hash
+                    and current.proxy_settings == proxy_settings):
+                loaded_count += 1
+                continue
             try:
-                self.load_workflow(json_file, proxy_settings)
+                self._install_workflow(entry.name, entry.read_content(), proxy_settings, entry.content_hash)
                 loaded_count += 1
             except Exception as e:
-                print(f"❌ Bỏ qua file {json_file.name}: {e}")
+                logger.error("❌ Bỏ qua file %s: %s", Path(entry.path).name, e)
         
-        print(f"✅ Đã tải thành công {loaded_count}/{len(json_files)} workflow")
+        logger.info("✅ Đã tải thành công %s/%s workflow", loaded_count, total)
+
+    def _apply_directory_changes(self, scan: ManifestScan, proxy_settings: dict = None):
+        """Callback của watcher: nạp lại workflow được thêm/sửa và gỡ workflow có file bị xóa."""
+        for name in scan.added + scan.changed:
+            entry = scan.files[name]
+            try:
+                self._install_workflow(name, entry.read_content(), proxy_settings, entry.content_hash)
+                logger.info("🔄 Đã nạp lại workflow: %s", name)
+            except Exception as e:
+                logger.error("❌ Không thể nạp lại workflow %s: %s", name, e)
+        if scan.removed:
+            for name in self._update_workflows(remove=scan.removed):
+                logger.info("🗑️ File của workflow '%s' đã bị xóa, gỡ khỏi manager", name)
+
+    def watch_directory(self, directory_path: str, interval: float = 2.0, proxy_settings: dict = None):
+        """
+        Tải thư mục rồi theo dõi thay đổi bằng polling: workflow được cập nhật khi đang chạy
+        mà không cần khởi động lại.
+        """
+        directory = Path(directory_path)
+        self.load_workflows_from_directory(directory, proxy_settings)
+        key = str(directory.resolve())
+        if key in self._watchers:
+            return
+        watcher = DirectoryWatcher(
+            self._get_manifest(directory),
+            lambda scan: self._apply_directory_changes(scan, proxy_settings),
+            interval
+        )
+        self._watchers[key] = watcher
+        watcher.start()
+        logger.info("👀 Đang theo dõi thư mục: %s (mỗi %ss)", directory, interval)
+
+    def stop_watching(self):
+        """Dừng tất cả watcher thư mục."""
+        for watcher in self._watchers.values():
+            watcher.stop()
+        self._watchers.clear()
 
     def get_workflow(self, name: str) -> Optional[Workflow]:
         """Lấy workflow theo tên."""
@@ -88,45 +191,85 @@ class WorkflowManager:
         ]
 
     def get_runnable_workflows(self) -> List[Workflow]:
-        """Lấy danh sách các workflow có thể chạy (Pending hoặc Failed)."""
-        return [wf for wf in self.workflows.values() if wf.can_run()]
+        """Lấy danh sách các workflow có lần chạy gần nhất là Pending hoặc Failed."""
+        return [wf for wf in self.workflows.values() if wf.state.can_run()]
+
+    @property
+    def running_workflows(self) -> set:
+        """Tên các workflow đang có ít nhất một lần chạy."""
+        return {run.name for run in list(self.active_runs.values())}
 
     def get_running_workflows(self) -> List[Workflow]:
         """Lấy danh sách các workflow đang chạy."""
-        return [
-            wf for wf in self.workflows.values() 
-            if isinstance(wf.state, RunningState)
-        ]
+        running = self.running_workflows
+        return [wf for wf in self.workflows.values() if wf.name in running]
 
-    async def _run_workflow_with_semaphore(self, workflow: Workflow) -> bool:
-        """Chạy workflow với giới hạn đồng thời."""
+    async def _run_with_semaphore(self, run: WorkflowRun) -> bool:
+        """Chạy một WorkflowRun với giới hạn đồng thời."""
         async with self._semaphore:
-            self.running_workflows.add(workflow.name)
+            self.active_runs[run.run_id] = run
             try:
-                result = await workflow.run()
-                self.workflow_results[workflow.name] = result
+                result = await run.run(browser_pool=self.browser_pool)
+                self.workflow_results[run.name] = result
                 return result
             finally:
-                self.running_workflows.discard(workflow.name)
+                self.active_runs.pop(run.run_id, None)
+
+    async def _run_workflow_with_semaphore(self, workflow: Workflow) -> bool:
+        """Tạo lần chạy mới cho workflow và chạy với giới hạn đồng thời."""
+        run = workflow.create_run()
+        workflow.last_run = run
+        return await self._run_with_semaphore(run)
+
+    async def run_instances(self, name: str, contexts: List[dict],
+                            proxies: Optional[List[dict]] = None) -> List[WorkflowRun]:
+        """
+        Chạy nhiều bản của cùng một workflow song song, mỗi bản có context khởi tạo riêng
+        (ví dụ một dòng dữ liệu) và proxy riêng (tùy chọn). Đồ thị được dùng chung, không sao chép.
+        """
+        workflow = self.workflows.get(name)
+        if not workflow:
+            logger.error("❌ Không tìm thấy workflow có tên: %s", name)
+            return []
+        
+        if proxies is not None and len(proxies) != len(contexts):
+            raise ValueError("Số lượng proxies phải bằng số lượng contexts.")
+        
+        runs = [
+            workflow.create_run(context, proxies[i] if proxies is not None else None)
+            for i, context in enumerate(contexts)
+        ]
+        if runs:
+            workflow.last_run = runs[-1]
+        
+        logger.info("🚀 Đang khởi chạy %s bản của workflow: %s", len(runs), name)
+        results = await asyncio.gather(
+            *(self._run_with_semaphore(run) for run in runs),
+            return_exceptions=True
+        )
+        
+        successful = sum(1 for result in results if result is True)
+        logger.info("📊 %s: %s/%s bản thành công", name, successful, len(runs))
+        return runs
 
     async def run_workflow_by_name(self, name: str) -> bool:
         """Chạy một workflow cụ thể bằng tên của nó."""
         workflow = self.workflows.get(name)
         if not workflow:
-            print(f"❌ Không tìm thấy workflow có tên: {name}")
+            logger.error("❌ Không tìm thấy workflow có tên: %s", name)
             return False
         
         if not workflow.can_run():
-            print(f"⚠️ Workflow '{name}' không thể chạy (trạng thái: {workflow.state})")
+            logger.warning("⚠️ Workflow '%s' không thể chạy (trạng thái: %s)", name, workflow.state)
             return False
         
-        print(f"🚀 Đang khởi chạy workflow: {name}")
+        logger.info("🚀 Đang khởi chạy workflow: %s", name)
         return await self._run_workflow_with_semaphore(workflow)
 
     async def run_multiple_workflows(self, names: List[str]) -> Dict[str, bool]:
         """Chạy nhiều workflow cùng lúc và trả về kết quả."""
         if not names:
-            print("⚠️ Danh sách workflow rỗng")
+            logger.warning("⚠️ Danh sách workflow rỗng")
             return {}
         
         # Lọc các workflow hợp lệ
@@ -134,21 +277,21 @@ class WorkflowManager:
         for name in names:
             workflow = self.workflows.get(name)
             if not workflow:
-                print(f"❌ Bỏ qua workflow không tồn tại: {name}")
+                logger.error("❌ Bỏ qua workflow không tồn tại: %s", name)
                 continue
             
             if not workflow.can_run():
-                print(f"⚠️ Bỏ qua workflow không thể chạy: {name} (trạng thái: {workflow.state})")
+                logger.warning("⚠️ Bỏ qua workflow không thể chạy: %s (trạng thái: %s)", name, workflow.state)
                 continue
             
             valid_workflows.append(workflow)
         
         if not valid_workflows:
-            print("❌ Không có workflow hợp lệ để chạy")
+            logger.error("❌ Không có workflow hợp lệ để chạy")
             return {}
         
-        print(f"🚀 Đang khởi chạy {len(valid_workflows)} workflow đồng thời...")
-        print(f"📊 Giới hạn đồng thời: {self.max_concurrent_workflows}")
+        logger.info("🚀 Đang khởi chạy %s workflow đồng thời...", len(valid_workflows))
+        logger.info("📊 Giới hạn đồng thời: %s", self.max_concurrent_workflows)
         
         # Tạo tasks cho tất cả workflows
         tasks = [
@@ -163,7 +306,7 @@ class WorkflowManager:
         final_results = {}
         for i, workflow in enumerate(valid_workflows):
             if isinstance(results[i], Exception):
-                print(f"❌ Workflow {workflow.name} gặp exception: {results[i]}")
+                logger.error("❌ Workflow %s gặp exception: %s", workflow.name, results[i])
                 final_results[workflow.name] = False
             else:
                 final_results[workflow.name] = results[i]
@@ -172,9 +315,9 @@ class WorkflowManager:
         successful = sum(1 for success in final_results.values() if success)
         total = len(final_results)
         
-        print(f"\n📊 Kết quả thực thi:")
-        print(f"   - Thành công: {successful}/{total}")
-        print(f"   - Thất bại: {total - successful}/{total}")
+        logger.info("📊 Kết quả thực thi:")
+        logger.info("   - Thành công: %s/%s", successful, total)
+        logger.info("   - Thất bại: %s/%s", total - successful, total)
         
         return final_results
 
@@ -182,11 +325,11 @@ class WorkflowManager:
         """Chạy tất cả workflow đang ở trạng thái Pending."""
         pending_workflows = self.get_pending_workflows()
         if not pending_workflows:
-            print("ℹ️ Không có workflow nào ở trạng thái Pending")
+            logger.info("ℹ️ Không có workflow nào ở trạng thái Pending")
             return {}
         
         workflow_names = [wf.name for wf in pending_workflows]
-        print(f"🎯 Tìm thấy {len(workflow_names)} workflow Pending: {workflow_names}")
+        logger.info("🎯 Tìm thấy %s workflow Pending: %s", len(workflow_names), workflow_names)
         
         return await self.run_multiple_workflows(workflow_names)
 
@@ -194,11 +337,11 @@ class WorkflowManager:
         """Chạy tất cả workflow có thể chạy được (Pending + Failed)."""
         runnable_workflows = self.get_runnable_workflows()
         if not runnable_workflows:
-            print("ℹ️ Không có workflow nào có thể chạy")
+            logger.info("ℹ️ Không có workflow nào có thể chạy")
             return {}
         
         workflow_names = [wf.name for wf in runnable_workflows]
-        print(f"🎯 Tìm thấy {len(workflow_names)} workflow có thể chạy: {workflow_names}")
+        logger.info("🎯 Tìm thấy %s workflow có thể chạy: %s", len(workflow_names), workflow_names)
         
         return await self.run_multiple_workflows(workflow_names)
 
@@ -206,11 +349,11 @@ class WorkflowManager:
         """Reset một workflow về trạng thái Pending."""
         workflow = self.workflows.get(name)
         if not workflow:
-            print(f"❌ Không tìm thấy workflow: {name}")
+            logger.error("❌ Không tìm thấy workflow: %s", name)
             return False
         
         if workflow.name in self.running_workflows:
-            print(f"⚠️ Không thể reset workflow đang chạy: {name}")
+            logger.warning("⚠️ Không thể reset workflow đang chạy: %s", name)
             return False
         
         workflow.reset()
@@ -226,37 +369,45 @@ class WorkflowManager:
             if self.reset_workflow(name):
                 reset_count += 1
         
-        print(f"🔄 Đã reset {reset_count} workflow")
+        logger.info("🔄 Đã reset %s workflow", reset_count)
 
     def remove_workflow(self, name: str) -> bool:
         """Xóa một workflow khỏi manager."""
         if name not in self.workflows:
-            print(f"❌ Workflow không tồn tại: {name}")
+            logger.error("❌ Workflow không tồn tại: %s", name)
             return False
         
         if name in self.running_workflows:
-            print(f"⚠️ Không thể xóa workflow đang chạy: {name}")
+            logger.warning("⚠️ Không thể xóa workflow đang chạy: %s", name)
             return False
         
-        del self.workflows[name]
-        if name in self.workflow_results:
-            del self.workflow_results[name]
+        if not self._update_workflows(remove=[name]):
+            logger.error("❌ Workflow không tồn tại: %s", name)
+            return False
+        self.workflow_results.pop(name, None)
         
-        print(f"🗑️ Đã xóa workflow: {name}")
+        logger.info("🗑️ Đã xóa workflow: %s", name)
         return True
 
     def clear_all_workflows(self):
         """Xóa tất cả workflow."""
         if self.running_workflows:
-            print(f"⚠️ Có {len(self.running_workflows)} workflow đang chạy, không thể xóa tất cả")
+            logger.warning("⚠️ Có %s workflow đang chạy, không thể xóa tất cả", len(self.running_workflows))
             return False
         
-        count = len(self.workflows)
-        self.workflows.clear()
+        with self._workflows_lock:
+            count = len(self.workflows)
+            self.workflows = {}
         self.workflow_results.clear()
-        print(f"🗑️ Đã xóa tất cả {count} workflow")
+        logger.info("🗑️ Đã xóa tất cả %s workflow", count)
         return True
 
+    async def close(self):
+        """Giải phóng tài nguyên dùng chung (watcher thư mục, browser pool, HTTP client)."""
+        self.stop_watching()
+        await self.browser_pool.close()
+        await close_http_client()
+
     def get_status(self) -> dict:
         """Lấy trạng thái tổng quan của WorkflowManager."""
         total = len(self.workflows)
@@ -270,8 +421,10 @@ class WorkflowManager:
             'running_workflows': running,
             'runnable_workflows': runnable,
             'max_concurrent': self.max_concurrent_workflows,
-            'active_slots': len(self.running_workflows),
-            'available_slots': self.max_concurrent_workflows - len(self.running_workflows)
+            'active_runs': len(self.active_runs),
+            'active_slots': min(len(self.active_runs), self.max_concurrent_workflows),
+            'available_slots': max(0, self.max_concurrent_workflows - len(self.active_runs)),
+            'browser_pool': self.browser_pool.get_stats()
         }
 
     def print_status(self):
@@ -285,6 +438,11 @@ class WorkflowManager:
         print(f"   - Giới hạn đồng thời: {status['max_concurrent']}")
         print(f"   - Slots đang dùng: {status['active_slots']}/{status['max_concurrent']}")
         
+        pool_stats = status['browser_pool']
+        print(f"   - Browser pool: {pool_stats['open_browsers']} browser, "
+              f"hit {pool_stats['hits']}/miss {pool_stats['misses']}, "
+              f"khởi động TB {pool_stats['avg_launch_time']:.2f}s")
+        
         if self.workflows:
             print(f"\n📋 Danh sách workflow:")
             for workflow in self.workflows.values():
@@ -0,0 +1,162 @@
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict
+from playwright.async_api import async_playwright
+from .node import NodeResult
+from .request_blocking import RequestBlocker, compile_blocking_rules, record_run
+from strategies.base_strategy import RUN_ID_KEY
+from states.workflow_states import PendingState
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowRun:
+    """
+    Một lần chạy của một workflow (định nghĩa dùng chung, chỉ đọc).
+    Mỗi lần chạy có context, kết quả từng node và máy trạng thái riêng,
+    nên cùng một định nghĩa có thể chạy nhiều bản song song mà không sao chép đồ thị.
+    """
+
+    def __init__(self, workflow, initial_context: dict = None, proxy_settings: dict = None,
+                 run_id: str = None, on_node_result: Callable[[NodeResult], None] = None,
+                 publish: Callable = None, browser_settings: dict = None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.workflow = workflow
+        self.proxy_settings = proxy_settings if proxy_settings is not None else workflow.proxy_settings
+        self.browser_settings = browser_settings if browser_settings is not None else workflow.browser_settings
+        self.request_blocker = None  # RequestBlocker của lần chạy nếu browser_settings có cấu hình chặn request
+        self.state = PendingState()
+        self.context = dict(initial_context or {})  # Context riêng của lần chạy
+        self.context[RUN_ID_KEY] = self.run_id  # Node cần run_id (ví dụ tên file của sink) đọc từ context
+        self.node_results: Dict[str, NodeResult] = {}
+        self.on_node_result = on_node_result  # Callback khi mỗi node kết thúc (ví dụ gửi sự kiện realtime)
+        self.publish = publish  # Hàm phát sự kiện vòng đời node lên EventBus (xem core.event_bus)
+
+        # Metadata
+        self.started_at = None
+        self.execution_time = None
+        self.error_message = None
+
+    @property
+    def name(self) -> str:
+        return self.workflow.name
+
+    def can_run(self) -> bool:
+        """Kiểm tra xem lần chạy này có thể bắt đầu không dựa trên trạng thái hiện tại."""
+        return self.state.can_run()
+
+    async def run(self, browser_pool=None) -> bool:
+        """
+        Chạy workflow với Playwright và proxy (nếu có).
+        Nếu có `browser_pool`, lần chạy thuê một BrowserContext từ pool thay vì tự khởi động Chromium.
+        """
+        if not self.can_run():
+            logger.error("❌ Không thể chạy workflow '%s' vì trạng thái hiện tại là %s.", self.name, self.state)
+            return False
+
+        # Chuyển sang trạng thái Running
+        self.state = self.state.get_next_state(True)
+        self.started_at = datetime.now()
+        start_time = time.time()
+
+        logger.info("🚀 Bắt đầu thực thi workflow: %s (run %s)", self.name, self.run_id[:8])
+
+        success = False
+        browser = None
+        user_agent = self.proxy_settings.get('userAgent') if self.proxy_settings else None
+
+        try:
+            rules = compile_blocking_rules(self.browser_settings)
+            if rules is not None:
+                self.request_blocker = RequestBlocker(rules)
+
+            if browser_pool is not None:
+                async with browser_pool.lease(self.proxy_settings, user_agent) as lease:
+                    if self.request_blocker:
+                        await self.request_blocker.attach(lease.context)
+                    await self._execute_nodes(lease.page, lease.context.new_page)
+            else:
+                async with async_playwright() as p:
+                    # Khởi tạo browser với proxy settings nếu có
+                    launch_options = {
+                        'headless': False,  # Đặt là True để chạy ẩn
+                        'args': ['--no-sandbox', '--disable-setuid-sandbox']
+                    }
+
+                    if self.proxy_settings:
+                        launch_options['proxy'] = self.proxy_settings
+
+                    browser = await p.chromium.launch(**launch_options)
+                    browser_context = await browser.new_context()
+                    if self.request_blocker:
+                        await self.request_blocker.attach(browser_context)
+                    page = await browser_context.new_page()
+
+                    # Thiết lập user agent nếu có trong proxy settings
+                    if user_agent:
+                        await page.set_extra_http_headers({
+                            'User-Agent': user_agent
+                        })
+
+                    await self._execute_nodes(page, browser_context.new_page)
+
+            success = True
+            logger.info("✅ Workflow '%s' hoàn thành thành công!", self.name)
+
+        except Exception as e:
+            self.error_message = str(e)
+            logger.error("🚨 Lỗi xảy ra khi chạy workflow '%s': %s", self.name, e)
+            success = False
+
+        finally:
+            if browser:
+                await browser.close()
+
+            if self.request_blocker:
+                record_run(self.request_blocker.get_stats())
+                logger.info("🛡️ Đã chặn %d/%d request (tiết kiệm ~%.0f KB)", self.request_blocker.blocked,
+                            self.request_blocker.blocked + self.request_blocker.allowed,
+                            self.request_blocker.bytes_saved / 1024)
+
+            # Cập nhật thời gian thực thi và trạng thái
+            self.execution_time = time.time() - start_time
+            self.state = self.state.get_next_state(success)
+
+            logger.log(logging.INFO if success else logging.ERROR,
+                       "%s Workflow '%s' kết thúc với trạng thái: %s (Thời gian: %.2fs)",
+                       "✅" if success else "❌", self.name, self.state, self.execution_time)
+
+        return success
+
+    async def _execute_nodes(self, page, new_page=None):
+        """
+        Thực thi đồ thị từ Start Node bằng DagExecutor của định nghĩa.
+        Các nhánh song song chạy trên page mới tạo bởi `new_page` trong cùng context.
+        """
+        executor = self.workflow.executor
+        executed_nodes = await executor.run(page, self.context, new_page, self.node_results,
+                                            self.on_node_result, self.publish)
+        logger.info("🏁 Đã thực thi %d/%d node.", len(executed_nodes), len(executor.reachable))
+
+    def get_node_results(self) -> Dict[str, dict]:
+        """Kết quả từng node ở dạng dict (để lưu vào lịch sử thực thi)."""
+        return {node_id: result.to_dict() for node_id, result in self.node_results.items()}
+
+    def get_summary(self) -> dict:
+        """Trả về tóm tắt thông tin của lần chạy."""
+        return {
+            'run_id': self.run_id,
+            'name': self.name,
+            'state': str(self.state),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'execution_time': self.execution_time,
+            'error_message': self.error_message,
+            'executed_nodes': len(self.node_results),
+            'has_proxy': bool(self.proxy_settings),
+            'request_blocking': self.request_blocker.get_stats() if self.request_blocker else None
+        }
+
+    def __repr__(self):
+        return f"WorkflowRun(name={self.name}, run_id={self.run_id[:8]}, state={self.state})"
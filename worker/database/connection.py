@@ -0,0 +1,136 @@
+"""
+Pooled SQLite connections with WAL journaling and tuned pragmas
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+
+class ConnectionPool:
+    """
+    Reuses SQLite connections across calls and threads instead of opening one per query.
+
+    Connections run in WAL mode, so readers (the UI's endpoints) are not blocked by the
+    writer during batch runs. Each connection keeps its own prepared-statement cache,
+    which only pays off because connections outlive a single call. A thread that already
+    holds a connection gets the same one back for nested calls, so a method calling another
+    DatabaseManager method cannot deadlock against its own open write transaction.
+    """
+
+    def __init__(self, db_path, max_connections: int = 8, timeout: float = 30.0,
+                 cache_size_kb: int = 16384, mmap_size: int = 256 * 1024 * 1024,
+                 cached_statements: int = 256):
+        self.db_path = Path(db_path)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._created = 0
+
+        # Statistics
+        self.acquired = 0
+        self.waits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _reset_after_fork(self):
+        # Connections must not be shared with a forked child; start a fresh pool there
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._created = 0
+        self._pid = os.getpid()
+
+    def _acquire(self) -> sqlite3.Connection:
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_connections:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        self.waits += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out waiting for a database connection ({self.max_connections} in use)"
+            )
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; the transaction is committed (or rolled back) when the block exits"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            # Nested call on the same thread: join the outer transaction
+            yield held
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self.acquired += 1
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close_all(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'connections': self._created,
+            'idle': self._idle.qsize(),
+            'max_connections': self.max_connections,
+            'acquired': self.acquired,
+            'waits': self.waits
+        }
@@ -0,0 +1,293 @@
+"""
+Durable SQLite-backed job queue with priorities, retries and lease-based claiming
+"""
+import json
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class QueuedJob:
+    id: int
+    kind: str
+    payload: Dict
+    priority: int = 0
+    status: str = "queued"
+    attempts: int = 0
+    max_attempts: int = 3
+    idempotency_key: Optional[str] = None
+    cost: int = 1
+    concurrency_key: Optional[str] = None
+    concurrency_limit: Optional[int] = None
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    available_at: Optional[float] = None
+    last_error: Optional[str] = None
+    result: Optional[Dict] = None
+    created_at: Optional[float] = None
+    updated_at: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row) -> 'QueuedJob':
+        data = dict(row)
+        data['payload'] = json.loads(data['payload']) if data['payload'] else {}
+        data['result'] = json.loads(data['result']) if data['result'] else None
+        return cls(**data)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class QueueCapacityError(Exception):
+    """Enqueueing would take the total cost of queued jobs past the queue capacity"""
+
+    def __init__(self, queued: int, capacity: int):
+        super().__init__(f"Job queue is full ({queued}/{capacity})")
+        self.queued = queued
+        self.capacity = capacity
+
+
+_INSERT_JOB = """INSERT INTO jobs (kind, payload, priority, max_attempts, idempotency_key, cost,
+                                   concurrency_key, concurrency_limit, available_at, created_at, updated_at)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 ON CONFLICT(idempotency_key) DO NOTHING
+                 RETURNING id"""
+
+
+class JobQueue:
+    """Persistent job queue stored in the `jobs` table of the workflow database"""
+
+    def __init__(self, db_manager, lease_seconds: float = 300, retry_backoff: float = 5.0):
+        self.db_manager = db_manager
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+
+    def enqueue(self, kind: str, payload: Dict, priority: int = 0,
+                idempotency_key: Optional[str] = None, max_attempts: int = 3,
+                delay: float = 0.0, cost: int = 1, capacity: Optional[int] = None,
+                concurrency_key: Optional[str] = None, concurrency_limit: Optional[int] = None) -> int:
+        """
+        Enqueue a job that becomes claimable after `delay` seconds.
+        Returns the existing job ID if the idempotency key was already used.
+        See `enqueue_many` for `cost`, `capacity` and the concurrency group.
+        """
+        return self.enqueue_many([{
+            'kind': kind, 'payload': payload, 'priority': priority, 'idempotency_key': idempotency_key,
+            'max_attempts': max_attempts, 'delay': delay, 'cost': cost,
+            'concurrency_key': concurrency_key, 'concurrency_limit': concurrency_limit
+        }], capacity)[0]
+
+    def enqueue_many(self, jobs: Iterable[Dict], capacity: Optional[int] = None) -> List[int]:
+        """
+        Enqueue many jobs in a single transaction.
+        Each item is a dict with `kind`, `payload` and optional `priority`, `idempotency_key`,
+        `max_attempts`, `delay`, `cost` (queue slots the job stands for, e.g. the workflows of a
+        batch) and `concurrency_key` / `concurrency_limit` (at most that many jobs with the key are
+        leased at once). Returns the job IDs in order, reusing the existing job for a known
+        idempotency key.
+
+        With `capacity`, the transaction takes the write lock before counting the queued cost and
+        raises QueueCapacityError (inserting nothing) if the new jobs would not fit.
+        """
+        now = time.time()
+        rows = [
+            (job['kind'], json.dumps(job.get('payload', {})), job.get('priority', 0),
+             job.get('max_attempts', 3), job.get('idempotency_key'), job.get('cost', 1),
+             job.get('concurrency_key') if job.get('concurrency_limit') else None,
+             job.get('concurrency_limit') if job.get('concurrency_key') else None,
+             now + job.get('delay', 0.0), now, now)
+            for job in jobs
+        ]
+        if not rows:
+            return []
+        with self.db_manager.get_connection() as conn:
+            if capacity is not None and not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            queued = self._queued_cost(conn) if capacity is not None else 0
+            job_ids, added_cost = [], 0
+            for row in rows:
+                inserted = conn.execute(_INSERT_JOB, row).fetchone()
+                if inserted is not None:
+                    job_ids.append(inserted['id'])
+                    added_cost += row[5]
+                else:
+                    job_ids.append(conn.execute(
+                        "SELECT id FROM jobs WHERE idempotency_key = ?", (row[4],)
+                    ).fetchone()['id'])
+            if capacity is not None and added_cost and queued + added_cost > capacity:
+                # Rolled back when the exception leaves the connection block
+                raise QueueCapacityError(queued, capacity)
+            return job_ids
+
+    def claim(self, owner: str, limit: int = 1, kinds: Optional[List[str]] = None,
+              lease_seconds: Optional[float] = None) -> List[QueuedJob]:
+        """
+        Atomically lease up to `limit` ready jobs with a single UPDATE ... RETURNING statement.
+        Jobs in a concurrency group are only leased while fewer than `concurrency_limit` jobs of
+        the group are leased (ranked within the group by the same priority order).
+        """
+        if limit <= 0:
+            return []
+        now = time.time()
+        lease_expires_at = now + (lease_seconds or self.lease_seconds)
+        kind_filter = f"AND kind IN ({', '.join('?' for _ in kinds)})" if kinds else ""
+        kind_params = list(kinds or [])
+        params = [owner, lease_expires_at, now, now, *kind_params, limit, now, *kind_params, limit]
+
+        with self.db_manager.get_connection() as conn:
+            rows = conn.execute(
+                f"""UPDATE jobs
+                    SET status = 'leased', lease_owner = ?, lease_expires_at = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE id IN (
+                        SELECT id FROM (
+                            SELECT id, priority FROM (
+                                SELECT id, priority FROM jobs
+                                WHERE status = 'queued' AND available_at <= ? AND concurrency_key IS NULL
+                                      {kind_filter}
+                                ORDER BY priority DESC, id
+                                LIMIT ?
+                            )
+                            UNION ALL
+                            SELECT id, priority FROM (
+                                SELECT id, priority, concurrency_limit,
+                                       ROW_NUMBER() OVER (PARTITION BY concurrency_key ORDER BY priority DESC, id)
+                                       + COALESCE(leased.count, 0) AS slot
+                                FROM jobs AS ready
+                                LEFT JOIN (
+                                    SELECT concurrency_key, COUNT(*) AS count FROM jobs
+                                    WHERE status = 'leased' AND concurrency_key IS NOT NULL
+                                    GROUP BY concurrency_key
+                                ) AS leased USING (concurrency_key)
+                                WHERE status = 'queued' AND available_at <= ? AND concurrency_key IS NOT NULL
+                                      {kind_filter}
+                            )
+                            WHERE slot <= concurrency_limit
+                        )
+                        ORDER BY priority DESC, id
+                        LIMIT ?
+                    )
+                    RETURNING *""",
+                params
+            ).fetchall()
+        jobs = [QueuedJob.from_row(row) for row in rows]
+        jobs.sort(key=lambda job: (-job.priority, job.id))
+        return jobs
+
+    def extend_lease(self, job_id: int, owner: str, lease_seconds: Optional[float] = None) -> bool:
+        """Extend the lease of a running job; returns False if the lease was lost"""
+        now = time.time()
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+                   WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+                (now + (lease_seconds or self.lease_seconds), now, job_id, owner)
+            )
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: int, owner: str, result=None) -> bool:
+        """Mark a leased job as completed"""
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs
+                   SET status = 'completed', result = ?, lease_owner = NULL,
+                       lease_expires_at = NULL, updated_at = ?
+                   WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+                (json.dumps(result), time.time(), job_id, owner)
+            )
+            return cursor.rowcount > 0
+
+    def fail(self, job_id: int, owner: str, error: str) -> bool:
+        """
+        Record a failed attempt. The job is requeued with exponential backoff while
+        attempts remain, otherwise it is marked failed. Returns True if it will be retried.
+        """
+        now = time.time()
+        with self.db_manager.get_connection() as conn:
+            rows = conn.execute(
+                """UPDATE jobs
+                   SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                       available_at = ? + ? * (1 << (attempts - 1)),
+                       last_error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+                   WHERE id = ? AND status = 'leased' AND lease_owner = ?
+                   RETURNING status""",
+                (now, self.retry_backoff, error, now, job_id, owner)
+            ).fetchall()
+            return bool(rows and rows[0]['status'] == 'queued')
+
+    def requeue_stale_leases(self, owner: Optional[str] = None) -> int:
+        """
+        Requeue jobs whose lease has expired. If `owner` is given, that owner's leases are
+        requeued too (used on startup, when the previous process with this owner ID is gone).
+        Jobs that exhausted their attempts are marked failed instead.
+        """
+        now = time.time()
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs
+                   SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                       last_error = COALESCE(last_error, 'Lease expired'),
+                       lease_owner = NULL, lease_expires_at = NULL, available_at = ?, updated_at = ?
+                   WHERE status = 'leased' AND (lease_expires_at < ? OR lease_owner = ?)""",
+                (now, now, now, owner)
+            )
+            return cursor.rowcount
+
+    def get_job(self, job_id: int) -> Optional[QueuedJob]:
+        """Get job by ID"""
+        with self.db_manager.get_connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return QueuedJob.from_row(row) if row else None
+
+    def count_queued(self, kinds: Optional[List[str]] = None, ready: bool = False) -> int:
+        """
+        Number of jobs waiting to be claimed, optionally only of the given kinds and only
+        those whose retry delay has passed (`ready=True`)
+        """
+        sql = "SELECT COUNT(*) AS count FROM jobs WHERE status = 'queued'"
+        params: list = []
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        if ready:
+            sql += " AND available_at <= ?"
+            params.append(time.time())
+        with self.db_manager.get_connection() as conn:
+            return conn.execute(sql, params).fetchone()['count']
+
+    @staticmethod
+    def _queued_cost(conn) -> int:
+        row = conn.execute("SELECT COALESCE(SUM(cost), 0) AS cost FROM jobs WHERE status = 'queued'").fetchone()
+        return row['cost']
+
+    def queued_cost(self) -> int:
+        """Queue slots taken by jobs waiting to be claimed (a batch counts once per workflow)"""
+        with self.db_manager.get_connection() as conn:
+            return self._queued_cost(conn)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Job counts by status"""
+        with self.db_manager.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status"
+            ).fetchall()
+            return {row['status']: row['count'] for row in rows}
+
+    def purge_finished(self, older_than_seconds: float, limit: Optional[int] = None) -> int:
+        """
+        Delete completed/failed jobs (at most `limit` when given) that finished more than
+        `older_than_seconds` ago. Their idempotency keys are freed too, so the age must exceed
+        the time a batch may be resumed after a restart.
+        """
+        cutoff = time.time() - older_than_seconds
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.execute(
+                """DELETE FROM jobs WHERE id IN (
+                       SELECT id FROM jobs
+                       WHERE status IN ('completed', 'failed') AND updated_at < ?
+                       LIMIT ?
+                   )""",
+                (cutoff, -1 if limit is None else limit)
+            )
+            return cursor.rowcount
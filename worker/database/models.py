@@ -4,10 +4,14 @@ Database models for workflow management system
 import sqlite3
 import json
 import os
+import time
+import hashlib
+import zlib
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, asdict
+from .connection import ConnectionPool
 
 
 @dataclass
@@ -49,7 +53,8 @@ class Workflow:
     name: str = ""
     file_path: str = ""
     display_order: int = 0
-    json_content: str = ""
+    json_content: str = ""  # Empty in list results; loaded by get_workflow
+    content_hash: Optional[str] = None
     node_count: int = 0
     status: str = "pending"
     last_execution_time: Optional[float] = None
@@ -58,7 +63,11 @@ class Workflow:
     updated_at: Optional[str] = None
 
     def to_dict(self) -> Dict:
-        return asdict(self)
+        data = asdict(self)
+        if not self.json_content:
+            # Listing rows are projected without the workflow body
+            data.pop('json_content')
+        return data
 
 
 @dataclass
@@ -71,6 +80,8 @@ class WorkflowExecution:
     node_results: Optional[Dict] = None
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
+    run_id: Optional[str] = None
+    archive_ref: Optional[str] = None  # Set when node_results were moved to an archive file
 
     def to_dict(self) -> Dict:
         data = asdict(self)
@@ -79,18 +90,37 @@ class WorkflowExecution:
         return data
 
 
+# Workflow columns without the body, for listings
+WORKFLOW_SUMMARY_COLUMNS = """id, workspace_id, name, file_path, display_order, content_hash, node_count,
+                              status, last_execution_time, last_run_at, created_at, updated_at"""
+
+
+def store_workflow_content(conn, json_content: str) -> str:
+    """Store a workflow body (deduplicated by SHA-256, zlib-compressed) and return its hash"""
+    data = json_content.encode('utf-8')
+    content_hash = hashlib.sha256(data).hexdigest()
+    conn.execute(
+        "INSERT OR IGNORE INTO workflow_contents (content_hash, content, size) VALUES (?, ?, ?)",
+        (content_hash, zlib.compress(data), len(data))
+    )
+    return content_hash
+
+
+def load_workflow_content(blob) -> str:
+    return zlib.decompress(blob).decode('utf-8') if blob is not None else ""
+
+
 class DatabaseManager:
     """Manages SQLite database operations for the workflow system"""
     
-    def __init__(self, db_path: str = "workflow_manager.db"):
+    def __init__(self, db_path: str = "workflow_manager.db", max_connections: int = 8):
         self.db_path = Path(db_path)
+        self.pool = ConnectionPool(self.db_path, max_connections=max_connections)
         self.init_database()
     
-    def get_connection(self) -> sqlite3.Connection:
-        """Get database connection with row factory"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def get_connection(self):
+        """Borrow a pooled connection (row factory, WAL); use as `with db.get_connection() as conn:`"""
+        return self.pool.connection()
     
     def init_database(self):
         """Initialize database with schema"""
@@ -130,7 +160,55 @@ class DatabaseManager:
                 cursor.execute("ALTER TABLE workspaces ADD COLUMN completion_percentage REAL DEFAULT 0")
                 print("✅ Added completion_percentage column to workspaces table")
             
+            # Move workflow bodies out of the workflows rows into workflow_contents
+            cursor.execute("PRAGMA table_info(workflows)")
+            workflow_columns = [column[1] for column in cursor.fetchall()]
+            if 'content_hash' not in workflow_columns:
+                cursor.execute("ALTER TABLE workflows ADD COLUMN content_hash TEXT")
+            if 'json_content' in workflow_columns:
+                rows = cursor.execute("SELECT id, json_content FROM workflows").fetchall()
+                for row in rows:
+                    content_hash = store_workflow_content(conn, row['json_content'] or "")
+                    cursor.execute("UPDATE workflows SET content_hash = ? WHERE id = ?", (content_hash, row['id']))
+                cursor.execute("ALTER TABLE workflows DROP COLUMN json_content")
+                print(f"✅ Moved {len(rows)} workflow bodies to workflow_contents")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_workflows_content_hash ON workflows(content_hash)"
+            )
+            
+            cursor.execute("PRAGMA table_info(workflow_executions)")
+            execution_columns = [column[1] for column in cursor.fetchall()]
+            if 'run_id' not in execution_columns:
+                cursor.execute("ALTER TABLE workflow_executions ADD COLUMN run_id TEXT")
+                print("✅ Added run_id column to workflow_executions table")
+            if 'archive_ref' not in execution_columns:
+                cursor.execute("ALTER TABLE workflow_executions ADD COLUMN archive_ref TEXT")
+                print("✅ Added archive_ref column to workflow_executions table")
+            cursor.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_workflow_executions_run_id ON workflow_executions(run_id)"
+            )
+            
+            cursor.execute("PRAGMA table_info(jobs)")
+            job_columns = [column[1] for column in cursor.fetchall()]
+            if 'cost' not in job_columns:
+                cursor.execute("ALTER TABLE jobs ADD COLUMN cost INTEGER DEFAULT 1")
+                cursor.execute("ALTER TABLE jobs ADD COLUMN concurrency_key TEXT")
+                cursor.execute("ALTER TABLE jobs ADD COLUMN concurrency_limit INTEGER")
+                print("✅ Added cost and concurrency columns to jobs table")
+            cursor.execute(
+                """CREATE INDEX IF NOT EXISTS idx_jobs_concurrency
+                   ON jobs(status, concurrency_key, priority DESC, id) WHERE concurrency_key IS NOT NULL"""
+            )
+            
             conn.commit()
+            
+            # Stats tables were added after executions may already have been recorded
+            has_stats = conn.execute("SELECT 1 FROM workflow_stats LIMIT 1").fetchone()
+            has_executions = conn.execute("SELECT 1 FROM workflow_executions LIMIT 1").fetchone()
+        
+        if has_executions and not has_stats:
+            self.rebuild_execution_stats()
+            print("✅ Built execution statistics from existing history")
     
     # Workspace operations
     def create_workspace(self, workspace: Workspace) -> int:
@@ -307,42 +385,62 @@ class DatabaseManager:
     def create_workflow(self, workflow: Workflow) -> int:
         """Create a new workflow"""
         with self.get_connection() as conn:
+            content_hash = store_workflow_content(conn, workflow.json_content)
             cursor = conn.execute(
                 """INSERT INTO workflows (workspace_id, name, file_path, display_order, 
-                                        json_content, node_count, status)
+                                        content_hash, node_count, status)
                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
                 (workflow.workspace_id, workflow.name, workflow.file_path, 
-                 workflow.display_order, workflow.json_content, workflow.node_count, workflow.status)
+                 workflow.display_order, content_hash, workflow.node_count, workflow.status)
             )
             return cursor.lastrowid
     
     def get_workflow(self, workflow_id: int) -> Optional[Workflow]:
-        """Get workflow by ID"""
+        """Get workflow by ID, including its JSON body"""
         with self.get_connection() as conn:
-            row = conn.execute("SELECT * FROM workflows WHERE id = ?", (workflow_id,)).fetchone()
+            row = conn.execute(
+                """SELECT w.*, c.content FROM workflows w
+                   LEFT JOIN workflow_contents c ON c.content_hash = w.content_hash
+                   WHERE w.id = ?""",
+                (workflow_id,)
+            ).fetchone()
             if row:
-                return Workflow(**dict(row))
+                data = dict(row)
+                data['json_content'] = load_workflow_content(data.pop('content'))
+                return Workflow(**data)
         return None
     
-    def get_workflows_by_workspace(self, workspace_id: int) -> List[Workflow]:
-        """Get all workflows in a workspace"""
+    def get_workflows_by_workspace(self, workspace_id: int, limit: Optional[int] = None,
+                                   after: Optional[Tuple[int, int]] = None) -> List[Workflow]:
+        """
+        Get workflows in a workspace without their JSON bodies, in display order.
+        Paginate with `limit` and `after=(display_order, id)` of the last row of the previous page.
+        """
+        query = f"SELECT {WORKFLOW_SUMMARY_COLUMNS} FROM workflows WHERE workspace_id = ?"
+        params: list = [workspace_id]
+        if after is not None:
+            query += " AND (display_order, id) > (?, ?)"
+            params.extend(after)
+        query += " ORDER BY display_order, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
         with self.get_connection() as conn:
-            rows = conn.execute(
-                "SELECT * FROM workflows WHERE workspace_id = ? ORDER BY display_order, created_at",
-                (workspace_id,)
-            ).fetchall()
+            rows = conn.execute(query, params).fetchall()
             return [Workflow(**dict(row)) for row in rows]
     
     def update_workflow(self, workflow: Workflow) -> bool:
-        """Update workflow"""
+        """Update workflow (the stored body is kept when `json_content` was not loaded)"""
         with self.get_connection() as conn:
+            content_hash = store_workflow_content(conn, workflow.json_content) if workflow.json_content else None
             cursor = conn.execute(
                 """UPDATE workflows 
-                   SET name = ?, file_path = ?, display_order = ?, json_content = ?, 
+                   SET name = ?, file_path = ?, display_order = ?, content_hash = COALESCE(?, content_hash), 
                        node_count = ?, status = ?, last_execution_time = ?, 
                        last_run_at = ?, updated_at = CURRENT_TIMESTAMP
                    WHERE id = ?""",
-                (workflow.name, workflow.file_path, workflow.display_order, workflow.json_content,
+                (workflow.name, workflow.file_path, workflow.display_order, content_hash,
                  workflow.node_count, workflow.status, workflow.last_execution_time,
                  workflow.last_run_at, workflow.id)
             )
@@ -377,7 +475,17 @@ class DatabaseManager:
                     (status, workflow_id)
                 )
             return cursor.rowcount > 0
-    
+
+    def reset_interrupted_workflows(self) -> int:
+        """Reset workflows left in 'running' by a previous process back to 'pending'"""
+        with self.get_connection() as conn:
+            cursor = conn.execute(
+                """UPDATE workflows
+                   SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+                   WHERE status = 'running'"""
+            )
+            return cursor.rowcount
+
     def delete_workflow(self, workflow_id: int) -> bool:
         """Delete workflow"""
         with self.get_connection() as conn:
@@ -414,6 +522,29 @@ class DatabaseManager:
             )
             return cursor.rowcount > 0
     
+    def record_executions(self, executions: List[WorkflowExecution]) -> int:
+        """
+        Insert finished executions in a single transaction.
+        Rows whose run_id was already recorded are skipped; returns the number inserted.
+        """
+        rows = [
+            (execution.workflow_id, execution.status, execution.execution_time,
+             execution.error_message,
+             json.dumps(execution.node_results) if execution.node_results else None,
+             execution.run_id, execution.started_at, execution.completed_at)
+            for execution in executions
+        ]
+        with self.get_connection() as conn:
+            # rowcount, not total_changes: the stats triggers' writes must not be counted
+            cursor = conn.executemany(
+                """INSERT INTO workflow_executions (workflow_id, status, execution_time, error_message,
+                                                   node_results, run_id, started_at, completed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(run_id) DO NOTHING""",
+                rows
+            )
+            return cursor.rowcount
+    
     def get_execution_history(self, workflow_id: int, limit: int = 50) -> List[WorkflowExecution]:
         """Get execution history for a workflow"""
         with self.get_connection() as conn:
@@ -436,67 +567,201 @@ class DatabaseManager:
                     error_message=row['error_message'],
                     node_results=node_results,
                     started_at=row['started_at'],
-                    completed_at=row['completed_at']
+                    completed_at=row['completed_at'],
+                    run_id=row['run_id'],
+                    archive_ref=row['archive_ref']
                 ))
             return executions
     
+    def get_execution(self, execution_id: int) -> Optional[WorkflowExecution]:
+        """Get a single execution record (node_results may live in an archive, see archive_ref)"""
+        with self.get_connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM workflow_executions WHERE id = ?",
+                (execution_id,)
+            ).fetchone()
+            if not row:
+                return None
+            return WorkflowExecution(
+                id=row['id'],
+                workflow_id=row['workflow_id'],
+                status=row['status'],
+                execution_time=row['execution_time'],
+                error_message=row['error_message'],
+                node_results=json.loads(row['node_results']) if row['node_results'] else None,
+                started_at=row['started_at'],
+                completed_at=row['completed_at'],
+                run_id=row['run_id'],
+                archive_ref=row['archive_ref']
+            )
+    
+    def get_execution_rollups(self, workflow_id: int, days: int = 90) -> List[Dict]:
+        """Get daily summaries of executions that were compacted by the retention policy"""
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                """SELECT * FROM workflow_execution_daily
+                   WHERE workflow_id = ? AND day >= date('now', ?)
+                   ORDER BY day DESC""",
+                (workflow_id, f'-{int(days)} days')
+            ).fetchall()
+            return [dict(row) for row in rows]
+    
+    # Execution plan cache operations
+    def load_execution_plan(self, content_hash: str) -> Optional[str]:
+        """Get a compiled execution plan by workflow content hash"""
+        with self.get_connection() as conn:
+            row = conn.execute(
+                "SELECT plan_json FROM execution_plans WHERE content_hash = ?",
+                (content_hash,)
+            ).fetchone()
+            return row['plan_json'] if row else None
+    
+    def save_execution_plan(self, content_hash: str, plan_json: str):
+        """Store a compiled execution plan"""
+        with self.get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO execution_plans (content_hash, plan_json) VALUES (?, ?)",
+                (content_hash, plan_json)
+            )
+    
+    # Workflow directory manifest
+    def load_file_manifest(self, directory: str) -> List[Dict]:
+        """Get the stored manifest (size, mtime, content hash) of a workflow directory"""
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                """SELECT name, path, size, mtime_ns, content_hash, node_count
+                   FROM workflow_files WHERE directory = ?""",
+                (directory,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+    
+    def save_file_manifest(self, directory: str, files: List[Dict], removed: List[str]):
+        """Upsert changed manifest entries and drop removed ones in one transaction"""
+        with self.get_connection() as conn:
+            conn.executemany(
+                """INSERT OR REPLACE INTO workflow_files (directory, name, path, size, mtime_ns,
+                                                         content_hash, node_count)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [(directory, entry['name'], entry['path'], entry['size'], entry['mtime_ns'],
+                  entry['content_hash'], entry['node_count']) for entry in files]
+            )
+            conn.executemany(
+                "DELETE FROM workflow_files WHERE directory = ? AND name = ?",
+                [(directory, name) for name in removed]
+            )
+    
     # Utility methods
-    def sync_workflows_from_directory(self, workspace_id: int, directory_path: str) -> Dict[str, str]:
-        """Sync workflows from workflows_json directory to database"""
-        directory = Path(directory_path)
-        if not directory.exists():
-            return {"error": f"Directory not found: {directory}"}
-        
-        json_files = list(directory.glob("*.json"))
-        if not json_files:
-            return {"message": "No JSON files found"}
-        
-        results = {"loaded": 0, "updated": 0, "errors": []}
+    def sync_workflow_files(self, workspace_id: int, files) -> Dict:
+        """
+        Sync workflow files (manifest entries with name, path, content_hash, node_count and
+        read_content()) into a workspace in one transaction. Workflows whose stored body already
+        has the same hash are skipped, so unchanged files are never read or written.
+        """
+        results = {"loaded": 0, "updated": 0, "unchanged": 0, "errors": []}
+        files = list(files)
         
         with self.get_connection() as conn:
-            for json_file in json_files:
+            existing = {
+                row['name']: row for row in conn.execute(
+                    "SELECT id, name, file_path, content_hash FROM workflows WHERE workspace_id = ?",
+                    (workspace_id,)
+                ).fetchall()
+            }
+            next_order = len(existing)
+            
+            for entry in files:
                 try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        json_content = f.read()
-                        data = json.loads(json_content)
-                    
-                    workflow_name = json_file.stem
-                    node_count = len(data.get('nodes', []))
-                    
-                    # Check if workflow exists
-                    existing = conn.execute(
-                        "SELECT id FROM workflows WHERE workspace_id = ? AND name = ?",
-                        (workspace_id, workflow_name)
-                    ).fetchone()
+                    current = existing.get(entry.name)
+                    if (current is not None and current['content_hash'] == entry.content_hash
+                            and current['file_path'] == entry.path):
+                        results["unchanged"] += 1
+                        continue
                     
-                    if existing:
+                    content_hash = store_workflow_content(conn, entry.read_content())
+                    if current is not None:
                         # Update existing workflow
                         conn.execute(
                             """UPDATE workflows 
-                               SET file_path = ?, json_content = ?, node_count = ?,
+                               SET file_path = ?, content_hash = ?, node_count = ?,
                                    updated_at = CURRENT_TIMESTAMP
                                WHERE id = ?""",
-                            (str(json_file), json_content, node_count, existing['id'])
+                            (entry.path, content_hash, entry.node_count, current['id'])
                         )
                         results["updated"] += 1
                     else:
                         # Create new workflow
                         conn.execute(
-                            """INSERT INTO workflows (workspace_id, name, file_path, json_content, 
+                            """INSERT INTO workflows (workspace_id, name, file_path, content_hash, 
                                                     node_count, display_order)
                                VALUES (?, ?, ?, ?, ?, ?)""",
-                            (workspace_id, workflow_name, str(json_file), json_content, 
-                             node_count, len(json_files))
+                            (workspace_id, entry.name, entry.path, content_hash,
+                             entry.node_count, next_order)
                         )
+                        next_order += 1
                         results["loaded"] += 1
                 
                 except Exception as e:
-                    results["errors"].append(f"{json_file.name}: {str(e)}")
+                    results["errors"].append(f"{entry.name}: {str(e)}")
         
         return results
     
+    def refresh_workflows_from_files(self, files) -> List[int]:
+        """
+        Point every workflow synced from one of `files` (matched by file path) at the file's
+        new content, in one transaction. Returns the IDs of the workflows that changed.
+        """
+        updated = []
+        with self.get_connection() as conn:
+            for entry in files:
+                rows = conn.execute(
+                    "SELECT id FROM workflows WHERE file_path = ? AND content_hash IS NOT ?",
+                    (entry.path, entry.content_hash)
+                ).fetchall()
+                if not rows:
+                    continue
+                
+                content_hash = store_workflow_content(conn, entry.read_content())
+                conn.executemany(
+                    """UPDATE workflows SET content_hash = ?, node_count = ?, updated_at = CURRENT_TIMESTAMP
+                       WHERE id = ?""",
+                    [(content_hash, entry.node_count, row['id']) for row in rows]
+                )
+                updated.extend(row['id'] for row in rows)
+        return updated
+    
+    def _execution_stats(self, conn, scope: str, key: int) -> Dict:
+        """Lifetime counters plus a rolling 24h window from the trigger-maintained stats tables"""
+        totals = conn.execute(
+            f"""SELECT total_executions, completed_executions, failed_executions,
+                       total_execution_time, last_completed_at
+                FROM {scope}_stats WHERE {scope}_id = ?""",
+            (key,)
+        ).fetchone()
+        recent = conn.execute(
+            f"""SELECT COALESCE(SUM(completed_executions), 0) AS completed,
+                       COALESCE(SUM(failed_executions), 0) AS failed,
+                       COALESCE(SUM(total_execution_time), 0) AS execution_time
+                FROM {scope}_stats_hourly
+                WHERE {scope}_id = ? AND hour > ?""",
+            (key, int(time.time()) // 3600 - 24)
+        ).fetchone()
+        
+        total = totals['total_executions'] if totals else 0
+        completed = totals['completed_executions'] if totals else 0
+        return {
+            "total_executions": total,
+            "completed_executions": completed,
+            "failed_executions": totals['failed_executions'] if totals else 0,
+            "total_execution_time": totals['total_execution_time'] if totals else 0.0,
+            "average_execution_time": totals['total_execution_time'] / completed if completed else 0.0,
+            "success_rate": completed / total * 100 if total else 0.0,
+            "last_completed_at": totals['last_completed_at'] if totals else None,
+            "recent_executions": {"completed": recent['completed'], "failed": recent['failed']},
+            "recent_execution_time": recent['execution_time']
+        }
+    
     def get_workspace_statistics(self, workspace_id: int) -> Dict:
-        """Get statistics for a workspace"""
+        """Get statistics for a workspace (constant cost regardless of execution history size)"""
         with self.get_connection() as conn:
             # Get workflow counts by status
             status_counts = conn.execute(
@@ -507,40 +772,21 @@ class DatabaseManager:
                 (workspace_id,)
             ).fetchall()
             
-            # Get total executions
-            total_executions = conn.execute(
-                """SELECT COUNT(*) as count 
-                   FROM workflow_executions we
-                   JOIN workflows w ON we.workflow_id = w.id
-                   WHERE w.workspace_id = ?""",
-                (workspace_id,)
-            ).fetchone()
-            
-            # Get recent execution success rate
-            recent_executions = conn.execute(
-                """SELECT we.status, COUNT(*) as count
-                   FROM workflow_executions we
-                   JOIN workflows w ON we.workflow_id = w.id
-                   WHERE w.workspace_id = ? AND we.started_at > datetime('now', '-24 hours')
-                   GROUP BY we.status""",
-                (workspace_id,)
-            ).fetchall()
-            
-            return {
-                "workflow_counts": {row['status']: row['count'] for row in status_counts},
-                "total_executions": total_executions['count'] if total_executions else 0,
-                "recent_executions": {row['status']: row['count'] for row in recent_executions}
-            }
+            stats = self._execution_stats(conn, 'workspace', workspace_id)
+            stats["workflow_counts"] = {row['status']: row['count'] for row in status_counts}
+            return stats
+    
+    def get_workflow_statistics(self, workflow_id: int) -> Dict:
+        """Get execution statistics for a single workflow"""
+        with self.get_connection() as conn:
+            return self._execution_stats(conn, 'workflow', workflow_id)
     
     def update_workspace_execution_stats(self, workspace_id: int):
         """Update workspace execution time and completion percentage"""
         with self.get_connection() as conn:
-            # Calculate total execution time
+            # Total execution time is maintained incrementally by the stats triggers
             total_time = conn.execute(
-                """SELECT SUM(we.execution_time) as total_time
-                   FROM workflow_executions we
-                   JOIN workflows w ON we.workflow_id = w.id
-                   WHERE w.workspace_id = ? AND we.status = 'completed'""",
+                "SELECT total_execution_time FROM workspace_stats WHERE workspace_id = ?",
                 (workspace_id,)
             ).fetchone()
             
@@ -554,7 +800,7 @@ class DatabaseManager:
                 (workspace_id,)
             ).fetchone()
             
-            total_execution_time = total_time['total_time'] or 0.0
+            total_execution_time = total_time['total_execution_time'] if total_time else 0.0
             completion_percentage = 0.0
             
             if completion_stats and completion_stats['total_workflows'] > 0:
@@ -570,6 +816,38 @@ class DatabaseManager:
             
             return total_execution_time, completion_percentage
     
+    def rebuild_execution_stats(self):
+        """Recompute the stats tables from workflow_executions (one-off, e.g. after upgrading a database)"""
+        final = "we.status IN ('completed', 'failed')"
+        completed_time = "CASE WHEN we.status = 'completed' THEN COALESCE(we.execution_time, 0) ELSE 0 END"
+        finished_at = "COALESCE(we.completed_at, we.started_at)"
+        hour = f"CAST(strftime('%s', {finished_at}) AS INTEGER) / 3600"
+        recent = f"{hour} > CAST(strftime('%s', 'now') AS INTEGER) / 3600 - 48"
+        
+        with self.get_connection() as conn:
+            for table in ('workflow_stats', 'workspace_stats', 'workflow_stats_hourly', 'workspace_stats_hourly'):
+                conn.execute(f"DELETE FROM {table}")
+            
+            for scope, key in (('workflow', 'we.workflow_id'), ('workspace', 'w.workspace_id')):
+                conn.execute(
+                    f"""INSERT INTO {scope}_stats ({scope}_id, total_executions, completed_executions,
+                                                  failed_executions, total_execution_time, last_completed_at)
+                        SELECT {key}, COUNT(*), SUM(we.status = 'completed'), SUM(we.status = 'failed'),
+                               SUM({completed_time}), MAX({finished_at})
+                        FROM workflow_executions we JOIN workflows w ON we.workflow_id = w.id
+                        WHERE {final}
+                        GROUP BY {key}"""
+                )
+                conn.execute(
+                    f"""INSERT INTO {scope}_stats_hourly ({scope}_id, hour, completed_executions,
+                                                         failed_executions, total_execution_time)
+                        SELECT {key}, {hour}, SUM(we.status = 'completed'), SUM(we.status = 'failed'),
+                               SUM({completed_time})
+                        FROM workflow_executions we JOIN workflows w ON we.workflow_id = w.id
+                        WHERE {final} AND {recent}
+                        GROUP BY {key}, {hour}"""
+                )
+    
     def add_execution_time_to_workspace(self, workspace_id: int, execution_time: float):
         """Add execution time to workspace total"""
         with self.get_connection() as conn:
@@ -0,0 +1,146 @@
+"""
+Buffered execution-history recorder for the `workflow_executions` table
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from .models import WorkflowExecution
+
+
+def _utc_timestamp(value: float) -> str:
+    """Format like SQLite's CURRENT_TIMESTAMP (UTC) so stored times compare consistently"""
+    return datetime.fromtimestamp(value, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class ExecutionRecorder:
+    """
+    Collects finished runs in memory and writes them in batched transactions from a
+    background thread, so recording history never blocks the engine loop or a request.
+
+    `record()` only appends to a deque. The flusher wakes every `flush_interval` seconds,
+    or as soon as `max_batch` runs are pending, and inserts everything it drained with one
+    executemany. If the database stays unavailable the buffer is capped at `max_pending`
+    and the oldest records are dropped (and counted) rather than growing without bound.
+    """
+
+    def __init__(self, db_manager, flush_interval: float = 1.0, max_batch: int = 500,
+                 max_pending: int = 50000):
+        self.db_manager = db_manager
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+
+        self._pending: deque = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # Statistics
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def record(self, workflow_id: int, success: bool, execution_time: Optional[float] = None,
+               error_message: Optional[str] = None, node_results: Optional[Dict] = None,
+               started_at: Optional[float] = None, run_id: Optional[str] = None):
+        """Queue one finished run; `started_at` is a UNIX timestamp"""
+        completed_at = time.time()
+        if started_at is None:
+            started_at = completed_at - (execution_time or 0.0)
+        execution = WorkflowExecution(
+            workflow_id=workflow_id,
+            status='completed' if success else 'failed',
+            execution_time=execution_time,
+            error_message=error_message,
+            node_results=node_results or None,
+            started_at=_utc_timestamp(started_at),
+            completed_at=_utc_timestamp(completed_at),
+            run_id=run_id
+        )
+
+        with self._condition:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(execution)
+            self.recorded += 1
+            if len(self._pending) >= self.max_batch:
+                self._condition.notify()
+
+    def flush(self) -> int:
+        """Write everything pending now; returns the number of rows inserted"""
+        with self._flush_lock:
+            written = 0
+            while True:
+                with self._condition:
+                    batch: List[WorkflowExecution] = [
+                        self._pending.popleft()
+                        for _ in range(min(self.max_batch, len(self._pending)))
+                    ]
+                if not batch:
+                    return written
+
+                try:
+                    written += self.db_manager.record_executions(batch)
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = str(e)
+                    print(f"⚠️ Execution recorder: failed to write {len(batch)} records: {e}")
+                    # Put the batch back in order and retry on the next flush
+                    with self._condition:
+                        self._pending.extendleft(reversed(batch))
+                        while len(self._pending) > self.max_pending:
+                            self._pending.popleft()
+                            self.dropped += 1
+                    return written
+
+                self.written += len(batch)
+                self.flushes += 1
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._pending) < self.max_batch:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def start(self):
+        """Start the background flusher (idempotent)"""
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="execution-recorder", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Stop the flusher after writing whatever is still pending"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        self.flush()
+
+    def get_stats(self) -> Dict:
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+            'flushes': self.flushes,
+            'errors': self.errors,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,257 @@
+"""
+Retention policy for execution history: archive node results, roll up and prune old rows
+"""
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class ExecutionArchive:
+    """
+    Compressed archive files for `node_results` of old executions.
+
+    Records are appended to one file per day (`node_results-YYYY-MM-DD.gz`), each as its own
+    gzip member. The returned reference (`file:offset:length`) lets `load()` read and
+    decompress a single run without scanning the file.
+    """
+
+    def __init__(self, archive_dir):
+        self.archive_dir = Path(archive_dir)
+        self._lock = threading.Lock()
+
+    def _path(self, day: str) -> Path:
+        return self.archive_dir / f"node_results-{day}.gz"
+
+    def write(self, day: str, records: List[Dict]) -> List[str]:
+        """Append records for `day`; returns one reference per record, in order"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(day)
+        refs = []
+        with self._lock, open(path, 'ab') as f:
+            offset = f.tell()
+            for record in records:
+                data = gzip.compress(json.dumps(record, separators=(',', ':')).encode('utf-8'))
+                f.write(data)
+                refs.append(f"{path.name}:{offset}:{len(data)}")
+                offset += len(data)
+            f.flush()
+        return refs
+
+    def load(self, ref: str) -> Optional[Dict]:
+        """Read the node_results stored under `ref` (None if the archive file is gone)"""
+        name, offset, length = ref.rsplit(':', 2)
+        path = self.archive_dir / Path(name).name
+        try:
+            with open(path, 'rb') as f:
+                f.seek(int(offset))
+                data = f.read(int(length))
+        except FileNotFoundError:
+            return None
+        return json.loads(gzip.decompress(data))
+
+    def remove_before(self, day: str) -> int:
+        """Delete archive files for days before `day`; returns the number removed"""
+        removed = 0
+        if not self.archive_dir.exists():
+            return removed
+        for path in self.archive_dir.glob("node_results-*.gz"):
+            if path.stem[len("node_results-"):] < day:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+class RetentionManager:
+    """
+    Keeps `workflow_executions` bounded.
+
+    - After `archive_after_days`, `node_results` JSON is moved to an ExecutionArchive file and
+      the row keeps only `archive_ref` (loaded lazily by `load_node_results`).
+    - After `retain_days`, rows are summed into `workflow_execution_daily` and deleted, and
+      archive files for those days are removed.
+    - With a `job_queue`, finished durable jobs (payload and result) are deleted after
+      `job_retain_days`.
+
+    Work is done in transactions of at most `batch_size` rows with a short pause between them,
+    so the recorder and the UI never wait behind a long-running compaction.
+    """
+
+    def __init__(self, db_manager, archive_dir, archive_after_days: int = 7, retain_days: int = 90,
+                 batch_size: int = 500, pause: float = 0.05, interval: float = 3600,
+                 job_queue=None, job_retain_days: float = 7):
+        if retain_days < archive_after_days:
+            raise ValueError("retain_days must be >= archive_after_days")
+        self.db_manager = db_manager
+        self.archive = ExecutionArchive(archive_dir)
+        self.archive_after_days = archive_after_days
+        self.retain_days = retain_days
+        self.job_queue = job_queue
+        self.job_retain_days = job_retain_days
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.archived = 0
+        self.rolled_up = 0
+        self.files_removed = 0
+        self.jobs_purged = 0
+        self.runs = 0
+        self.last_run_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def load_node_results(self, execution) -> Optional[Dict]:
+        """node_results of a WorkflowExecution, reading the archive only when they were moved there"""
+        if execution.node_results is None and execution.archive_ref:
+            return self.archive.load(execution.archive_ref)
+        return execution.node_results
+
+    def archive_batch(self) -> int:
+        """Move node_results of one batch of old executions to the archive; returns rows moved"""
+        with self.db_manager.get_connection() as conn:
+            rows = conn.execute(
+                """SELECT id, date(started_at) AS day, node_results FROM workflow_executions
+                   WHERE started_at < datetime('now', ?) AND node_results IS NOT NULL
+                   ORDER BY started_at
+                   LIMIT ?""",
+                (f'-{int(self.archive_after_days)} days', self.batch_size)
+            ).fetchall()
+            if not rows:
+                return 0
+
+            by_day = defaultdict(list)
+            for row in rows:
+                by_day[row['day']].append(row)
+
+            updates = []
+            for day, day_rows in by_day.items():
+                refs = self.archive.write(day, [json.loads(row['node_results']) for row in day_rows])
+                updates.extend((ref, row['id']) for ref, row in zip(refs, day_rows))
+
+            # Rows are only cleared after their archive data is on disk
+            conn.executemany(
+                "UPDATE workflow_executions SET node_results = NULL, archive_ref = ? WHERE id = ?",
+                updates
+            )
+        self.archived += len(updates)
+        return len(updates)
+
+    def rollup_batch(self) -> int:
+        """Roll one batch of expired executions into daily summaries and delete them; returns rows removed"""
+        with self.db_manager.get_connection() as conn:
+            ids = [row['id'] for row in conn.execute(
+                """SELECT id FROM workflow_executions
+                   WHERE started_at < datetime('now', ?)
+                   ORDER BY started_at
+                   LIMIT ?""",
+                (f'-{int(self.retain_days)} days', self.batch_size)
+            ).fetchall()]
+            if not ids:
+                return 0
+
+            placeholders = ','.join('?' * len(ids))
+            conn.execute(
+                f"""INSERT INTO workflow_execution_daily (workflow_id, day, completed_executions,
+                                                          failed_executions, total_execution_time,
+                                                          max_execution_time)
+                    SELECT workflow_id, date(started_at), SUM(status = 'completed'), SUM(status = 'failed'),
+                           SUM(CASE WHEN status = 'completed' THEN COALESCE(execution_time, 0) ELSE 0 END),
+                           MAX(execution_time)
+                    FROM workflow_executions
+                    WHERE id IN ({placeholders}) AND status IN ('completed', 'failed')
+                    GROUP BY workflow_id, date(started_at)
+                    ON CONFLICT(workflow_id, day) DO UPDATE SET
+                        completed_executions = completed_executions + excluded.completed_executions,
+                        failed_executions = failed_executions + excluded.failed_executions,
+                        total_execution_time = total_execution_time + excluded.total_execution_time,
+                        max_execution_time = MAX(COALESCE(max_execution_time, 0),
+                                                 COALESCE(excluded.max_execution_time, 0))""",
+                ids
+            )
+            conn.execute(f"DELETE FROM workflow_executions WHERE id IN ({placeholders})", ids)
+        self.rolled_up += len(ids)
+        return len(ids)
+
+    def purge_jobs_batch(self) -> int:
+        """Delete one batch of finished durable jobs older than `job_retain_days`; returns rows removed"""
+        if self.job_queue is None:
+            return 0
+        count = self.job_queue.purge_finished(self.job_retain_days * 86400, self.batch_size)
+        self.jobs_purged += count
+        return count
+
+    def run_once(self) -> Dict:
+        """Run a full compaction pass in small batches"""
+        archived = rolled_up = jobs_purged = 0
+        try:
+            # Roll up first so rows about to be deleted are not archived needlessly
+            while not self._stop_event.is_set():
+                count = self.rollup_batch()
+                rolled_up += count
+                if count < self.batch_size:
+                    break
+                time.sleep(self.pause)
+
+            while not self._stop_event.is_set():
+                count = self.archive_batch()
+                archived += count
+                if count < self.batch_size:
+                    break
+                time.sleep(self.pause)
+
+            while not self._stop_event.is_set():
+                count = self.purge_jobs_batch()
+                jobs_purged += count
+                if count < self.batch_size:
+                    break
+                time.sleep(self.pause)
+
+            cutoff = time.strftime('%Y-%m-%d', time.gmtime(time.time() - self.retain_days * 86400))
+            self.files_removed += self.archive.remove_before(cutoff)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Retention: compaction failed: {e}")
+
+        self.runs += 1
+        self.last_run_at = time.time()
+        return {'archived': archived, 'rolled_up': rolled_up, 'jobs_purged': jobs_purged}
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        """Start periodic compaction in a background thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="execution-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        return {
+            'archive_after_days': self.archive_after_days,
+            'retain_days': self.retain_days,
+            'archived': self.archived,
+            'rolled_up': self.rolled_up,
+            'files_removed': self.files_removed,
+            'job_retain_days': self.job_retain_days if self.job_queue is not None else None,
+            'jobs_purged': self.jobs_purged,
+            'runs': self.runs,
+            'last_run_at': self.last_run_at,
+            'last_error': self.last_error
+        }
@@ -25,7 +25,7 @@ CREATE TABLE IF NOT EXISTS workflows (
     name TEXT NOT NULL,
     file_path TEXT NOT NULL, -- Path to JSON file
     display_order INTEGER DEFAULT 0, -- For drag-and-drop ordering
-    json_content TEXT NOT NULL, -- Workflow JSON data
+    content_hash TEXT, -- Workflow JSON data, stored in workflow_contents
     node_count INTEGER DEFAULT 0,
     status TEXT DEFAULT 'pending', -- pending, running, completed, failed
     last_execution_time REAL, -- Execution time in seconds
@@ -36,6 +36,27 @@ CREATE TABLE IF NOT EXISTS workflows (
     UNIQUE(workspace_id, name)
 );
 
+-- Workflow JSON bodies, deduplicated by SHA-256 and zlib-compressed; kept out of the
+-- workflows rows so listing a workspace never reads them
+CREATE TABLE IF NOT EXISTS workflow_contents (
+    content_hash TEXT PRIMARY KEY,
+    content BLOB NOT NULL,
+    size INTEGER NOT NULL, -- Uncompressed size in bytes
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Manifest of workflow JSON files on disk, so directory syncs only re-read changed files
+CREATE TABLE IF NOT EXISTS workflow_files (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL, -- File stem, used as the workflow name
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL, -- SHA-256 of the file content (same key as workflow_contents)
+    node_count INTEGER DEFAULT 0,
+    PRIMARY KEY (directory, name)
+);
+
 -- Workflow execution history
 CREATE TABLE IF NOT EXISTS workflow_executions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -44,17 +65,232 @@ CREATE TABLE IF NOT EXISTS workflow_executions (
     execution_time REAL,
     error_message TEXT,
     node_results TEXT, -- JSON string with individual node results
+    run_id TEXT, -- ID of the WorkflowRun (deduplicates re-delivered results)
+    archive_ref TEXT, -- Location of node_results once moved to an archive file (file:offset:length)
     started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP,
     FOREIGN KEY (workflow_id) REFERENCES workflows (id) ON DELETE CASCADE
 );
 
+-- Execution statistics maintained incrementally by the triggers below, so stats reads
+-- never aggregate over workflow_executions (lifetime totals survive history pruning)
+CREATE TABLE IF NOT EXISTS workflow_stats (
+    workflow_id INTEGER PRIMARY KEY,
+    total_executions INTEGER DEFAULT 0,
+    completed_executions INTEGER DEFAULT 0,
+    failed_executions INTEGER DEFAULT 0,
+    total_execution_time REAL DEFAULT 0, -- Sum over completed executions
+    last_completed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS workspace_stats (
+    workspace_id INTEGER PRIMARY KEY,
+    total_executions INTEGER DEFAULT 0,
+    completed_executions INTEGER DEFAULT 0,
+    failed_executions INTEGER DEFAULT 0,
+    total_execution_time REAL DEFAULT 0, -- Sum over completed executions
+    last_completed_at TIMESTAMP
+);
+
+-- Hourly buckets (hour = unix time / 3600) for rolling windows; buckets older than 48h are pruned
+CREATE TABLE IF NOT EXISTS workflow_stats_hourly (
+    workflow_id INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    completed_executions INTEGER DEFAULT 0,
+    failed_executions INTEGER DEFAULT 0,
+    total_execution_time REAL DEFAULT 0,
+    PRIMARY KEY (workflow_id, hour)
+);
+
+CREATE TABLE IF NOT EXISTS workspace_stats_hourly (
+    workspace_id INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    completed_executions INTEGER DEFAULT 0,
+    failed_executions INTEGER DEFAULT 0,
+    total_execution_time REAL DEFAULT 0,
+    PRIMARY KEY (workspace_id, hour)
+);
+
+-- Daily per-workflow rollups of executions removed by the retention policy
+CREATE TABLE IF NOT EXISTS workflow_execution_daily (
+    workflow_id INTEGER NOT NULL,
+    day TEXT NOT NULL, -- YYYY-MM-DD (UTC)
+    completed_executions INTEGER DEFAULT 0,
+    failed_executions INTEGER DEFAULT 0,
+    total_execution_time REAL DEFAULT 0, -- Sum over completed executions
+    max_execution_time REAL,
+    PRIMARY KEY (workflow_id, day)
+);
+
+-- Compiled execution plans cache, keyed by SHA-256 of the workflow JSON
+CREATE TABLE IF NOT EXISTS execution_plans (
+    content_hash TEXT PRIMARY KEY,
+    plan_json TEXT NOT NULL, -- Normalized compiled plan (nodes, successor table, in-degrees)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Durable job queue (survives restarts; claimed through leases)
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL, -- workflow, batch, ...
+    payload TEXT NOT NULL, -- JSON payload for the job handler
+    priority INTEGER DEFAULT 0, -- Higher runs first
+    status TEXT DEFAULT 'queued', -- queued, leased, completed, failed
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    idempotency_key TEXT UNIQUE, -- Duplicate enqueues with the same key are ignored
+    cost INTEGER DEFAULT 1, -- Queue slots the job stands for (a batch counts once per workflow)
+    concurrency_key TEXT, -- At most concurrency_limit jobs with the same key are leased at once
+    concurrency_limit INTEGER,
+    lease_owner TEXT,
+    lease_expires_at REAL, -- Unix timestamp
+    available_at REAL NOT NULL, -- Unix timestamp; used for retry backoff
+    last_error TEXT,
+    result TEXT, -- JSON result of the handler
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
 -- Indexes for better performance
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, priority DESC, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(status, lease_expires_at);
 CREATE INDEX IF NOT EXISTS idx_workflows_workspace_id ON workflows(workspace_id);
+CREATE INDEX IF NOT EXISTS idx_workflows_file_path ON workflows(file_path);
+CREATE INDEX IF NOT EXISTS idx_workflows_workspace_order ON workflows(workspace_id, display_order, id);
 CREATE INDEX IF NOT EXISTS idx_workflows_status ON workflows(status);
 CREATE INDEX IF NOT EXISTS idx_workflow_executions_workflow_id ON workflow_executions(workflow_id);
 CREATE INDEX IF NOT EXISTS idx_workflow_executions_started_at ON workflow_executions(started_at);
 
+-- Statistics triggers: count an execution once it reaches a final status
+CREATE TRIGGER IF NOT EXISTS trg_workflow_executions_stats_insert
+AFTER INSERT ON workflow_executions
+WHEN NEW.status IN ('completed', 'failed')
+BEGIN
+    INSERT INTO workflow_stats (workflow_id, total_executions, completed_executions, failed_executions,
+                                total_execution_time, last_completed_at)
+    VALUES (NEW.workflow_id, 1, (NEW.status = 'completed'), (NEW.status = 'failed'), (CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.execution_time, 0) ELSE 0 END), COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP))
+    ON CONFLICT(workflow_id) DO UPDATE SET
+        total_executions = total_executions + 1,
+        completed_executions = completed_executions + excluded.completed_executions,
+        failed_executions = failed_executions + excluded.failed_executions,
+        total_execution_time = total_execution_time + excluded.total_execution_time,
+        last_completed_at = MAX(COALESCE(last_completed_at, ''), excluded.last_completed_at);
+
+    INSERT INTO workflow_stats_hourly (workflow_id, hour, completed_executions, failed_executions,
+                                       total_execution_time)
+    VALUES (NEW.workflow_id, CAST(strftime('%s', COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600, (NEW.status = 'completed'), (NEW.status = 'failed'), (CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.execution_time, 0) ELSE 0 END))
+    ON CONFLICT(workflow_id, hour) DO UPDATE SET
+        completed_executions = completed_executions + excluded.completed_executions,
+        failed_executions = failed_executions + excluded.failed_executions,
+        total_execution_time = total_execution_time + excluded.total_execution_time;
+
+    INSERT INTO workspace_stats (workspace_id, total_executions, completed_executions, failed_executions,
+                                 total_execution_time, last_completed_at)
+    SELECT workspace_id, 1, (NEW.status = 'completed'), (NEW.status = 'failed'), (CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.execution_time, 0) ELSE 0 END), COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)
+    FROM workflows WHERE id = NEW.workflow_id
+    ON CONFLICT(workspace_id) DO UPDATE SET
+        total_executions = total_executions + 1,
+        completed_executions = completed_executions + excluded.completed_executions,
+        failed_executions = failed_executions + excluded.failed_executions,
+        total_execution_time = total_execution_time + excluded.total_execution_time,
+        last_completed_at = MAX(COALESCE(last_completed_at, ''), excluded.last_completed_at);
+
+    INSERT INTO workspace_stats_hourly (workspace_id, hour, completed_executions, failed_executions,
+                                        total_execution_time)
+    SELECT workspace_id, CAST(strftime('%s', COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600, (NEW.status = 'completed'), (NEW.status = 'failed'), (CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.execution_time, 0) ELSE 0 END)
+    FROM workflows WHERE id = NEW.workflow_id
+    ON CONFLICT(workspace_id, hour) DO UPDATE SET
+        completed_executions = completed_executions + excluded.completed_executions,
+        failed_executions = failed_executions + excluded.failed_executions,
+        total_execution_time = total_execution_time + excluded.total_execution_time;
+
+    DELETE FROM workflow_stats_hourly
+    WHERE workflow_id = NEW.workflow_id AND hour < CAST(strftime('%s', COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600 - 48;
+    DELETE FROM workspace_stats_hourly
+    WHERE workspace_id = (SELECT workspace_id FROM workflows WHERE id = NEW.workflow_id) AND hour < CAST(strftime('%s', COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600 - 48;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_workflow_executions_stats_update
+AFTER UPDATE OF status ON workflow_executions
+WHEN OLD.status NOT IN ('completed', 'failed') AND NEW.status IN ('completed', 'failed')
+BEGIN
+    INSERT INTO workflow_stats (workflow_id, total_executions, completed_executions, failed_executions,
+                                total_execution_time, last_completed_at)
+    VALUES (NEW.workflow_id, 1, (NEW.status = 'completed'), (NEW.status = 'failed'), (CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.execution_time, 0) ELSE 0 END), COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP))
+    ON CONFLICT(workflow_id) DO UPDATE SET
+        total_executions = total_executions + 1,
+        completed_executions = completed_executions + excluded.completed_executions,
+        failed_executions = failed_executions + excluded.failed_executions,
+        total_execution_time = total_execution_time + excluded.total_execution_time,
+        last_completed_at = MAX(COALESCE(last_completed_at, ''), excluded.last_completed_at);
+
+    INSERT INTO workflow_stats_hourly (workflow_id, hour, completed_executions, failed_executions,
+                                       total_execution_time)
+    VALUES (NEW.workflow_id, CAST(strftime('%s', COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600, (NEW.status = 'completed'), (NEW.status = 'failed'), (CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.execution_time, 0) ELSE 0 END))
+    ON CONFLICT(workflow_id, hour) DO UPDATE SET
+        completed_executions = completed_executions + excluded.completed_executions,
+        failed_executions = failed_executions + excluded.failed_executions,
+        total_execution_time = total_execution_time + excluded.total_execution_time;
+
+    INSERT INTO workspace_stats (workspace_id, total_executions, completed_executions, failed_executions,
+                                 total_execution_time, last_completed_at)
+    SELECT workspace_id, 1, (NEW.status = 'completed'), (NEW.status = 'failed'), (CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.execution_time, 0) ELSE 0 END), COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)
+    FROM workflows WHERE id = NEW.workflow_id
+    ON CONFLICT(workspace_id) DO UPDATE SET
+        total_executions = total_executions + 1,
+        completed_executions = completed_executions + excluded.completed_executions,
+        failed_executions = failed_executions + excluded.failed_executions,
+        total_execution_time = total_execution_time + excluded.total_execution_time,
+        last_completed_at = MAX(COALESCE(last_completed_at, ''), excluded.last_completed_at);
+
+    INSERT INTO workspace_stats_hourly (workspace_id, hour, completed_executions, failed_executions,
+                                        total_execution_time)
+    SELECT workspace_id, CAST(strftime('%s', COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600, (NEW.status = 'completed'), (NEW.status = 'failed'), (CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.execution_time, 0) ELSE 0 END)
+    FROM workflows WHERE id = NEW.workflow_id
+    ON CONFLICT(workspace_id, hour) DO UPDATE SET
+        completed_executions = completed_executions + excluded.completed_executions,
+        failed_executions = failed_executions + excluded.failed_executions,
+        total_execution_time = total_execution_time + excluded.total_execution_time;
+
+    DELETE FROM workflow_stats_hourly
+    WHERE workflow_id = NEW.workflow_id AND hour < CAST(strftime('%s', COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600 - 48;
+    DELETE FROM workspace_stats_hourly
+    WHERE workspace_id = (SELECT workspace_id FROM workflows WHERE id = NEW.workflow_id) AND hour < CAST(strftime('%s', COALESCE(NEW.completed_at, NEW.started_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600 - 48;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_workflows_stats_delete
+AFTER DELETE ON workflows
+BEGIN
+    DELETE FROM workflow_stats WHERE workflow_id = OLD.id;
+    DELETE FROM workflow_stats_hourly WHERE workflow_id = OLD.id;
+    DELETE FROM workflow_execution_daily WHERE workflow_id = OLD.id;
+END;
+
+-- Drop workflow bodies no other workflow references
+CREATE TRIGGER IF NOT EXISTS trg_workflows_content_delete
+AFTER DELETE ON workflows
+BEGIN
+    DELETE FROM workflow_contents
+    WHERE content_hash = OLD.content_hash
+      AND NOT EXISTS (SELECT 1 FROM workflows WHERE content_hash = OLD.content_hash);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_workflows_content_update
+AFTER UPDATE OF content_hash ON workflows
+WHEN OLD.content_hash IS NOT NEW.content_hash
+BEGIN
+    DELETE FROM workflow_contents
+    WHERE content_hash = OLD.content_hash
+      AND NOT EXISTS (SELECT 1 FROM workflows WHERE content_hash = OLD.content_hash);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_workspaces_stats_delete
+AFTER DELETE ON workspaces
+BEGIN
+    DELETE FROM workspace_stats WHERE workspace_id = OLD.id;
+    DELETE FROM workspace_stats_hourly WHERE workspace_id = OLD.id;
+END;
+
 -- Default workspace
 INSERT OR IGNORE INTO workspaces (id, name, description, max_concurrent_workflows) 
 VALUES (1, 'Default Workspace', 'Workspace mặc định cho tất cả workflow', 3);
\ No newline at end of file
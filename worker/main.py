@@ -10,6 +10,8 @@ import argparse
 import sys
 from pathlib import Path
 from core.workflow_manager import WorkflowManager
+from core.fleet import FleetWorker
+from core.log import configure_logging
 
 # Proxy settings mẫu
 SAMPLE_PROXY_SETTINGS = {
@@ -29,6 +31,7 @@ Ví dụ sử dụng:
   python main.py --load workflows_json/sample.json --run sample
   python main.py --load-dir workflows_json --list --status
   python main.py --load-dir workflows_json --run-pending --max-concurrent 3
+  python main.py --fleet http://localhost:5001 --worker-id worker-1 --max-concurrent 3 --headless
         """
     )
     
@@ -117,11 +120,47 @@ Ví dụ sử dụng:
         help='Chạy browser ở chế độ headless (ẩn)'
     )
 
+    # Tùy chọn fleet (chạy như worker của control plane app.py)
+    parser.add_argument(
+        '--fleet',
+        type=str,
+        help='URL của control plane; worker nhận job qua HTTP thay vì chạy workflow cục bộ'
+    )
+    
+    parser.add_argument(
+        '--worker-id',
+        type=str,
+        help='ID của worker trong fleet (mặc định: hostname-pid)'
+    )
+
+    # Tùy chọn log (mặc định lấy từ LOG_FORMAT / LOG_LEVEL / LOG_QUIET)
+    parser.add_argument(
+        '--log-format',
+        choices=['human', 'json'],
+        help='Định dạng log của engine: human hoặc json (JSON lines)'
+    )
+    
+    parser.add_argument(
+        '--log-level',
+        type=str,
+        help='Mức log tối thiểu (DEBUG, INFO, WARNING, ERROR)'
+    )
+    
+    parser.add_argument(
+        '--quiet', '-q',
+        action='store_true',
+        help='Chỉ ghi log WARNING trở lên (chế độ production)'
+    )
+
     args = parser.parse_args()
+    configure_logging(level=args.log_level, fmt=args.log_format, quiet=args.quiet or None)
     
     # Tạo WorkflowManager
     print("🚀 Khởi tạo Workflow Manager...")
-    manager = WorkflowManager(max_concurrent_workflows=args.max_concurrent)
+    manager = WorkflowManager(
+        max_concurrent_workflows=args.max_concurrent,
+        headless=args.headless
+    )
     
     # Chuẩn bị proxy settings
     proxy_settings = SAMPLE_PROXY_SETTINGS if args.use_proxy else None
@@ -129,6 +168,12 @@ Ví dụ sử dụng:
         print("🌐 Sử dụng proxy settings cho tất cả workflow")
     
     try:
+        # Chế độ fleet: số slot trống (--max-concurrent) được báo cho control plane qua heartbeat
+        if args.fleet:
+            worker = FleetWorker(manager, args.fleet, args.worker_id)
+            await worker.run_forever()
+            return 0
+        
         # Tải workflow
         if args.load:
             # Tải từ file cụ thể
@@ -230,6 +275,10 @@ Ví dụ sử dụng:
     except Exception as e:
         print(f"❌ Lỗi không mong đợi: {e}")
         return 1
+    
+    finally:
+        # Đóng browser pool dùng chung
+        await manager.close()
 
 def create_sample_workflow():
     """Tạo file workflow mẫu nếu chưa tồn tại."""
@@ -28,10 +28,10 @@ class RunningState(WorkflowState):
         return "Running"
 
 class CompletedState(WorkflowState):
-    """Trạng thái hoàn thành - workflow đã chạy thành công."""
+    """Trạng thái hoàn thành - lần chạy (WorkflowRun) đã kết thúc thành công."""
     
     def can_run(self) -> bool:
-        return False  # Workflow đã hoàn thành, không thể chạy lại
+        return False  # Lần chạy đã hoàn thành; muốn chạy lại thì tạo WorkflowRun mới
     
     def get_next_state(self, success: bool):
         return self  # Giữ nguyên trạng thái
@@ -44,68 +44,57 @@ class AutomationUI {
             this.updateConnectionStatus(false);
         });
         
-        // Real-time workflow events
-        this.socket.on('workflow_started', (data) => {
-            this.onWorkflowStarted(data);
-        });
-        
-        this.socket.on('node_started', (data) => {
-            this.onNodeStarted(data);
-        });
-        
-        this.socket.on('node_completed', (data) => {
-            this.onNodeCompleted(data);
-        });
-        
-        this.socket.on('node_error', (data) => {
-            this.onNodeError(data);
-        });
-        
-        this.socket.on('workflow_completed', (data) => {
-            this.onWorkflowCompleted(data);
-        });
-        
-        this.socket.on('workflow_error', (data) => {
-            this.onWorkflowError(data);
-        });
-        
-        this.socket.on('workflows_reordered', (data) => {
-            this.onWorkflowsReordered(data);
-        });
-        
-        this.socket.on('batch_execution_started', (data) => {
-            this.onBatchExecutionStarted(data);
-        });
-        
-        this.socket.on('batch_execution_progress', (data) => {
-            this.onBatchExecutionProgress(data);
+        // Real-time workflow events (also delivered in batches, see 'events' below)
+        this.socketHandlers = {
+            workflow_started: (data) => this.onWorkflowStarted(data),
+            node_started: (data) => this.onNodeStarted(data),
+            node_completed: (data) => this.onNodeCompleted(data),
+            node_error: (data) => this.onNodeError(data),
+            workflow_completed: (data) => this.onWorkflowCompleted(data),
+            workflow_error: (data) => this.onWorkflowError(data),
+            workflows_reordered: (data) => this.onWorkflowsReordered(data),
+            batch_execution_started: (data) => this.onBatchExecutionStarted(data),
+            batch_execution_progress: (data) => this.onBatchExecutionProgress(data),
+            batch_execution_completed: (data) => this.onBatchExecutionCompleted(data),
+            events_dropped: (data) => this.onEventsDropped(data)
+        };
+        Object.entries(this.socketHandlers).forEach(([event, handler]) => {
+            this.socket.on(event, handler);
         });
         
-        this.socket.on('batch_execution_completed', (data) => {
-            this.onBatchExecutionCompleted(data);
+        // The server coalesces events into batches; acknowledging a batch lets it send the next one
+        this.socket.on('events', (batch, ack) => {
+            batch.forEach(({ event, data }) => {
+                const handler = this.socketHandlers[event];
+                if (handler) handler(data);
+            });
+            if (ack) ack();
         });
         
         // Workspace events
-        this.socket.on('workspace_created', (data) => {
+        this.socketHandlers.workspace_created = (data) => {
             this.workspaces.push(data);
             this.renderWorkspaces();
-        });
+        };
         
-        this.socket.on('workspace_updated', (data) => {
+        this.socketHandlers.workspace_updated = (data) => {
             const index = this.workspaces.findIndex(w => w.id === data.id);
             if (index !== -1) {
                 this.workspaces[index] = data;
                 this.renderWorkspaces();
             }
-        });
+        };
         
-        this.socket.on('workspace_deleted', (data) => {
+        this.socketHandlers.workspace_deleted = (data) => {
             this.workspaces = this.workspaces.filter(w => w.id !== data.id);
             this.renderWorkspaces();
             if (this.currentWorkspace && this.currentWorkspace.id === data.id) {
                 this.currentWorkspace = null;
                 this.selectWorkspace(null);
             }
+        };
+        ['workspace_created', 'workspace_updated', 'workspace_deleted'].forEach((event) => {
+            this.socket.on(event, this.socketHandlers[event]);
         });
     }
     
@@ -459,8 +448,17 @@ class AutomationUI {
     
     async loadWorkflows(workspaceId) {
         try {
-            const response = await fetch(`/api/workspaces/${workspaceId}/workflows`);
-            this.workflows = await response.json();
+            // Fetch page by page; the server returns the next cursor in X-Next-Cursor
+            const workflows = [];
+            let cursor = null;
+            do {
+                const params = new URLSearchParams({ limit: 500 });
+                if (cursor) params.set('cursor', cursor);
+                const response = await fetch(`/api/workspaces/${workspaceId}/workflows?${params}`);
+                workflows.push(...await response.json());
+                cursor = response.headers.get('X-Next-Cursor');
+            } while (cursor);
+            this.workflows = workflows;
             this.renderWorkflows();
             this.updateWorkflowCount();
         } catch (error) {
@@ -533,6 +531,10 @@ class AutomationUI {
     }
     
     selectWorkspace(workspace) {
+        // Events are delivered per workspace room: stop receiving the previous workspace's
+        if (this.currentWorkspace && (!workspace || this.currentWorkspace.id !== workspace.id)) {
+            this.socket.emit('leave_workspace', { workspace_id: this.currentWorkspace.id });
+        }
         this.currentWorkspace = workspace;
         this.currentWorkflow = null;
         
@@ -860,6 +862,7 @@ class AutomationUI {
             
             // API & Network
             'httpRequest': 'fas fa-exchange-alt',
+            'httpRequestBatch': 'fas fa-layer-group',
             'mockResponse': 'fas fa-server',
             'setCookie': 'fas fa-cookie-bite',
             'clearCookies': 'fas fa-trash',
@@ -1116,6 +1119,14 @@ class AutomationUI {
         );
     }
     
+    onEventsDropped(data) {
+        // Some progress events were skipped while this tab was slow; reload the current state
+        console.log('Realtime events dropped:', data);
+        if (this.currentWorkspace) {
+            this.loadWorkflows(this.currentWorkspace.id);
+        }
+    }
+    
     onBatchExecutionProgress(data) {
         console.log('Batch execution progress:', data);
         // Update progress indicator if needed
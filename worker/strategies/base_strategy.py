@@ -6,17 +6,24 @@ except ImportError:
     # Mock Page for testing without Playwright
     Page = object
 
+# Khóa trong context chứa run_id của lần chạy (WorkflowRun đặt trước khi chạy node đầu tiên)
+RUN_ID_KEY = '_run_id'
+
 class NodeStrategy(ABC):
     """
     Lớp cơ sở trừu tượng cho tất cả các chiến lược thực thi node.
     Mỗi loại node (goto, click, fill) sẽ có một lớp strategy riêng kế thừa từ lớp này.
     """
+    # Các tham số bắt buộc, được kiểm tra một lần khi biên dịch workflow
+    required_params: tuple = ()
+
     @abstractmethod
     async def execute(self, page: Page, params: dict, context: dict = None):
         """
         Phương thức thực thi logic chính của node.
         :param page: Đối tượng Page của Playwright để tương tác với trình duyệt.
         :param params: Các tham số được định nghĩa trong file JSON cho node này.
-        :param context: Context chung của workflow để chia sẻ dữ liệu giữa các nodes.
+        :param context: Context chung của workflow để chia sẻ dữ liệu giữa các nodes
+                        (`context[RUN_ID_KEY]` là run_id của lần chạy).
         """
         pass
\ No newline at end of file
@@ -0,0 +1,121 @@
+import logging
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Một lệnh đã biên dịch: (loại 'text' | 'attr', selector con, tên thuộc tính, tên trường)
+ExtractCommand = Tuple[str, str, str, str]
+
+# Số item mỗi lần gọi vào trang: danh sách lớn được lấy theo từng phần để giới hạn
+# kích thước dữ liệu phải serialize trong một round trip
+DEFAULT_CHUNK_SIZE = 1000
+
+# Chạy trong trang trên toàn bộ phần tử khớp selector của item (một round trip cho cả phần
+# [start, end)). Selector con không phải CSS hợp lệ (cú pháp riêng của Playwright như `text=`)
+# được báo lại để phía Python chuyển sang cách trích xuất từng item.
+_EXTRACT_SCRIPT = """
+(elements, [commands, start, end]) => {
+    const fragment = document.createDocumentFragment();
+    for (const [, selector] of commands) {
+        if (!selector) continue;
+        try {
+            fragment.querySelector(selector);
+        } catch (e) {
+            return {unsupported: selector};
+        }
+    }
+    const stop = end === null ? elements.length : Math.min(end, elements.length);
+    const rows = [];
+    for (let i = start; i < stop; i++) {
+        const item = elements[i];
+        const row = {};
+        for (const [kind, selector, attr, field] of commands) {
+            const target = selector ? item.querySelector(selector) : item;
+            row[field] = !target ? null : kind === 'text' ? target.textContent : target.getAttribute(attr);
+        }
+        rows.push(row);
+    }
+    return {total: elements.length, rows};
+}
+"""
+
+
+@lru_cache(maxsize=256)
+def compile_extract_commands(commands: Tuple[str, ...]) -> Tuple[ExtractCommand, ...]:
+    """
+    Phân tích các lệnh `EXTRACT_TEXT:<selector>><field>` và `EXTRACT_ATTR:<selector>@<attr>><field>`
+    một lần cho mỗi danh sách lệnh. Lệnh sai định dạng bị bỏ qua như trước đây.
+    """
+    compiled = []
+    for command in commands:
+        parts = command.split('>')
+        if len(parts) != 2:
+            continue
+        spec, field_name = parts
+        if spec.startswith('EXTRACT_TEXT:'):
+            compiled.append(('text', spec[len('EXTRACT_TEXT:'):], '', field_name))
+        elif spec.startswith('EXTRACT_ATTR:'):
+            selector_and_attr = spec[len('EXTRACT_ATTR:'):].split('@')
+            if len(selector_and_attr) == 2:
+                compiled.append(('attr', selector_and_attr[0], selector_and_attr[1], field_name))
+    return tuple(compiled)
+
+
+async def iter_per_item(locator, commands: Tuple[ExtractCommand, ...],
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[List[Dict]]:
+    """Trích xuất từng item và từng lệnh qua Playwright (mỗi giá trị một round trip)."""
+    chunk = []
+    for item in await locator.all():
+        item_data = {}
+        for kind, selector, attr, field_name in commands:
+            target = item.locator(selector) if selector else item
+            item_data[field_name] = await (target.text_content() if kind == 'text' else target.get_attribute(attr))
+        chunk.append(item_data)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def extract_per_item(locator, commands: Tuple[ExtractCommand, ...]) -> List[Dict]:
+    """Toàn bộ kết quả của `iter_per_item` trong một list."""
+    rows = []
+    async for chunk in iter_per_item(locator, commands, 0):
+        rows.extend(chunk)
+    return rows
+
+
+async def iter_extract_chunks(locator, commands: Tuple[ExtractCommand, ...],
+                              chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[List[Dict]]:
+    """
+    Trích xuất theo từng phần `chunk_size` item, mỗi phần là một lần evaluate trong trang.
+    `chunk_size <= 0` lấy tất cả trong một lần. Nếu selector con không phải CSS, kết quả được lấy
+    bằng `iter_per_item` (vẫn theo từng phần).
+    """
+    start = 0
+    while True:
+        end = start + chunk_size if chunk_size > 0 else None
+        result = await locator.evaluate_all(_EXTRACT_SCRIPT, [commands, start, end])
+        if 'unsupported' in result:
+            logger.warning("⚠️ Selector '%s' không phải CSS, trích xuất từng item", result['unsupported'])
+            async for chunk in iter_per_item(locator, commands, chunk_size):
+                yield chunk
+            return
+        rows = result['rows']
+        if rows:
+            yield rows
+        start += len(rows)
+        # Số item được đọc lại mỗi lần: dừng khi đã hết (kể cả khi danh sách co lại)
+        if end is None or not rows or start >= result['total']:
+            return
+
+
+async def extract_rows(locator, commands: Tuple[ExtractCommand, ...],
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict]:
+    """Toàn bộ kết quả của `iter_extract_chunks` trong một list."""
+    rows = []
+    async for chunk in iter_extract_chunks(locator, commands, chunk_size):
+        rows.extend(chunk)
+    return rows
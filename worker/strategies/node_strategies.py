@@ -4,76 +4,102 @@ except ImportError:
     # Mock Page for testing without Playwright
     Page = object
 
-from .base_strategy import NodeStrategy
+from .base_strategy import RUN_ID_KEY, NodeStrategy
+from .bulk_extract import DEFAULT_CHUNK_SIZE, compile_extract_commands, extract_rows, iter_extract_chunks
+from .sinks import sink_from_params, stream_to_sink
+from core.http_client import HostRateLimiter, get_http_client
 import asyncio
+import logging
+import re
+import time
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
 
 class StartNodeStrategy(NodeStrategy):
     async def execute(self, page: Page, params: dict, context: dict = None):
-        print("▶️ Bắt đầu thực thi workflow...")
+        logger.info("▶️ Bắt đầu thực thi workflow...")
 
 class StopNodeStrategy(NodeStrategy):
     async def execute(self, page: Page, params: dict, context: dict = None):
-        print("⏹️ Workflow đã hoàn thành.")
+        logger.info("⏹️ Workflow đã hoàn thành.")
 
 class GotoNodeStrategy(NodeStrategy):
+    required_params = ('url',)
+
     async def execute(self, page: Page, params: dict, context: dict = None):
         url = params.get('url')
         if not url:
             raise ValueError("Node 'goto' yêu cầu tham số 'url'.")
-        print(f"🚀 Điều hướng tới: {url}")
+        logger.info("🚀 Điều hướng tới: %s", url)
         await page.goto(url)
 
 class ClickNodeStrategy(NodeStrategy):
+    required_params = ('selector',)
+
     async def execute(self, page: Page, params: dict, context: dict = None):
         selector = params.get('selector')
         if not selector:
             raise ValueError("Node 'click' yêu cầu tham số 'selector'.")
-        print(f"🖱️ Click vào phần tử: {selector}")
+        logger.info("🖱️ Click vào phần tử: %s", selector)
         await page.locator(selector).click()
 
 class FillNodeStrategy(NodeStrategy):
+    required_params = ('selector',)
+
     async def execute(self, page: Page, params: dict, context: dict = None):
         selector = params.get('selector')
         value = params.get('value', '')
         if not selector:
             raise ValueError("Node 'fill' yêu cầu tham số 'selector'.")
-        print(f"✏️ Nhập text '{value}' vào: {selector}")
+        logger.info("✏️ Nhập text '%s' vào: %s", value, selector)
         await page.locator(selector).fill(value)
 
 class SelectOptionStrategy(NodeStrategy):
+    required_params = ('selector', 'value')
+
     async def execute(self, page: Page, params: dict, context: dict = None):
         selector = params.get('selector')
         value = params.get('value')
         if not selector or value is None:
             raise ValueError("Node 'selectOption' yêu cầu tham số 'selector' và 'value'.")
-        print(f"📋 Chọn option '{value}' trong: {selector}")
+        logger.info("📋 Chọn option '%s' trong: %s", value, selector)
         await page.locator(selector).select_option(value)
 
 class SetCheckboxStateStrategy(NodeStrategy):
+    required_params = ('selector',)
+
     async def execute(self, page: Page, params: dict, context: dict = None):
         selector = params.get('selector')
         checked = params.get('checked', True)
         if not selector:
             raise ValueError("Node 'setCheckboxState' yêu cầu tham số 'selector'.")
-        print(f"☑️ {'Check' if checked else 'Uncheck'} checkbox: {selector}")
+        logger.info("☑️ %s checkbox: %s", 'Check' if checked else 'Uncheck', selector)
         await page.locator(selector).set_checked(checked)
 
 class AssertVisibleStrategy(NodeStrategy):
+    required_params = ('selector',)
+
     async def execute(self, page: Page, params: dict, context: dict = None):
         selector = params.get('selector')
         if not selector:
             raise ValueError("Node 'assertVisible' yêu cầu tham số 'selector'.")
-        print(f"👀 Kiểm tra hiển thị của: {selector}")
+        logger.info("👀 Kiểm tra hiển thị của: %s", selector)
         await page.locator(selector).wait_for(state='visible')
-        print(f"✅ Phần tử {selector} hiển thị thành công")
+        logger.info("✅ Phần tử %s hiển thị thành công", selector)
 
 class WaitNodeStrategy(NodeStrategy):
     async def execute(self, page: Page, params: dict, context: dict = None):
         timeout = params.get('timeout', 1000)
-        print(f"⏳ Chờ {timeout}ms...")
+        logger.info("⏳ Chờ %sms...", timeout)
         await asyncio.sleep(timeout / 1000)
 
+async def _single_chunk(rows: list):
+    yield rows
+
 class ExtractTextStrategy(NodeStrategy):
+    required_params = ('selector',)
+
     async def execute(self, page: Page, params: dict, context: dict = None):
         selector = params.get('selector')
         variable_name = params.get('variableName', 'extracted_text')
@@ -81,11 +107,20 @@ class ExtractTextStrategy(NodeStrategy):
             raise ValueError("Node 'extractText' yêu cầu tham số 'selector'.")
         
         text = await page.locator(selector).text_content()
+        sink = await sink_from_params(params, variable_name, (context or {}).get(RUN_ID_KEY))
+        if sink:
+            handle = await stream_to_sink(sink, _single_chunk([{variable_name: text}]))
+            if context:
+                context[variable_name] = handle
+            logger.info("📝 Trích xuất text từ %s -> %s (%s)", selector, variable_name, handle['path'])
+            return
         if context:
             context[variable_name] = text
-        print(f"📝 Trích xuất text từ {selector}: '{text}' -> {variable_name}")
+        logger.info("📝 Trích xuất text từ %s: '%s' -> %s", selector, text, variable_name)
 
 class ExtractMultipleStrategy(NodeStrategy):
+    required_params = ('containerSelector', 'itemSelector')
+
     async def execute(self, page: Page, params: dict, context: dict = None):
         container_selector = params.get('containerSelector')
         item_selector = params.get('itemSelector')
@@ -95,39 +130,30 @@ class ExtractMultipleStrategy(NodeStrategy):
         if not container_selector or not item_selector:
             raise ValueError("Node 'extractMultiple' yêu cầu 'containerSelector' và 'itemSelector'.")
         
-        items = await page.locator(f"{container_selector} {item_selector}").all()
-        results = []
-        
-        for item in items:
-            item_data = {}
-            for command in extract_commands:
-                if command.startswith('EXTRACT_TEXT:'):
-                    parts = command.split('>')
-                    if len(parts) == 2:
-                        selector_part = parts[0].replace('EXTRACT_TEXT:', '')
-                        field_name = parts[1]
-                        text = await item.locator(selector_part).text_content()
-                        item_data[field_name] = text
-                elif command.startswith('EXTRACT_ATTR:'):
-                    parts = command.split('>')
-                    if len(parts) == 2:
-                        attr_part = parts[0].replace('EXTRACT_ATTR:', '')
-                        field_name = parts[1]
-                        selector_and_attr = attr_part.split('@')
-                        if len(selector_and_attr) == 2:
-                            selector_part, attr = selector_and_attr
-                            attr_value = await item.locator(selector_part).get_attribute(attr)
-                            item_data[field_name] = attr_value
-            results.append(item_data)
+        # Lệnh được biên dịch một lần; toàn bộ item được trích xuất trong trang theo từng phần
+        commands = compile_extract_commands(tuple(extract_commands))
+        locator = page.locator(f"{container_selector} {item_selector}")
+        chunk_size = params.get('chunkSize', DEFAULT_CHUNK_SIZE)
+        
+        # Với sink, từng phần được ghi ngay rồi bỏ đi: context chỉ giữ handle (đường dẫn, số dòng)
+        sink = await sink_from_params(params, variable_name, (context or {}).get(RUN_ID_KEY))
+        if sink:
+            handle = await stream_to_sink(sink, iter_extract_chunks(locator, commands, chunk_size))
+            if context:
+                context[variable_name] = handle
+            logger.info("📊 Trích xuất %d items -> %s (%s)", handle['rows'], variable_name, handle['path'])
+            return
+        
+        results = await extract_rows(locator, commands, chunk_size)
         
         if context:
             context[variable_name] = results
-        print(f"📊 Trích xuất {len(results)} items -> {variable_name}")
+        logger.info("📊 Trích xuất %d items -> %s", len(results), variable_name)
 
 class HttpRequestStrategy(NodeStrategy):
+    required_params = ('url',)
+
     async def execute(self, page: Page, params: dict, context: dict = None):
-        import aiohttp
-        
         method = params.get('method', 'GET').upper()
         url = params.get('url')
         data_source = params.get('dataSource')
@@ -142,37 +168,133 @@ class HttpRequestStrategy(NodeStrategy):
                 var_name = data_source.replace('GET_VARIABLE:', '')
                 source_data = context.get(var_name)
         
-        print(f"🌐 HTTP {method} request tới: {url}")
+        logger.info("🌐 HTTP %s request tới: %s", method, url)
         
-        async with aiohttp.ClientSession() as session:
-            if method == 'GET':
-                async with session.get(url) as response:
-                    result = await response.json()
-            else:
-                async with session.request(method, url, json=source_data) as response:
-                    result = await response.json()
-            
-            if context:
-                context[variable_name] = result
-            print(f"✅ HTTP request hoàn thành -> {variable_name}")
+        # Client dùng chung của event loop: connection keep-alive và cache DNS; phản hồi GET chỉ được
+        # cache khi node bật `cache` (dữ liệu có thể thay đổi giữa các lần chạy)
+        response = await get_http_client().request(
+            method, url,
+            json_body=source_data if method != 'GET' else None,
+            cache=params.get('cache', False),
+            ttl=params.get('cacheTtl'),
+            timeout=params.get('timeout')
+        )
+        result = response.json()
+        
+        if context:
+            context[variable_name] = result
+        logger.info("✅ HTTP request hoàn thành -> %s%s", variable_name, " (cache)" if response.from_cache else "")
+
+_URL_FIELD = re.compile(r'\{(\w+)\}')
+
+def _render_url(template: str, item, index: int) -> str:
+    """Thay `{field}` bằng giá trị của item (đã URL-encode); `{item}` là cả item, `{index}` là vị trí."""
+    def replace(match):
+        name = match.group(1)
+        if name == 'index':
+            value = index
+        elif name == 'item':
+            value = item
+        elif isinstance(item, dict) and name in item:
+            value = item[name]
+        else:
+            raise KeyError(f"Item {index} không có trường '{name}'")
+        return quote(str(value), safe='')
+    return _URL_FIELD.sub(replace, template)
+
+class HttpRequestBatchStrategy(NodeStrategy):
+    """
+    Gửi một request cho mỗi phần tử của danh sách trong context (`dataSource`), với URL dựng từ
+    template. Tối đa `concurrency` request chạy đồng thời, mỗi host tối đa `ratePerHost` request/giây.
+    Kết quả giữ đúng thứ tự đầu vào; request lỗi được ghi lại mà không dừng các request khác.
+    """
+    required_params = ('url', 'dataSource')
+
+    async def execute(self, page: Page, params: dict, context: dict = None):
+        url_template = params.get('url')
+        data_source = params.get('dataSource')
+        method = params.get('method', 'GET').upper()
+        variable_name = params.get('variableName', 'http_responses')
+        concurrency = max(1, int(params.get('concurrency', 10)))
+        limiter = HostRateLimiter(float(params.get('ratePerHost', 0)), params.get('burst'))
+        
+        if not url_template or not data_source:
+            raise ValueError("Node 'httpRequestBatch' yêu cầu tham số 'url' và 'dataSource'.")
+        
+        items = None
+        if context and data_source.startswith('GET_VARIABLE:'):
+            items = context.get(data_source.replace('GET_VARIABLE:', ''))
+        if not isinstance(items, list):
+            raise ValueError(f"Node 'httpRequestBatch': '{data_source}' không phải một danh sách.")
+        
+        logger.info("🌐 HTTP batch %s: %d request (đồng thời %d) tới: %s", method, len(items), concurrency, url_template)
+        
+        client = get_http_client()
+        results = [None] * len(items)
+        
+        async def send(index: int):
+            item = items[index]
+            try:
+                url = _render_url(url_template, item, index)
+                await limiter.acquire(url)
+                response = await client.request(
+                    method, url,
+                    json_body=item if method != 'GET' else None,
+                    cache=params.get('cache', False),
+                    ttl=params.get('cacheTtl'),
+                    timeout=params.get('timeout')
+                )
+                try:
+                    data = response.json()
+                except ValueError:
+                    data = response.text()
+                ok = response.status < 400
+                results[index] = {'ok': ok, 'status': response.status, 'data': data,
+                                  'error': None if ok else f"HTTP {response.status}"}
+            except Exception as e:
+                results[index] = {'ok': False, 'status': None, 'data': None, 'error': f"{type(e).__name__}: {e}"}
+        
+        # `concurrency` worker cùng lấy chỉ số từ một iterator: số task không phụ thuộc độ dài danh sách
+        indexes = iter(range(len(items)))
+        
+        async def worker():
+            for index in indexes:
+                await send(index)
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(items)))))
+        elapsed = time.perf_counter() - start
+        
+        failed = [result for result in results if not result['ok']]
+        if context:
+            context[variable_name] = results
+        if failed and len(failed) == len(results):
+            raise RuntimeError(f"Tất cả {len(results)} request đều lỗi, ví dụ: {failed[0]['error']}")
+        if failed:
+            logger.warning("⚠️ HTTP batch: %d/%d request lỗi, ví dụ: %s", len(failed), len(results), failed[0]['error'])
+        logger.info("✅ HTTP batch hoàn thành %d/%d request trong %.2fs -> %s",
+                    len(results) - len(failed), len(results), elapsed, variable_name)
+
+# Registry các strategy: strategy không giữ trạng thái nên mỗi loại chỉ cần một instance
+STRATEGIES = {
+    "start": StartNodeStrategy(),
+    "stop": StopNodeStrategy(),
+    "goto": GotoNodeStrategy(),
+    "click": ClickNodeStrategy(),
+    "fill": FillNodeStrategy(),
+    "selectOption": SelectOptionStrategy(),
+    "setCheckboxState": SetCheckboxStateStrategy(),
+    "assertVisible": AssertVisibleStrategy(),
+    "wait": WaitNodeStrategy(),
+    "extractText": ExtractTextStrategy(),
+    "extractMultiple": ExtractMultipleStrategy(),
+    "httpRequest": HttpRequestStrategy(),
+    "httpRequestBatch": HttpRequestBatchStrategy()
+}
 
 # Factory để lấy strategy tương ứng với loại node
 def get_strategy(node_type: str) -> NodeStrategy:
-    strategies = {
-        "start": StartNodeStrategy(),
-        "stop": StopNodeStrategy(),
-        "goto": GotoNodeStrategy(),
-        "click": ClickNodeStrategy(),
-        "fill": FillNodeStrategy(),
-        "selectOption": SelectOptionStrategy(),
-        "setCheckboxState": SetCheckboxStateStrategy(),
-        "assertVisible": AssertVisibleStrategy(),
-        "wait": WaitNodeStrategy(),
-        "extractText": ExtractTextStrategy(),
-        "extractMultiple": ExtractMultipleStrategy(),
-        "httpRequest": HttpRequestStrategy()
-    }
-    strategy = strategies.get(node_type)
+    strategy = STRATEGIES.get(node_type)
     if not strategy:
         raise ValueError(f"Không tìm thấy strategy cho loại node: {node_type}")
-    return strategy
\ No newline at end of file
+    return strategy
@@ -0,0 +1,186 @@
+import asyncio
+import csv
+import json
+import os
+import re
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterable, Dict, List, Optional
+
+# Thư mục mặc định cho file kết quả; đường dẫn tương đối trong `sinkPath` được tính từ đây
+RESULTS_DIR = os.environ.get('RESULTS_DIR', 'results')
+
+
+class ResultSink(ABC):
+    """
+    Đích ghi kết quả trích xuất theo từng phần: `write()` nhận một phần các dòng (dict),
+    `close()` trả về handle nhỏ (loại, đường dẫn, số dòng) để lưu vào context thay cho dữ liệu.
+    Dữ liệu luôn được ghi nối, nên nhiều node hoặc nhiều lần chạy có thể dùng chung một đích.
+    """
+    kind: str = ''
+    extension: str = ''
+
+    def __init__(self, path: Path, table: str = None):
+        self.path = path
+        self.table = table
+        self.rows = 0
+
+    @abstractmethod
+    def write(self, rows: List[Dict]):
+        pass
+
+    def close(self) -> Dict:
+        return {'sink': self.kind, 'path': str(self.path), 'rows': self.rows}
+
+
+class JsonLinesSink(ResultSink):
+    """Một object JSON mỗi dòng."""
+    kind = 'jsonl'
+    extension = 'jsonl'
+
+    def __init__(self, path: Path, table: str = None):
+        super().__init__(path, table)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, rows: List[Dict]):
+        self._file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+        self._file.flush()
+        self.rows += len(rows)
+
+    def close(self) -> Dict:
+        self._file.close()
+        return super().close()
+
+
+class CsvSink(ResultSink):
+    """CSV có dòng tiêu đề; cột lấy từ phần đầu tiên (hoặc tiêu đề của file đã có)."""
+    kind = 'csv'
+    extension = 'csv'
+
+    def __init__(self, path: Path, table: str = None):
+        super().__init__(path, table)
+        fieldnames = None
+        if path.exists() and path.stat().st_size:
+            with open(path, newline='', encoding='utf-8') as f:
+                fieldnames = next(csv.reader(f), None)
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = self._make_writer(fieldnames) if fieldnames else None
+
+    def _make_writer(self, fieldnames) -> csv.DictWriter:
+        return csv.DictWriter(self._file, fieldnames=fieldnames, restval='', extrasaction='ignore')
+
+    def write(self, rows: List[Dict]):
+        if not rows:
+            return
+        if self._writer is None:
+            self._writer = self._make_writer(list(rows[0]))
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+        self._file.flush()
+        self.rows += len(rows)
+
+    def close(self) -> Dict:
+        self._file.close()
+        return super().close()
+
+
+class SqliteSink(ResultSink):
+    """
+    Bảng SQLite (mặc định `results`), mỗi phần được chèn bằng một `executemany` trong một
+    transaction. Bảng và các cột (TEXT) được tạo khi cần.
+    """
+    kind = 'sqlite'
+    extension = 'db'
+
+    def __init__(self, path: Path, table: str = None):
+        super().__init__(path, table or 'results')
+        if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', self.table):
+            raise ValueError(f"Tên bảng không hợp lệ: {self.table}")
+        # Các phần được ghi tuần tự nhưng từ thread của asyncio.to_thread
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._columns: List[str] = []
+        self._insert_sql = None
+
+    def _prepare(self, fieldnames: List[str]):
+        """Tạo bảng hoặc thêm cột còn thiếu, rồi dựng câu INSERT cho các cột này."""
+        quoted = [f'"{name.replace(chr(34), chr(34) * 2)}"' for name in fieldnames]
+        self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" ({", ".join(c + " TEXT" for c in quoted)})')
+        existing = {row[1] for row in self._conn.execute(f'PRAGMA table_info("{self.table}")')}
+        for name, column in zip(fieldnames, quoted):
+            if name not in existing:
+                self._conn.execute(f'ALTER TABLE "{self.table}" ADD COLUMN {column} TEXT')
+        self._columns = fieldnames
+        self._insert_sql = (f'INSERT INTO "{self.table}" ({", ".join(quoted)}) '
+                            f'VALUES ({", ".join("?" * len(quoted))})')
+
+    def write(self, rows: List[Dict]):
+        if not rows:
+            return
+        fieldnames = list(rows[0])
+        with self._conn:
+            if fieldnames != self._columns:
+                self._prepare(fieldnames)
+            self._conn.executemany(self._insert_sql, [[row.get(name) for name in fieldnames] for row in rows])
+        self.rows += len(rows)
+
+    def close(self) -> Dict:
+        self._conn.close()
+        return dict(super().close(), table=self.table)
+
+
+SINKS = {sink.kind: sink for sink in (JsonLinesSink, CsvSink, SqliteSink)}
+
+
+def resolve_sink_path(path: str) -> Path:
+    """
+    Đường dẫn tuyệt đối của `path` (tương đối so với RESULTS_DIR). ValueError nếu đường dẫn nằm
+    ngoài RESULTS_DIR (đường dẫn tuyệt đối, `..`, symlink trỏ ra ngoài), vì `sinkPath` đến từ
+    định nghĩa workflow.
+    """
+    root = Path(RESULTS_DIR).resolve()
+    resolved = (root / path).resolve()
+    if resolved == root or not resolved.is_relative_to(root):
+        raise ValueError(f"Đường dẫn sink phải nằm trong {RESULTS_DIR}: {path}")
+    return resolved
+
+
+def open_sink(kind: str, path: str = None, table: str = None, name: str = 'results',
+              run_id: str = None) -> ResultSink:
+    """
+    Mở đích ghi loại `kind` (jsonl, csv, sqlite); mở file / kết nối là I/O chặn. `path` có thể chứa
+    `{run_id}`; mặc định là `<RESULTS_DIR>/<name>-<run_id>.<đuôi>`. Đường dẫn được tính từ
+    RESULTS_DIR và không được ra ngoài thư mục này.
+    """
+    sink_class = SINKS.get(kind)
+    if sink_class is None:
+        raise ValueError(f"Loại sink không hợp lệ: {kind} (hỗ trợ: {', '.join(SINKS)})")
+
+    run_id = run_id or time.strftime('%Y%m%d-%H%M%S')
+    path = resolve_sink_path((path or f"{name}-{{run_id}}.{sink_class.extension}").replace('{run_id}', run_id))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return sink_class(path, table)
+
+
+async def sink_from_params(params: dict, name: str, run_id: str = None) -> Optional[ResultSink]:
+    """
+    Đích ghi theo tham số node `sink`, `sinkPath`, `sinkTable` (mở ngoài event loop);
+    None nếu node không dùng sink.
+    """
+    kind = params.get('sink')
+    if not kind:
+        return None
+    return await asyncio.to_thread(open_sink, kind, params.get('sinkPath'), params.get('sinkTable'), name, run_id)
+
+
+async def stream_to_sink(sink: ResultSink, chunks: AsyncIterable[List[Dict]]) -> Dict:
+    """Ghi từng phần vào `sink` ngay khi có (I/O chạy ngoài event loop), rồi đóng và trả về handle."""
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(sink.write, chunk)
+    finally:
+        handle = await asyncio.to_thread(sink.close)
+    return handle
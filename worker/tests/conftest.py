@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The worker modules are imported as top-level packages (core, database, strategies), as in app.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.models import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / 'workflow_manager.db'))
+    yield manager
+    manager.pool.close_all()
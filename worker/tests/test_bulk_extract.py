@@ -0,0 +1,82 @@
+import asyncio
+
+from strategies.bulk_extract import compile_extract_commands, extract_rows
+
+
+def test_compile_extract_commands():
+    assert compile_extract_commands((
+        'EXTRACT_TEXT:.name>name',
+        'EXTRACT_ATTR:a@href>link',
+        'EXTRACT_TEXT:>self',
+        'EXTRACT_ATTR:@data-id>id',
+    )) == (
+        ('text', '.name', '', 'name'),
+        ('attr', 'a', 'href', 'link'),
+        ('text', '', '', 'self'),
+        ('attr', '', 'data-id', 'id'),
+    )
+
+
+def test_malformed_commands_are_skipped():
+    assert compile_extract_commands((
+        'EXTRACT_TEXT:.name',
+        'EXTRACT_TEXT:div>span>name',
+        'EXTRACT_ATTR:a>link',
+        'EXTRACT_ATTR:a@b@c>link',
+        'CLICK:.button>x',
+    )) == ()
+
+
+def test_compiled_commands_are_cached():
+    commands = ('EXTRACT_TEXT:.name>name',)
+    assert compile_extract_commands(commands) is compile_extract_commands(tuple(commands))
+
+
+class FakeLocator:
+    """Answers the bulk extraction script like the page would, for `items` rows"""
+
+    def __init__(self, items, unsupported=None):
+        self.items = items
+        self.unsupported = unsupported
+        self.calls = []
+
+    async def evaluate_all(self, script, args):
+        commands, start, end = args
+        self.calls.append((start, end))
+        if self.unsupported:
+            return {'unsupported': self.unsupported}
+        stop = len(self.items) if end is None else min(end, len(self.items))
+        return {'total': len(self.items), 'rows': self.items[start:stop]}
+
+
+def test_extract_rows_in_chunks():
+    items = [{'n': n} for n in range(7)]
+    locator = FakeLocator(items)
+    assert asyncio.run(extract_rows(locator, (), chunk_size=3)) == items
+    assert locator.calls == [(0, 3), (3, 6), (6, 9)]
+
+
+def test_extract_rows_in_one_call():
+    locator = FakeLocator([{'n': n} for n in range(5)])
+    assert len(asyncio.run(extract_rows(locator, (), chunk_size=0))) == 5
+    assert locator.calls == [(0, None)]
+
+
+def test_non_css_selector_falls_back_to_per_item_extraction():
+    class Item:
+        def __init__(self, text):
+            self.text = text
+
+        def locator(self, selector):
+            return self
+
+        async def text_content(self):
+            return self.text
+
+    class Locator(FakeLocator):
+        async def all(self):
+            return [Item('a'), Item('b')]
+
+    commands = compile_extract_commands(('EXTRACT_TEXT:text=Price>price',))
+    assert asyncio.run(extract_rows(Locator([], unsupported='text=Price'), commands)) == \
+        [{'price': 'a'}, {'price': 'b'}]
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from core.plan import ExecutionPlan, compile_workflow, hash_workflow_json
+from core.workflow import Workflow
+
+
+def graph(edges, types=None):
+    """Workflow of no-op wait nodes (plus `types` overrides) connected by `edges`"""
+    types = dict({'start': 'start'}, **(types or {}))
+    node_ids = ['start'] + sorted({node_id for edge in edges for node_id in edge} - {'start'})
+    return {
+        'nodes': [{'id': node_id, 'type': types.get(node_id, 'wait'), 'params': {'timeout': 0}}
+                  for node_id in node_ids],
+        'connections': [{'fromNode': a, 'toNode': b} for a, b in edges]
+    }
+
+
+def run(data):
+    workflow = Workflow('test', data)
+    results = {}
+    executed = asyncio.run(workflow.executor.run(None, {}, None, results))
+    return workflow, executed
+
+
+def test_join_waits_for_every_branch():
+    workflow, executed = run(graph([('start', 'a'), ('start', 'b'), ('a', 'join'), ('b', 'join'),
+                                    ('join', 'end')], {'end': 'stop'}))
+    assert workflow.executor.in_degree['join'] == 2
+    assert set(executed[:3]) == {'start', 'a', 'b'}
+    assert executed[3:] == ['join', 'end']
+
+
+def test_edges_out_of_a_stop_node_do_not_hold_back_a_join():
+    edges = [('start', 'a'), ('start', 'halt'), ('halt', 'join'), ('a', 'join'), ('join', 'end')]
+    workflow, executed = run(graph(edges, {'halt': 'stop', 'end': 'stop'}))
+    assert workflow.executor.successors['halt'] == ()
+    assert workflow.executor.in_degree['join'] == 1
+    assert executed[-2:] == ['join', 'end']
+    assert set(executed) == {'start', 'a', 'halt', 'join', 'end'}
+
+
+def test_nodes_only_behind_a_stop_node_are_unreachable():
+    workflow, executed = run(graph([('start', 'halt'), ('halt', 'after')], {'halt': 'stop'}))
+    assert 'after' not in workflow.executor.reachable
+    assert executed == ['start', 'halt']
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        Workflow('test', graph([('start', 'a'), ('a', 'b'), ('b', 'a')]))
+
+
+def test_cycle_through_a_stop_node_is_not_a_cycle():
+    workflow, executed = run(graph([('start', 'a'), ('a', 'halt'), ('halt', 'a')], {'halt': 'stop'}))
+    assert executed == ['start', 'a', 'halt']
+
+
+def test_plans_from_an_older_version_are_rejected():
+    data = graph([('start', 'halt'), ('halt', 'after')], {'halt': 'stop'})
+    plan = compile_workflow(data, hash_workflow_json('x'))
+    stored = dict(plan.to_dict(), version=1)
+    with pytest.raises(ValueError):
+        ExecutionPlan.from_dict(plan.content_hash, stored)
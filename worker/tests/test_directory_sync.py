@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from core.directory_sync import DirectoryManifest
+
+
+def write(path, nodes, mtime_ns=None):
+    path.write_text(json.dumps({'nodes': [{'id': str(n)} for n in range(nodes)]}), encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def directory(tmp_path):
+    folder = tmp_path / 'workflows_json'
+    folder.mkdir()
+    return folder
+
+
+def test_first_scan_adds_every_file(directory):
+    write(directory / 'a.json', 2)
+    write(directory / 'b.json', 3)
+    (directory / 'notes.txt').write_text('ignored')
+    scan = DirectoryManifest(directory).scan()
+    assert (scan.added, scan.changed, scan.removed) == (['a', 'b'], [], [])
+    assert scan.files['b'].node_count == 3
+
+
+def test_unchanged_files_are_not_read_again(directory):
+    write(directory / 'a.json', 2)
+    manifest = DirectoryManifest(directory)
+    manifest.scan()
+    scan = manifest.scan()
+    assert not scan.has_changes
+    assert manifest.files_read == 1
+
+
+def test_touch_without_content_change_is_not_a_change(directory):
+    path = directory / 'a.json'
+    write(path, 2, mtime_ns=1_000_000_000)
+    manifest = DirectoryManifest(directory)
+    manifest.scan()
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    scan = manifest.scan()
+    assert not scan.has_changes
+    assert manifest.files_read == 2
+    assert scan.files['a'].mtime_ns == 2_000_000_000
+
+
+def test_edit_and_delete_are_reported_once(directory):
+    write(directory / 'a.json', 2, mtime_ns=1_000_000_000)
+    write(directory / 'b.json', 2)
+    manifest = DirectoryManifest(directory)
+    manifest.scan()
+    write(directory / 'a.json', 5, mtime_ns=2_000_000_000)
+    (directory / 'b.json').unlink()
+    scan = manifest.scan()
+    assert (scan.added, scan.changed, scan.removed) == ([], ['a'], ['b'])
+    assert scan.files['a'].node_count == 5
+    # A change is consumed by the scan that reports it
+    assert not manifest.scan().has_changes
+
+
+def test_invalid_file_keeps_the_previous_version(directory):
+    path = directory / 'a.json'
+    write(path, 2, mtime_ns=1_000_000_000)
+    manifest = DirectoryManifest(directory)
+    previous = manifest.scan().files['a']
+    path.write_text('{"nodes": [', encoding='utf-8')
+    scan = manifest.scan()
+    assert scan.errors and not scan.has_changes
+    assert scan.files['a'] is previous
+
+
+def test_manifest_persists_through_the_store(db, directory):
+    write(directory / 'a.json', 2)
+    DirectoryManifest(directory, store=db).scan()
+    manifest = DirectoryManifest(directory, store=db)
+    scan = manifest.scan()
+    assert not scan.has_changes
+    assert manifest.files_read == 0
+    (directory / 'a.json').unlink()
+    assert DirectoryManifest(directory, store=db).scan().removed == ['a']
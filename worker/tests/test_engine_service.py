@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from core.engine_loop import EngineLoop
+from core.engine_service import EngineService
+from database.job_queue import JobQueue
+
+
+@pytest.fixture
+def service(db):
+    engine_loop = EngineLoop()
+    service = EngineService(engine_loop, max_running=1, max_queue_size=10, job_queue=JobQueue(db),
+                            poll_interval=0.05)
+
+    async def handler(job):
+        return {'n': job.payload['n']}
+
+    service.register_handler('workflow', handler)
+    yield service
+    if engine_loop.is_running:
+        engine_loop.stop(service.shutdown())
+
+
+def test_queue_depth_counts_durable_backlog(service):
+    for n in range(3):
+        service.enqueue('workflow', {'n': n})
+    stats = service.get_stats()
+    assert stats['queue_depth'] == 3
+    assert stats['durable'] == {'queued': 3}
+
+
+def test_wait_time_includes_time_queued_in_sqlite(service):
+    job_id = service.enqueue('workflow', {'n': 1})
+    time.sleep(0.2)
+    service.start()
+    job = service.engine_loop.run(service.wait_for_job(job_id), timeout=5)
+    assert job.status == 'completed' and job.result == {'n': 1}
+    stats = service.get_stats()
+    assert stats['queue_depth'] == 0
+    assert stats['max_wait_time'] >= 0.2
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from core.event_bus import NODE_COMPLETED, NODE_STARTED, EventBus, NodeMetrics
+
+
+def test_dispatch_delivers_in_order_and_filters_kinds():
+    bus = EventBus()
+    seen, completed = [], []
+    bus.subscribe(lambda event: seen.append((event.kind, event.node_id)))
+    bus.subscribe(lambda event: completed.append(event.node_id), kinds=[NODE_COMPLETED])
+    publish = bus.publisher('run1', source=7)
+    publish(NODE_STARTED, 'a', 'goto')
+    publish(NODE_COMPLETED, 'a', 'goto', 0.5)
+    assert bus.dispatch() == 2
+    assert seen == [(NODE_STARTED, 'a'), (NODE_COMPLETED, 'a')]
+    assert completed == ['a']
+
+
+def test_full_buffer_overwrites_oldest():
+    bus = EventBus(capacity=2)
+    seen = []
+    bus.subscribe(lambda event: seen.append(event.node_id))
+    publish = bus.publisher('run1')
+    for node_id in 'abc':
+        publish(NODE_STARTED, node_id, 'wait')
+    bus.dispatch()
+    assert seen == ['b', 'c']
+    assert bus.get_stats()['overwritten'] == 1
+
+
+def test_handler_errors_do_not_stop_dispatch():
+    bus = EventBus()
+    metrics = bus.subscribe(NodeMetrics())
+    bus.subscribe(lambda event: 1 / 0)
+    publish = bus.publisher('run1')
+    publish(NODE_STARTED, 'a', 'wait')
+    publish(NODE_COMPLETED, 'a', 'wait', 0.1)
+    assert bus.dispatch() == 2
+    assert bus.handler_errors == 2
+    assert metrics.get_stats()['by_type']['wait']['completed'] == 1
+
+
+def test_flush_without_dispatcher_delivers_in_the_caller():
+    bus = EventBus()
+    threads = []
+    bus.subscribe(lambda event: threads.append(threading.current_thread()))
+    bus.publisher('run1')(NODE_STARTED, 'a', 'wait')
+    assert bus.flush()
+    assert threads == [threading.current_thread()]
+
+
+def test_flush_waits_for_the_dispatcher_thread():
+    bus = EventBus(poll_interval=10)
+    delivered = []
+
+    def slow_handler(event):
+        time.sleep(0.05)
+        delivered.append((event.node_id, threading.current_thread().name))
+
+    bus.subscribe(slow_handler)
+    bus.start()
+    try:
+        publish = bus.publisher('run1')
+        publish(NODE_STARTED, 'a', 'wait')
+        publish(NODE_COMPLETED, 'a', 'wait', 0.1)
+        # The dispatcher is woken up instead of sleeping through its poll interval
+        start = time.perf_counter()
+        assert bus.flush(timeout=5)
+        assert time.perf_counter() - start < 5
+        assert delivered == [('a', 'event-bus'), ('a', 'event-bus')]
+        assert bus.get_stats()['dispatched'] == 2
+    finally:
+        bus.stop()
+
+
+def test_flush_times_out_when_its_marker_is_overwritten():
+    bus = EventBus(capacity=1, poll_interval=10)
+    blocker = threading.Event()
+    bus.subscribe(lambda event: blocker.wait(5))
+    bus.start()
+    try:
+        publish = bus.publisher('run1')
+        publish(NODE_STARTED, 'a', 'wait')
+        bus._wake.set()
+        time.sleep(0.05)  # The dispatcher is now blocked in the handler
+        result = []
+        flusher = threading.Thread(target=lambda: result.append(bus.flush(timeout=0.5)))
+        flusher.start()
+        time.sleep(0.05)
+        publish(NODE_STARTED, 'b', 'wait')  # Overwrites the flush marker
+        flusher.join()
+        assert result == [False]
+    finally:
+        blocker.set()
+        bus.stop()
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.models import Workflow, WorkflowExecution, Workspace
+
+
+def timestamp(hours_ago: float = 0) -> str:
+    moment = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+@pytest.fixture
+def workflows(db):
+    workspace_id = db.create_workspace(Workspace(name='stats'))
+    return workspace_id, [
+        db.create_workflow(Workflow(workspace_id=workspace_id, name=f'wf{n}', json_content='{"nodes": []}'))
+        for n in range(2)
+    ]
+
+
+def record(db, workflow_id, status, execution_time=None, hours_ago=0, run_id=None):
+    finished = timestamp(hours_ago)
+    return db.record_executions([WorkflowExecution(
+        workflow_id=workflow_id, status=status, execution_time=execution_time,
+        started_at=finished, completed_at=finished, run_id=run_id
+    )])
+
+
+def test_insert_trigger_counts_final_executions(db, workflows):
+    workspace_id, (first, second) = workflows
+    record(db, first, 'completed', 2.0)
+    record(db, first, 'failed', 9.0)
+    record(db, second, 'completed', 4.0)
+
+    stats = db.get_workflow_statistics(first)
+    assert (stats['total_executions'], stats['completed_executions'], stats['failed_executions']) == (2, 1, 1)
+    # Only completed runs count towards execution time
+    assert stats['total_execution_time'] == 2.0
+    assert stats['success_rate'] == 50.0
+    assert stats['recent_executions'] == {'completed': 1, 'failed': 1}
+
+    workspace = db.get_workspace_statistics(workspace_id)
+    assert (workspace['total_executions'], workspace['completed_executions']) == (3, 2)
+    assert workspace['average_execution_time'] == 3.0
+    assert workspace['workflow_counts'] == {'pending': 2}
+
+
+def test_duplicate_run_ids_are_counted_once(db, workflows):
+    _, (first, _) = workflows
+    assert record(db, first, 'completed', 1.0, run_id='run-1') == 1
+    assert record(db, first, 'completed', 1.0, run_id='run-1') == 0
+    assert db.get_workflow_statistics(first)['total_executions'] == 1
+
+
+def test_update_trigger_counts_only_the_transition_to_a_final_status(db, workflows):
+    _, (first, _) = workflows
+    execution_id = db.create_execution(WorkflowExecution(workflow_id=first, status='running'))
+    assert db.get_workflow_statistics(first)['total_executions'] == 0
+    db.update_execution(execution_id, 'completed', 5.0)
+    # A second update of an already final execution is not counted again
+    db.update_execution(execution_id, 'failed', 5.0)
+    stats = db.get_workflow_statistics(first)
+    assert (stats['total_executions'], stats['completed_executions'], stats['failed_executions']) == (1, 1, 0)
+
+
+def test_rolling_window_excludes_old_buckets(db, workflows):
+    _, (first, _) = workflows
+    record(db, first, 'completed', 1.0, hours_ago=30)
+    record(db, first, 'completed', 1.0)
+    stats = db.get_workflow_statistics(first)
+    assert stats['total_executions'] == 2
+    assert stats['recent_executions'] == {'completed': 1, 'failed': 0}
+
+
+def test_rebuild_matches_trigger_maintained_stats(db, workflows):
+    workspace_id, (first, second) = workflows
+    record(db, first, 'completed', 2.0)
+    record(db, second, 'failed', hours_ago=5)
+    before = (db.get_workflow_statistics(first), db.get_workspace_statistics(workspace_id))
+    db.rebuild_execution_stats()
+    assert (db.get_workflow_statistics(first), db.get_workspace_statistics(workspace_id)) == before
+
+
+def test_deleting_a_workflow_drops_its_stats(db, workflows):
+    _, (first, _) = workflows
+    record(db, first, 'completed', 2.0)
+    db.delete_workflow(first)
+    assert db.get_workflow_statistics(first)['total_executions'] == 0
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from core.fleet import FleetRegistry, FleetWorker
+from core.plan import PlanCache
+from core.request_blocking import RequestBlocker, compile_blocking_rules
+from database.job_queue import JobQueue
+
+
+@pytest.fixture
+def registry():
+    registry = FleetRegistry()
+    registry.register('a', 'host-a', capacity=4)
+    registry.register('b', 'host-b', capacity=4)
+    return registry
+
+
+def test_claim_limit_shares_queued_jobs_by_free_slots(registry):
+    assert registry.claim_limit('a', 10, 4) == 2
+    registry.heartbeat('b', free_slots=0)
+    assert registry.claim_limit('a', 10, 4) == 4
+    assert registry.claim_limit('a', 3, 4) == 3
+    assert registry.claim_limit('b', 10, 4) == 0
+    assert registry.claim_limit('a', 10, 0) == 0
+    assert registry.claim_limit('missing', 10, 4) == 0
+
+
+def test_claimed_slots_are_held_until_released(registry):
+    registry.record_claim('a', [1, 2, 3])
+    assert registry.get('a').free_slots == 1
+    assert registry.claim_limit('a', 10, 10) == 1
+    registry.release('a', 2)
+    assert registry.get('a').free_slots == 2
+    assert registry.get('a').running_jobs == [1, 3]
+
+
+def test_jobs_fleet_workers_cannot_run_do_not_inflate_the_share(db, registry):
+    queue = JobQueue(db)
+    queue.enqueue('workflow', {})
+    queue.enqueue('workflow', {}, delay=60)
+    for _ in range(6):
+        queue.enqueue('batch', {})
+    limit = registry.claim_limit('a', 10, queue.count_queued(['workflow'], ready=True))
+    assert limit == 1
+    assert len(queue.claim('a', limit, kinds=['workflow'])) == 1
+
+
+def test_fleet_worker_applies_workspace_browser_settings():
+    class Manager:
+        max_concurrent_workflows = 2
+        max_branches_per_run = 4
+        plan_cache = PlanCache()
+
+        async def _run_with_semaphore(self, run):
+            # Stands in for the browser run: the blocker is built from the run's settings
+            run.request_blocker = RequestBlocker(compile_blocking_rules(run.browser_settings))
+            run.request_blocker.blocked = 3
+            return True
+
+    worker = FleetWorker(Manager(), 'http://control')
+    sent = []
+
+    async def call(method, path, body=None):
+        sent.append((path, body))
+        return 200, {}
+
+    worker._call = call
+    job = {'id': 7, 'workflow': {
+        'id': 1, 'name': 'w', 'browser_settings': {'request_blocking': 'media'},
+        'json_content': '{"nodes": [{"id": "s", "type": "start"}], "connections": []}'
+    }}
+    asyncio.run(worker._execute(job))
+    path, body = sent[0]
+    assert path == '/api/fleet/jobs/7/complete'
+    assert body['status'] == 'completed'
+    assert body['result']['success'] is True
+    assert body['result']['request_blocking']['blocked'] == 3
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+
+# aiohttp is an optional dependency of the worker
+pytest.importorskip('aiohttp')
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.http_client import HostRateLimiter, close_http_client
+from strategies.node_strategies import HttpRequestBatchStrategy
+
+
+class Server:
+    """Test server answering `/item/<id>` after `delay` seconds and tracking concurrent requests"""
+
+    def __init__(self, delay=lambda item_id: 0):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        app = web.Application()
+        app.router.add_get('/item/{id}', self.item)
+        app.router.add_get('/fail/{id}', self.fail)
+        self.server = TestServer(app)
+
+    async def item(self, request):
+        item_id = int(request.match_info['id'])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay(item_id))
+        finally:
+            self.in_flight -= 1
+        return web.json_response({'id': item_id})
+
+    async def fail(self, request):
+        return web.Response(status=500, text='boom')
+
+
+def run_batch(server, items, path, **params):
+    """Run an httpRequestBatch node over `items` with URL template `path` on `server`; returns its results"""
+
+    async def main():
+        await server.server.start_server()
+        context = {'items': items}
+        try:
+            await HttpRequestBatchStrategy().execute(None, dict({
+                'url': f"http://{server.server.host}:{server.server.port}{path}",
+                'dataSource': 'GET_VARIABLE:items', 'variableName': 'responses'
+            }, **params), context)
+        finally:
+            await close_http_client()
+            await server.server.close()
+        return context['responses']
+
+    return asyncio.run(main())
+
+
+def test_results_keep_input_order_within_the_concurrency_limit():
+    # Earlier items answer slower, so requests finish in reverse order
+    server = Server(delay=lambda item_id: (8 - item_id) * 0.01)
+    items = [{'id': n} for n in range(8)]
+    results = run_batch(server, items, '/item/{id}', concurrency=3)
+    assert [result['data'] for result in results] == items
+    assert all(result['ok'] and result['status'] == 200 for result in results)
+    assert server.max_in_flight == 3
+
+
+def test_failed_requests_are_recorded_without_stopping_the_batch():
+    server = Server()
+    results = run_batch(server, [{'kind': 'item'}, {'kind': 'fail'}, {}, {'kind': 'item'}], '/{kind}/{index}')
+    assert [result['ok'] for result in results] == [True, False, False, True]
+    assert results[1]['status'] == 500 and results[1]['error'] == 'HTTP 500'
+    assert results[2]['status'] is None and results[2]['error'].startswith('KeyError')
+    assert results[3]['data'] == {'id': 3}
+
+
+def test_batch_fails_when_every_request_fails():
+    server = Server()
+    with pytest.raises(RuntimeError, match='HTTP 500'):
+        run_batch(server, [{}, {}], '/fail/{index}')
+
+
+def test_rate_per_host_spaces_out_requests():
+    server = Server()
+    start = time.monotonic()
+    run_batch(server, [{'id': n} for n in range(5)], '/item/{id}', ratePerHost=20, burst=1)
+    # One request immediately, then one every 1/20 s
+    assert time.monotonic() - start >= 0.2
+
+
+def test_host_rate_limiter_buckets_are_per_host():
+    async def main():
+        limiter = HostRateLimiter(rate=10, burst=2)
+        start = time.monotonic()
+        for _ in range(2):
+            await limiter.acquire('http://a.example/x')
+            await limiter.acquire('http://b.example/x')
+        burst_elapsed = time.monotonic() - start
+        await limiter.acquire('http://a.example/y')
+        return burst_elapsed, time.monotonic() - start, limiter.waited
+
+    burst_elapsed, elapsed, waited = asyncio.run(main())
+    assert burst_elapsed < 0.05
+    assert elapsed >= 0.09 and waited == pytest.approx(0.1, abs=0.02)
+
+
+def test_host_rate_limiter_without_rate_never_waits():
+    async def main():
+        limiter = HostRateLimiter(rate=0)
+        for _ in range(100):
+            await limiter.acquire('http://a.example/')
+        return limiter.waited
+
+    assert asyncio.run(main()) == 0
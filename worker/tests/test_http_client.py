@@ -0,0 +1,118 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+# aiohttp is an optional dependency of the worker
+pytest.importorskip('aiohttp')
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.http_client import HttpClient
+
+
+def make_app(hits: Counter) -> web.Application:
+    """Test server; every request is counted per path in `hits`"""
+
+    async def handler(request):
+        path = request.path
+        hits[path] += 1
+        body = f"{path} #{hits[path]}"
+        if path == '/etag':
+            if request.headers.get('If-None-Match') == '"v1"':
+                return web.Response(status=304, headers={'ETag': '"v1"', 'Cache-Control': 'no-cache'})
+            return web.Response(text=body, headers={'ETag': '"v1"', 'Cache-Control': 'no-cache'})
+        if path == '/no-store':
+            return web.Response(text=body, headers={'Cache-Control': 'no-store'})
+        if path == '/big':
+            return web.Response(body=b'x' * 2048, headers={'Cache-Control': 'max-age=60'})
+        return web.Response(text=body, headers={'Cache-Control': 'max-age=60'})
+
+    app = web.Application()
+    app.router.add_get('/{path:.*}', handler)
+    return app
+
+
+def serve(test, **client_options):
+    """Run `test(client, url, hits)` against a local server with a fresh HttpClient"""
+
+    async def main():
+        hits = Counter()
+        server = TestServer(make_app(hits))
+        await server.start_server()
+        client = HttpClient(**client_options)
+        try:
+            return await test(client, lambda path: str(server.make_url(path)), hits)
+        finally:
+            await client.close()
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def host_stats(client):
+    (stats,) = client.get_stats()['hosts'].values()
+    return stats
+
+
+def test_fresh_response_is_served_from_cache():
+    async def test(client, url, hits):
+        first = await client.request('GET', url('/fresh'), cache=True)
+        second = await client.request('GET', url('/fresh'), cache=True)
+        assert not first.from_cache and second.from_cache
+        assert second.text() == first.text() == '/fresh #1'
+        # Without cache=True the request always reaches the server
+        assert (await client.request('GET', url('/fresh'))).text() == '/fresh #2'
+        assert hits['/fresh'] == 2
+        stats = host_stats(client)
+        assert (stats['cache_hits'], stats['cache_misses']) == (1, 1)
+
+    serve(test)
+
+
+def test_expired_response_is_served_from_cache_until_its_ttl():
+    async def test(client, url, hits):
+        await client.request('GET', url('/fresh'), cache=True, ttl=0.05)
+        await client.request('GET', url('/fresh'), cache=True)
+        assert hits['/fresh'] == 1
+        await asyncio.sleep(0.1)
+        assert (await client.request('GET', url('/fresh'), cache=True)).text() == '/fresh #2'
+
+    serve(test)
+
+
+def test_not_modified_reuses_the_cached_body():
+    async def test(client, url, hits):
+        first = await client.request('GET', url('/etag'), cache=True)
+        second = await client.request('GET', url('/etag'), cache=True)
+        assert hits['/etag'] == 2
+        assert second.status == 200 and second.from_cache
+        assert second.body == first.body
+        assert host_stats(client)['cache_revalidated'] == 1
+
+    serve(test)
+
+
+def test_no_store_and_oversize_responses_are_not_cached():
+    async def test(client, url, hits):
+        for _ in range(2):
+            await client.request('GET', url('/no-store'), cache=True)
+            await client.request('GET', url('/big'), cache=True)
+        assert (hits['/no-store'], hits['/big']) == (2, 2)
+        assert client.get_stats()['cache_entries'] == 0
+
+    serve(test, max_entry_bytes=1024)
+
+
+def test_least_recently_used_entry_is_evicted():
+    async def test(client, url, hits):
+        for path in ('/a', '/b', '/a', '/c'):
+            await client.request('GET', url(path), cache=True)
+        stats = client.get_stats()
+        assert (stats['cache_entries'], stats['cache_evicted']) == (2, 1)
+        await client.request('GET', url('/a'), cache=True)
+        await client.request('GET', url('/b'), cache=True)
+        assert hits == Counter({'/a': 1, '/b': 2, '/c': 1})
+
+    serve(test, cache_size=2)
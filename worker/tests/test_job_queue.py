@@ -0,0 +1,144 @@
+import time
+
+import pytest
+
+from database.job_queue import JobQueue, QueueCapacityError
+
+
+@pytest.fixture
+def queue(db):
+    return JobQueue(db, lease_seconds=60, retry_backoff=0.0)
+
+
+def test_claim_orders_by_priority_then_id(queue):
+    low = queue.enqueue('workflow', {'n': 1})
+    high = queue.enqueue('workflow', {'n': 2}, priority=5)
+    later = queue.enqueue('workflow', {'n': 3})
+    jobs = queue.claim('a', limit=10)
+    assert [job.id for job in jobs] == [high, low, later]
+    assert all(job.status == 'leased' and job.lease_owner == 'a' and job.attempts == 1 for job in jobs)
+    assert queue.claim('b', limit=10) == []
+
+
+def test_claim_filters_kinds_and_respects_delay(queue):
+    batch = queue.enqueue('batch', {})
+    delayed = queue.enqueue('workflow', {}, delay=60)
+    ready = queue.enqueue('workflow', {})
+    assert [job.id for job in queue.claim('a', limit=10, kinds=['workflow'])] == [ready]
+    assert [job.id for job in queue.claim('a', limit=10)] == [batch]
+    assert queue.get_job(delayed).status == 'queued'
+
+
+def test_idempotency_key_returns_existing_job(queue):
+    first = queue.enqueue('workflow', {'n': 1}, idempotency_key='run-1')
+    assert queue.enqueue('workflow', {'n': 2}, idempotency_key='run-1') == first
+    assert queue.enqueue_many([
+        {'kind': 'workflow', 'payload': {}, 'idempotency_key': 'run-1'},
+        {'kind': 'workflow', 'payload': {}, 'idempotency_key': 'run-2'}
+    ])[0] == first
+    assert queue.count_queued() == 2
+    assert queue.get_job(first).payload == {'n': 1}
+
+
+def test_count_queued_by_kind_and_readiness(queue):
+    queue.enqueue('workflow', {})
+    queue.enqueue('workflow', {}, delay=60)
+    queue.enqueue('batch', {})
+    assert queue.count_queued() == 3
+    assert queue.count_queued(['workflow']) == 2
+    assert queue.count_queued(['workflow'], ready=True) == 1
+    assert queue.count_queued(['workflow', 'batch'], ready=True) == 2
+
+
+def test_complete_requires_the_lease_owner(queue):
+    job_id = queue.enqueue('workflow', {})
+    queue.claim('a')
+    assert not queue.complete(job_id, 'b', {'ok': True})
+    assert queue.extend_lease(job_id, 'a')
+    assert queue.complete(job_id, 'a', {'ok': True})
+    job = queue.get_job(job_id)
+    assert (job.status, job.result, job.lease_owner) == ('completed', {'ok': True}, None)
+
+
+def test_failed_attempts_retry_until_max_attempts(queue):
+    job_id = queue.enqueue('workflow', {}, max_attempts=2)
+    queue.claim('a')
+    assert queue.fail(job_id, 'a', 'boom')
+    assert queue.get_job(job_id).status == 'queued'
+    queue.claim('a')
+    assert not queue.fail(job_id, 'a', 'boom again')
+    job = queue.get_job(job_id)
+    assert (job.status, job.attempts, job.last_error) == ('failed', 2, 'boom again')
+
+
+def test_retry_backoff_delays_the_next_attempt(queue):
+    queue.retry_backoff = 60
+    job_id = queue.enqueue('workflow', {})
+    queue.claim('a')
+    queue.fail(job_id, 'a', 'boom')
+    assert queue.claim('a') == []
+    assert queue.get_job(job_id).available_at >= time.time() + 59
+
+
+def test_requeue_stale_leases(queue):
+    expired = queue.enqueue('workflow', {})
+    queue.claim('a', lease_seconds=-1)
+    live = queue.enqueue('workflow', {})
+    queue.claim('b')
+    assert queue.requeue_stale_leases() == 1
+    assert queue.get_job(expired).status == 'queued'
+    assert queue.get_job(live).status == 'leased'
+    # On startup an owner takes back its own leases even before they expire
+    assert queue.requeue_stale_leases('b') == 1
+    assert queue.get_job(live).status == 'queued'
+
+
+def test_capacity_counts_cost_and_rejects_atomically(queue):
+    queue.enqueue('batch', {}, cost=3, capacity=4)
+    assert queue.queued_cost() == 3
+    with pytest.raises(QueueCapacityError) as error:
+        queue.enqueue_many([{'kind': 'workflow', 'payload': {}}] * 2, capacity=4)
+    assert error.value.queued == 3
+    # Nothing from the rejected call was inserted
+    assert queue.count_queued() == 1
+    queue.enqueue('workflow', {}, capacity=4)
+    # Replaying a known idempotency key is not a new admission
+    queue.enqueue('workflow', {}, idempotency_key='k')
+    assert queue.enqueue('workflow', {}, idempotency_key='k', capacity=1)
+
+
+def test_concurrency_group_limits_leased_jobs(queue):
+    group = [{'kind': 'workflow', 'payload': {'n': n}, 'concurrency_key': 'batch:1', 'concurrency_limit': 2}
+             for n in range(5)]
+    group_ids = queue.enqueue_many(group)
+    other = queue.enqueue('workflow', {})
+    claimed = queue.claim('a', limit=10)
+    assert [job.id for job in claimed] == group_ids[:2] + [other]
+    assert queue.claim('a', limit=10) == []
+    queue.complete(group_ids[0], 'a')
+    assert [job.id for job in queue.claim('a', limit=10)] == [group_ids[2]]
+
+
+def age_jobs(db, job_ids, seconds):
+    with db.get_connection() as conn:
+        conn.executemany("UPDATE jobs SET updated_at = updated_at - ? WHERE id = ?",
+                         [(seconds, job_id) for job_id in job_ids])
+
+
+def test_purge_finished_deletes_only_old_finished_jobs(db, queue):
+    done = [queue.enqueue('workflow', {}) for _ in range(3)]
+    for job in queue.claim('a', limit=3):
+        queue.complete(job.id, 'a', True)
+    recent = queue.enqueue('workflow', {})
+    queue.complete(queue.claim('b')[0].id, 'b', False)
+    leased = queue.enqueue('workflow', {})
+    queue.claim('a')
+    waiting = queue.enqueue('workflow', {})
+    age_jobs(db, done + [leased, waiting], 3600)
+
+    assert queue.purge_finished(60, limit=2) == 2
+    assert queue.purge_finished(60) == 1
+    assert [queue.get_job(job_id) for job_id in done] == [None, None, None]
+    assert queue.get_job(leased).status == 'leased'
+    assert queue.get_job(waiting).status == 'queued'
+    assert queue.get_job(recent) is not None
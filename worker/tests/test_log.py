@@ -0,0 +1,37 @@
+import json
+import logging
+import sys
+
+from core.log import JsonFormatter
+
+
+def make_record(message='Node %s xong', args=('wait_1',)):
+    return logging.LogRecord('core.workflow', logging.WARNING, __file__, 1, message, args, None)
+
+
+def test_json_line_matches_json_dumps():
+    record = make_record('▶️ "%s"\n\tkết thúc \\ %d', ('wait_1', 3))
+    record.run_id = 'run-1'
+    record.node_id = None
+    line = JsonFormatter().format(record)
+    assert '\n' not in line
+    assert json.loads(line) == {
+        'ts': record.created, 'level': 'warning', 'logger': 'core.workflow',
+        'message': '▶️ "wait_1"\n\tkết thúc \\ 3', 'run_id': 'run-1', 'node_id': None
+    }
+    assert '▶️' in line
+
+
+def test_json_line_without_run_context():
+    data = json.loads(JsonFormatter().format(make_record()))
+    assert data['run_id'] is None and data['node_id'] is None
+
+
+def test_json_line_includes_exception():
+    record = make_record()
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record.exc_info = sys.exc_info()
+    data = json.loads(JsonFormatter().format(record))
+    assert data['exc'].startswith('Traceback') and data['exc'].endswith('ValueError: boom')
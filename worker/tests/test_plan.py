@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from core.plan import PlanCache, compile_workflow, hash_workflow_json
+
+WORKFLOW = {
+    'nodes': [
+        {'id': 'start', 'type': 'start', 'params': {}},
+        {'id': 'open', 'type': 'goto', 'params': {'url': 'https://example.com'}},
+        {'id': 'end', 'type': 'stop', 'params': {}}
+    ],
+    'connections': [
+        {'fromNode': 'start', 'toNode': 'open'},
+        {'fromNode': 'open', 'toNode': 'end'}
+    ]
+}
+
+
+def workflow_json(data=WORKFLOW):
+    return json.dumps(data)
+
+
+def test_memory_hit_returns_the_same_plan():
+    cache = PlanCache()
+    plan = cache.get_or_compile(workflow_json())
+    assert cache.get_or_compile(workflow_json()) is plan
+    assert cache.get_stats() == {'cached_plans': 1, 'memory_hits': 1, 'store_hits': 0, 'compiles': 1}
+
+
+def test_store_hit_round_trips_the_plan(db):
+    compiled = PlanCache(store=db).get_or_compile(workflow_json())
+
+    cache = PlanCache(store=db)
+    plan = cache.get_or_compile(workflow_json())
+    assert cache.store_hits == 1 and cache.compiles == 0
+    assert plan.to_dict() == compiled.to_dict()
+    assert plan.start_node_id == 'start'
+    assert dict(plan.successors) == {'start': ('open',), 'open': ('end',), 'end': ()}
+    assert plan.nodes['open'].params == {'url': 'https://example.com'}
+    assert plan.nodes['start'].outputs == {'out': ['open']}
+
+
+def test_stored_plan_of_another_version_is_recompiled(db):
+    content_hash = hash_workflow_json(workflow_json())
+    stale = compile_workflow(WORKFLOW, content_hash).to_dict()
+    stale['version'] -= 1
+    db.save_execution_plan(content_hash, json.dumps(stale))
+
+    cache = PlanCache(store=db)
+    plan = cache.get_or_compile(workflow_json())
+    assert cache.store_hits == 0 and cache.compiles == 1
+    # The recompiled plan replaces the stale one in the store
+    assert json.loads(db.load_execution_plan(content_hash)) == plan.to_dict()
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = PlanCache(max_entries=1)
+    first = cache.get_or_compile(workflow_json())
+    other = dict(WORKFLOW, name='other')
+    cache.get_or_compile(workflow_json(other))
+    assert cache.get(first.content_hash) is None
+    assert cache.get_stats()['cached_plans'] == 1
+
+
+@pytest.mark.parametrize('nodes, connections, message', [
+    ([{'id': 'start', 'type': 'start'}, {'id': 'start', 'type': 'wait'}], [], 'trùng lặp'),
+    ([{'id': 'start', 'type': 'start'}, {'id': 'open', 'type': 'goto', 'params': {}}], [], 'url'),
+    ([{'id': 'start', 'type': 'start'}, {'id': 'a', 'type': 'wait'}, {'id': 'b', 'type': 'wait'}],
+     [('start', 'a'), ('a', 'b'), ('b', 'a')], 'vòng lặp'),
+    ([{'id': 'start', 'type': 'start'}, {'id': 'again', 'type': 'start'}], [], 'một Start Node'),
+    ([{'id': 'a', 'type': 'wait'}], [], 'Start Node'),
+])
+def test_invalid_workflows_do_not_compile(nodes, connections, message):
+    data = {'nodes': nodes, 'connections': [{'fromNode': a, 'toNode': b} for a, b in connections]}
+    cache = PlanCache()
+    with pytest.raises(ValueError, match=message):
+        cache.get_or_compile(workflow_json(data))
+    assert cache.get_stats()['cached_plans'] == 0
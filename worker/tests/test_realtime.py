@@ -0,0 +1,81 @@
+from core.realtime import RealtimeEmitter
+
+
+class FakeSocketIO:
+    """Records batches and holds their ack callbacks until the test calls them."""
+
+    def __init__(self):
+        self.sent = []
+        self.acks = []
+
+    def emit(self, event, batch, to=None, callback=None):
+        self.sent.append((to, [item['event'] for item in batch], batch))
+        self.acks.append(callback)
+
+
+def make_emitter(max_queue=256):
+    socketio = FakeSocketIO()
+    emitter = RealtimeEmitter(socketio, max_queue=max_queue)
+    emitter.join('sid1', 'room')
+    return emitter, socketio
+
+
+def test_coalesced_events_keep_only_the_latest():
+    emitter, socketio = make_emitter()
+    emitter.emit('workflow_started', {'status': 'running'}, room='room', coalesce_key=('status', 1))
+    emitter.emit('other', {}, room='room')
+    emitter.emit('workflow_completed', {'status': 'completed'}, room='room', coalesce_key=('status', 1))
+    emitter.flush()
+    to, events, batch = socketio.sent[0]
+    assert to == 'sid1'
+    assert events == ['other', 'workflow_completed']
+    assert batch[1]['data'] == {'status': 'completed'}
+    assert emitter.get_stats()['coalesced'] == 1
+
+
+def test_full_queue_drops_droppable_events_first():
+    emitter, socketio = make_emitter(max_queue=2)
+    emitter.emit('node_started', {}, room='room', droppable=True)
+    emitter.emit('workflow_started', {}, room='room')
+    emitter.emit('workflow_completed', {}, room='room')
+    emitter.emit('node_completed', {}, room='room', droppable=True)
+    emitter.flush()
+    _, events, batch = socketio.sent[0]
+    assert events == ['workflow_started', 'workflow_completed', 'events_dropped']
+    assert batch[-1]['data'] == {'count': 2}
+
+
+def test_full_queue_of_undroppable_events_stays_bounded():
+    emitter, socketio = make_emitter(max_queue=3)
+    for index in range(10):
+        emitter.emit('workflow_started', {'index': index}, room='room')
+    assert emitter.get_stats()['max_client_queue'] == 3
+    emitter.flush()
+    _, events, batch = socketio.sent[0]
+    assert [item['data'] for item in batch[:3]] == [{'index': 7}, {'index': 8}, {'index': 9}]
+    assert batch[-1] == {'event': 'events_dropped', 'data': {'count': 7}}
+    assert emitter.get_stats()['dropped'] == 7
+
+
+def test_next_batch_waits_for_ack():
+    emitter, socketio = make_emitter()
+    emitter.emit('first', {}, room='room')
+    emitter.flush()
+    emitter.emit('second', {}, room='room')
+    emitter.flush()
+    assert [events for _, events, _ in socketio.sent] == [['first']]
+
+    socketio.acks[0]()
+    emitter.flush()
+    assert [events for _, events, _ in socketio.sent] == [['first'], ['second']]
+
+
+def test_lost_ack_times_out():
+    emitter, socketio = make_emitter()
+    emitter.ack_timeout = 0
+    emitter.emit('first', {}, room='room')
+    emitter.flush()
+    emitter.emit('second', {}, room='room')
+    emitter.flush()
+    assert len(socketio.sent) == 2
+    assert emitter.get_stats()['ack_timeouts'] == 1
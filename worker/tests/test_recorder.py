@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from database.models import Workflow, Workspace
+from database.recorder import ExecutionRecorder
+
+
+@pytest.fixture
+def workflow_id(db):
+    workspace_id = db.create_workspace(Workspace(name='recorder'))
+    return db.create_workflow(Workflow(workspace_id=workspace_id, name='wf', json_content='{"nodes": []}'))
+
+
+class FlakyStore:
+    """Wraps a DatabaseManager; the first `failures` writes raise"""
+
+    def __init__(self, db, failures=1):
+        self.db = db
+        self.failures = failures
+        self.batches = []
+
+    def record_executions(self, executions):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('database is locked')
+        self.batches.append(len(executions))
+        return self.db.record_executions(executions)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_flush_writes_in_batches(db, workflow_id):
+    recorder = ExecutionRecorder(db, max_batch=2)
+    for n in range(5):
+        recorder.record(workflow_id, n % 2 == 0, execution_time=1.0, run_id=f'run{n}')
+    assert db.get_execution_history(workflow_id) == []
+
+    assert recorder.flush() == 5
+    stats = recorder.get_stats()
+    assert (stats['pending'], stats['written'], stats['flushes']) == (0, 5, 3)
+    assert sorted(execution.run_id for execution in db.get_execution_history(workflow_id)) == \
+        [f'run{n}' for n in range(5)]
+
+
+def test_node_results_land_in_workflow_executions(db, workflow_id):
+    node_results = {'start': {'success': True}, 'extract': {'success': True, 'data': ['a', 'b']}}
+    recorder = ExecutionRecorder(db)
+    recorder.record(workflow_id, False, 2.5, 'boom', node_results, started_at=time.time() - 2.5, run_id='r1')
+    recorder.flush()
+
+    (execution,) = db.get_execution_history(workflow_id)
+    assert db.get_execution(execution.id).node_results == node_results
+    assert (execution.status, execution.execution_time, execution.error_message) == ('failed', 2.5, 'boom')
+    assert execution.started_at <= execution.completed_at
+
+
+def test_duplicate_run_ids_are_written_once(db, workflow_id):
+    recorder = ExecutionRecorder(db)
+    for _ in range(2):
+        recorder.record(workflow_id, True, 1.0, run_id='same')
+    assert recorder.flush() == 1
+    assert len(db.get_execution_history(workflow_id)) == 1
+
+
+def test_background_flush_on_full_batch_and_stop(db, workflow_id):
+    recorder = ExecutionRecorder(db, flush_interval=60, max_batch=3)
+    recorder.start()
+    try:
+        for n in range(3):
+            recorder.record(workflow_id, True, 1.0, run_id=f'batch{n}')
+        # A full batch wakes the flusher without waiting for flush_interval
+        wait_for(lambda: recorder.get_stats()['written'] == 3)
+
+        recorder.record(workflow_id, True, 1.0, run_id='last')
+    finally:
+        recorder.stop()
+    # stop() writes what is still pending
+    assert recorder.get_stats()['pending'] == 0
+    assert len(db.get_execution_history(workflow_id)) == 4
+
+
+def test_failed_write_is_retried_in_order(db, workflow_id):
+    store = FlakyStore(db)
+    recorder = ExecutionRecorder(store, max_batch=10)
+    for n in range(3):
+        recorder.record(workflow_id, True, 1.0, run_id=f'run{n}')
+
+    assert recorder.flush() == 0
+    stats = recorder.get_stats()
+    assert (stats['pending'], stats['errors'], stats['last_error']) == (3, 1, 'database is locked')
+
+    assert recorder.flush() == 3
+    assert store.batches == [3]
+    history = sorted(db.get_execution_history(workflow_id), key=lambda execution: execution.id)
+    assert [execution.run_id for execution in history] == ['run0', 'run1', 'run2']
+
+
+def test_pending_buffer_is_bounded(db, workflow_id):
+    recorder = ExecutionRecorder(FlakyStore(db, failures=2), max_pending=3)
+    for n in range(5):
+        recorder.record(workflow_id, True, 1.0, run_id=f'run{n}')
+    # The oldest records are dropped while the database stays unavailable
+    stats = recorder.get_stats()
+    assert (stats['pending'], stats['dropped']) == (3, 2)
+    assert recorder.flush() == 0
+    assert recorder.flush() == 0
+    assert recorder.flush() == 3
+    assert sorted(execution.run_id for execution in db.get_execution_history(workflow_id)) == \
+        ['run2', 'run3', 'run4']
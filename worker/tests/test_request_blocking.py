@@ -0,0 +1,81 @@
+import pytest
+
+from core.request_blocking import ANALYTICS_DOMAINS, MEDIA_TYPES, compile_blocking_rules
+
+
+def rules_for(config):
+    return compile_blocking_rules({'request_blocking': config})
+
+
+def test_no_settings_blocks_nothing():
+    assert compile_blocking_rules(None) is None
+    assert compile_blocking_rules({}) is None
+    assert rules_for('none') is None
+    assert rules_for({'profile': 'none', 'allow_domains': ['example.com']}) is None
+
+
+@pytest.mark.parametrize('profile, types, domains', [
+    ('media', MEDIA_TYPES, ()),
+    ('analytics', (), ANALYTICS_DOMAINS),
+    ('lean', MEDIA_TYPES, ANALYTICS_DOMAINS),
+])
+def test_profiles(profile, types, domains):
+    rules = rules_for(profile)
+    assert rules.resource_types == frozenset(types)
+    assert rules.block_domains == frozenset(domains)
+    assert rules_for({'profile': profile}).resource_types == rules.resource_types
+
+
+def test_match_by_type_domain_and_url():
+    rules = rules_for({
+        'profile': 'media',
+        'block_domains': ['.Tracker.example'],
+        'block_urls': ['**/ads/*.js']
+    })
+    assert rules.match('https://shop.example/logo.png', 'image') == 'type'
+    assert rules.match('https://cdn.tracker.example/t.js', 'script') == 'domain'
+    assert rules.match('https://tracker.example/', 'document') == 'domain'
+    assert rules.match('https://shop.example/ads/banner.js', 'script') == 'url'
+    # `*` does not cross path segments
+    assert rules.match('https://shop.example/ads/v2/banner.js', 'script') is None
+    assert rules.match('https://nottracker.example/t.js', 'script') is None
+    assert rules.match('https://shop.example/', 'document') is None
+
+
+def test_allowlists_take_precedence():
+    rules = rules_for({
+        'profile': 'lean',
+        'allow_domains': ['images.shop.example'],
+        'allow_urls': ['https://www.googletagmanager.com/gtm.js*']
+    })
+    assert rules.match('https://images.shop.example/a.png', 'image') is None
+    assert rules.match('https://cdn.images.shop.example/a.png', 'image') is None
+    assert rules.match('https://shop.example/a.png', 'image') == 'type'
+    assert rules.match('https://www.googletagmanager.com/gtm.js?id=1', 'script') is None
+    assert rules.match('https://www.googletagmanager.com/other.js', 'script') == 'domain'
+
+
+def test_data_urls_are_not_matched_by_domain():
+    rules = rules_for({'block_domains': ['ads.example']})
+    assert rules.match('data:image/png;base64,AAAA', 'image') is None
+    assert rules.match('blob:https://shop.example/1', 'fetch') is None
+
+
+@pytest.mark.parametrize('browser_settings', [
+    'lean',
+    ['lean'],
+    {'request_blocking': 5},
+    {'request_blocking': ['lean']},
+    {'request_blocking': 'everything'},
+    {'request_blocking': {'profile': ['lean']}},
+    {'request_blocking': {'block_everything': True}},
+    {'request_blocking': {'block_domains': 'ads.example'}},
+    {'request_blocking': {'block_domains': ['']}},
+    {'request_blocking': {'allow_domains': ['.']}},
+    {'request_blocking': {'block_urls': ['']}},
+    {'request_blocking': {'resource_types': ['image', 3]}},
+    {'request_blocking': {'allow_urls': {'url': '**'}}},
+])
+def test_invalid_settings_raise_value_error(browser_settings):
+    with pytest.raises(ValueError):
+        compile_blocking_rules(browser_settings)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.job_queue import JobQueue
+from database.models import Workflow, WorkflowExecution, Workspace
+from database.retention import RetentionManager
+
+
+@pytest.fixture
+def job_queue(db):
+    return JobQueue(db)
+
+
+@pytest.fixture
+def workflow_id(db):
+    workspace_id = db.create_workspace(Workspace(name='retention'))
+    return db.create_workflow(Workflow(workspace_id=workspace_id, name='wf', json_content='{"nodes": []}'))
+
+
+def day(days_ago: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+def record(db, workflow_id, status, execution_time, days_ago, node_results=None):
+    """Record one finished execution started at noon (UTC) `days_ago` days ago; returns its id"""
+    started = f"{day(days_ago)} 12:00:00"
+    db.record_executions([WorkflowExecution(
+        workflow_id=workflow_id, status=status, execution_time=execution_time,
+        node_results=node_results, started_at=started, completed_at=started
+    )])
+    with db.get_connection() as conn:
+        return conn.execute("SELECT MAX(id) FROM workflow_executions").fetchone()[0]
+
+
+def test_expired_executions_are_rolled_up_into_daily_sums(db, workflow_id, tmp_path):
+    record(db, workflow_id, 'completed', 2.0, days_ago=100)
+    record(db, workflow_id, 'completed', 5.0, days_ago=100)
+    record(db, workflow_id, 'failed', 9.0, days_ago=100)
+    record(db, workflow_id, 'completed', 1.0, days_ago=95)
+    kept = record(db, workflow_id, 'completed', 3.0, days_ago=89)
+
+    retention = RetentionManager(db, tmp_path / 'archive', archive_after_days=90, retain_days=90,
+                                 batch_size=2, pause=0)
+    assert retention.run_once()['rolled_up'] == 4
+
+    rollups = {row['day']: row for row in db.get_execution_rollups(workflow_id, days=120)}
+    assert set(rollups) == {day(100), day(95)}
+    oldest = rollups[day(100)]
+    assert (oldest['completed_executions'], oldest['failed_executions']) == (2, 1)
+    # Only completed runs count towards execution time
+    assert oldest['total_execution_time'] == 7.0
+    assert oldest['max_execution_time'] == 9.0
+    assert rollups[day(95)]['total_execution_time'] == 1.0
+
+    # Executions inside the window are untouched
+    assert [execution.id for execution in db.get_execution_history(workflow_id)] == [kept]
+
+
+def test_archived_node_results_load_back_identically(db, workflow_id, tmp_path):
+    node_results = {'start': {'success': True}, 'extract': {'success': True, 'data': ['a', 'é', 1.5]}}
+    old = [record(db, workflow_id, 'completed', 1.0, days_ago=10, node_results=dict(node_results, n=n))
+           for n in range(3)]
+    recent = record(db, workflow_id, 'completed', 1.0, days_ago=6, node_results=node_results)
+
+    retention = RetentionManager(db, tmp_path / 'archive', archive_after_days=7, batch_size=2, pause=0)
+    assert retention.run_once() == {'archived': 3, 'rolled_up': 0, 'jobs_purged': 0}
+
+    for n, execution_id in enumerate(old):
+        execution = db.get_execution(execution_id)
+        assert execution.node_results is None and execution.archive_ref
+        assert retention.load_node_results(execution) == dict(node_results, n=n)
+
+    execution = db.get_execution(recent)
+    assert execution.archive_ref is None
+    assert retention.load_node_results(execution) == node_results
+
+
+def test_run_once_purges_old_finished_jobs_in_batches(db, job_queue, tmp_path):
+    for _ in range(5):
+        job_queue.enqueue('workflow', {})
+    for job in job_queue.claim('a', limit=5):
+        job_queue.complete(job.id, 'a', True)
+    kept = job_queue.enqueue('workflow', {})
+    with db.get_connection() as conn:
+        conn.execute("UPDATE jobs SET updated_at = updated_at - 3 * 86400")
+
+    retention = RetentionManager(db, tmp_path / 'archive', batch_size=2, pause=0,
+                                 job_queue=job_queue, job_retain_days=1)
+    assert retention.run_once()['jobs_purged'] == 5
+    assert job_queue.get_stats() == {'queued': 1}
+    assert job_queue.get_job(kept).status == 'queued'
+    assert retention.get_stats()['jobs_purged'] == 5
+
+
+def test_jobs_are_kept_without_a_queue_or_inside_the_window(db, job_queue, tmp_path):
+    job_queue.enqueue('workflow', {})
+    job_queue.complete(job_queue.claim('a')[0].id, 'a', True)
+    assert RetentionManager(db, tmp_path / 'archive').run_once()['jobs_purged'] == 0
+    retention = RetentionManager(db, tmp_path / 'archive', job_queue=job_queue, job_retain_days=1)
+    assert retention.run_once()['jobs_purged'] == 0
+    assert job_queue.get_stats() == {'completed': 1}
@@ -0,0 +1,114 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from core.cron import CronExpression, CronSchedule, IntervalSchedule, parse_schedule
+from core.scheduler import Scheduler
+
+
+def next_after(expression, when):
+    return CronExpression(expression).next_after(datetime.fromisoformat(when)).isoformat()
+
+
+@pytest.mark.parametrize('expression, when, expected', [
+    ('* * * * *', '2024-03-10T10:15:30', '2024-03-10T10:16:00'),
+    ('*/15 * * * *', '2024-03-10T10:15:00', '2024-03-10T10:30:00'),
+    ('0 9-17/4 * * *', '2024-03-10T13:00:00', '2024-03-10T17:00:00'),
+    ('30 2 * * *', '2024-03-10T02:30:00', '2024-03-11T02:30:00'),
+    ('0 0 1 jan *', '2024-03-10T00:00:00', '2025-01-01T00:00:00'),
+    ('0 0 * * mon-fri', '2024-03-09T12:00:00', '2024-03-11T00:00:00'),
+    ('0 0 * * 7', '2024-03-09T12:00:00', '2024-03-10T00:00:00'),
+    ('0 0 29 2 *', '2024-03-01T00:00:00', '2028-02-29T00:00:00'),
+    ('@hourly', '2024-12-31T23:59:00', '2025-01-01T00:00:00'),
+    ('@weekly', '2024-03-10T00:00:00', '2024-03-17T00:00:00'),
+])
+def test_next_after(expression, when, expected):
+    assert next_after(expression, when) == expected
+
+
+def test_day_of_month_and_weekday_match_either():
+    # The 13th or any Friday, like Vixie cron
+    assert next_after('0 0 13 * fri', '2024-03-01T00:00:00') == '2024-03-08T00:00:00'
+    assert next_after('0 0 13 * fri', '2024-03-08T00:00:00') == '2024-03-13T00:00:00'
+
+
+@pytest.mark.parametrize('expression', [
+    '* * * *', '60 * * * *', '* 24 * * *', '* * 0 * *', '*/0 * * * *', '5-1 * * * *', 'x * * * *',
+])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_expression_that_never_matches():
+    with pytest.raises(ValueError):
+        CronExpression('0 0 30 2 *').next_after(datetime(2024, 1, 1))
+
+
+def test_parse_schedule():
+    assert parse_schedule(None) is None
+    assert parse_schedule({'enabled': False, 'cron_expression': '@daily'}) is None
+    assert parse_schedule({'enabled': True, 'cron_expression': ' '}) is None
+    assert parse_schedule({'enabled': True, 'cron_expression': '@every 5m'}).seconds == 300
+    assert parse_schedule({'enabled': True, 'cron_expression': 'every 30s'}).seconds == 30
+    assert parse_schedule({'enabled': True, 'interval_seconds': 7}).seconds == 7
+    schedule = parse_schedule({'enabled': True, 'cron_expression': '0 6 * * *', 'timezone': 'UTC'})
+    assert isinstance(schedule, CronSchedule)
+    assert schedule.next_fire(datetime.fromisoformat('2024-03-10T07:00:00+00:00').timestamp()) == \
+        datetime.fromisoformat('2024-03-11T06:00:00+00:00').timestamp()
+
+
+class FakeSchedule:
+    def __init__(self, period):
+        self.period = period
+
+    def next_fire(self, after):
+        return (after // self.period + 1) * self.period
+
+    def __repr__(self):
+        return f"FakeSchedule({self.period})"
+
+
+def test_pop_due_skips_replaced_and_removed_entries():
+    scheduler = Scheduler(on_due=None, max_jitter=0)
+    scheduler.set('a', FakeSchedule(10), 'payload-a', now=0)
+    scheduler.set('b', FakeSchedule(10), 'payload-b', now=0)
+    scheduler.set('a', FakeSchedule(20), 'payload-a2', now=0)
+    scheduler.remove('b')
+    assert scheduler._pop_due(15) == []
+    assert scheduler._pop_due(20) == [('a', 'payload-a2', 20, 0.0)]
+    # Missed fires run once, then resume from now
+    assert scheduler._pop_due(95) == [('a', 'payload-a2', 40, 0.0)]
+    assert scheduler._entries['a'].next_fire == 100
+
+
+def test_sync_keeps_unchanged_schedules():
+    scheduler = Scheduler(on_due=None)
+    scheduler.set('keep', FakeSchedule(10), 1, now=0)
+    scheduler.set('drop', FakeSchedule(10), 1, now=0)
+    version = scheduler._entries['keep'].version
+    scheduler.sync({'keep': (FakeSchedule(10), 2), 'new': (FakeSchedule(5), 3)})
+    assert set(scheduler._entries) == {'keep', 'new'}
+    assert scheduler._entries['keep'].version == version
+    assert scheduler._entries['keep'].payload == 2
+
+
+def test_jitter_is_bounded_by_the_period():
+    scheduler = Scheduler(on_due=None, max_jitter=30, jitter_ratio=0.1)
+    scheduler.set('a', IntervalSchedule(10), now=0)
+    for _ in range(100):
+        delay = scheduler._pop_due(scheduler._entries['a'].next_fire)[0][3]
+        assert 0 <= delay <= 1.0
+
+
+def test_thread_fires_due_schedules():
+    fired = threading.Event()
+    scheduler = Scheduler(on_due=lambda key, payload, fire_at, delay: fired.set(), max_jitter=0)
+    scheduler.start()
+    try:
+        scheduler.set('a', IntervalSchedule(0.05))
+        assert fired.wait(2)
+    finally:
+        scheduler.stop()
+    assert scheduler.get_stats()['fired'] >= 1
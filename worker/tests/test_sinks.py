@@ -0,0 +1,96 @@
+import asyncio
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from strategies import sinks
+from strategies.base_strategy import RUN_ID_KEY
+from strategies.node_strategies import ExtractMultipleStrategy
+
+
+@pytest.fixture
+def results_dir(tmp_path, monkeypatch):
+    root = tmp_path / 'results'
+    monkeypatch.setattr(sinks, 'RESULTS_DIR', str(root))
+    return root
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def write(params, name='items', run_id='run1', *parts):
+    async def main():
+        sink = await sinks.sink_from_params(params, name, run_id)
+        return await sinks.stream_to_sink(sink, chunks(*parts))
+    return asyncio.run(main())
+
+
+def test_no_sink():
+    assert asyncio.run(sinks.sink_from_params({}, 'items')) is None
+
+
+def test_default_path_uses_run_id(results_dir):
+    handle = write({'sink': 'jsonl'}, 'items', 'run1', [{'a': 1}], [{'a': 2}, {'a': 'é'}])
+    path = results_dir / 'items-run1.jsonl'
+    assert handle == {'sink': 'jsonl', 'path': str(path), 'rows': 3}
+    assert [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()] == \
+        [{'a': 1}, {'a': 2}, {'a': 'é'}]
+
+
+def test_csv_appends_under_existing_header(results_dir):
+    params = {'sink': 'csv', 'sinkPath': 'out/{run_id}.csv'}
+    write(params, 'items', 'run1', [{'a': 1, 'b': 2}])
+    handle = write(params, 'items', 'run1', [{'b': 4, 'a': 3, 'c': 5}])
+    with open(results_dir / 'out' / 'run1.csv', newline='', encoding='utf-8') as f:
+        assert list(csv.reader(f)) == [['a', 'b'], ['1', '2'], ['3', '4']]
+    assert handle['rows'] == 1
+
+
+def test_sqlite_adds_missing_columns(results_dir):
+    params = {'sink': 'sqlite', 'sinkPath': 'data.db', 'sinkTable': 'products'}
+    handle = write(params, 'items', 'run1', [{'name': 'a'}], [{'name': 'b', 'price': '1'}])
+    assert handle['table'] == 'products' and handle['rows'] == 2
+    with sqlite3.connect(results_dir / 'data.db') as conn:
+        assert conn.execute('SELECT name, price FROM products ORDER BY name').fetchall() == \
+            [('a', None), ('b', '1')]
+
+
+@pytest.mark.parametrize('params', [
+    {'sink': 'xml'},
+    {'sink': 'sqlite', 'sinkTable': 'bad name'},
+    {'sink': 'jsonl', 'sinkPath': '../escape.jsonl'},
+    {'sink': 'jsonl', 'sinkPath': 'a/../../escape.jsonl'},
+    {'sink': 'jsonl', 'sinkPath': '/tmp/escape.jsonl'},
+    {'sink': 'jsonl', 'sinkPath': '.'},
+    {'sink': 'jsonl', 'sinkPath': '{run_id}/x.jsonl'},
+])
+def test_invalid_sinks_are_rejected(results_dir, params):
+    with pytest.raises(ValueError):
+        asyncio.run(sinks.sink_from_params(params, 'items', '..'))
+    assert not (results_dir.parent / 'escape.jsonl').exists()
+
+
+def test_symlink_out_of_results_dir_is_rejected(results_dir, tmp_path):
+    results_dir.mkdir()
+    (results_dir / 'link').symlink_to(tmp_path)
+    with pytest.raises(ValueError):
+        sinks.resolve_sink_path('link/x.jsonl')
+
+
+def test_extract_multiple_names_the_sink_after_the_run(results_dir):
+    class Locator:
+        async def evaluate_all(self, script, args):
+            return {'total': 2, 'rows': [{'n': 1}, {'n': 2}]}
+
+    class Page:
+        def locator(self, selector):
+            return Locator()
+
+    context = {RUN_ID_KEY: 'abc123'}
+    params = {'containerSelector': '#list', 'itemSelector': 'li', 'variableName': 'rows', 'sink': 'jsonl'}
+    asyncio.run(ExtractMultipleStrategy().execute(Page(), params, context))
+    assert context['rows'] == {'sink': 'jsonl', 'path': str(results_dir / 'rows-abc123.jsonl'), 'rows': 2}
@@ -0,0 +1,41 @@
+from database.models import Workflow, Workspace
+
+
+def test_pages_follow_display_order_and_id(db):
+    workspace_id = db.create_workspace(Workspace(name='paging'))
+    # Equal display orders are ordered by id, so the cursor needs both
+    orders = [2, 0, 1, 1, 0, 2, 1]
+    ids = [db.create_workflow(Workflow(workspace_id=workspace_id, name=f'wf{n}', display_order=order,
+                                       json_content='{"nodes": [1]}'))
+           for n, order in enumerate(orders)]
+    expected = [workflow_id for _, workflow_id in sorted(zip(orders, ids))]
+
+    seen, after = [], None
+    while True:
+        page = db.get_workflows_by_workspace(workspace_id, limit=3, after=after)
+        seen.extend(workflow.id for workflow in page)
+        if len(page) < 3:
+            break
+        after = (page[-1].display_order, page[-1].id)
+    assert seen == expected
+    assert [workflow.id for workflow in db.get_workflows_by_workspace(workspace_id)] == expected
+
+
+def test_listing_omits_bodies_that_get_workflow_loads(db):
+    workspace_id = db.create_workspace(Workspace(name='bodies'))
+    workflow_id = db.create_workflow(Workflow(workspace_id=workspace_id, name='wf', json_content='{"nodes": [1]}'))
+    assert db.get_workflows_by_workspace(workspace_id)[0].json_content == ''
+    assert db.get_workflow(workflow_id).json_content == '{"nodes": [1]}'
+
+
+def test_identical_bodies_are_stored_once_and_dropped_with_the_last_reference(db):
+    workspace_id = db.create_workspace(Workspace(name='dedupe'))
+    first, second = (db.create_workflow(Workflow(workspace_id=workspace_id, name=name, json_content='{"a": 1}'))
+                     for name in ('a', 'b'))
+    with db.get_connection() as conn:
+        count = lambda: conn.execute("SELECT COUNT(*) FROM workflow_contents").fetchone()[0]
+        assert count() == 1
+        db.delete_workflow(first)
+        assert count() == 1
+        db.delete_workflow(second)
+        assert count() == 0
@@ -0,0 +1,52 @@
+import json
+import threading
+
+import pytest
+
+from core.directory_sync import ManifestScan
+from core.workflow_manager import WorkflowManager
+
+WORKFLOW = json.dumps({'nodes': [{'id': 'start', 'type': 'start'}], 'connections': []})
+
+
+@pytest.fixture
+def manager():
+    return WorkflowManager(headless=True)
+
+
+def test_concurrent_installs_are_not_lost(manager):
+    def install(prefix):
+        for n in range(200):
+            manager._install_workflow(f"{prefix}{n}", WORKFLOW)
+
+    threads = [threading.Thread(target=install, args=(prefix,)) for prefix in 'abcd']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(manager.workflows) == 800
+
+
+def test_remove_and_clear_rebind_instead_of_mutating(manager):
+    for name in ('a', 'b'):
+        manager._install_workflow(name, WORKFLOW)
+    snapshot = manager.workflows
+
+    assert manager.remove_workflow('a')
+    assert not manager.remove_workflow('a')
+    assert list(manager.workflows) == ['b']
+    assert list(snapshot) == ['a', 'b']
+
+    snapshot = manager.workflows
+    assert manager.clear_all_workflows()
+    assert manager.workflows == {}
+    assert list(snapshot) == ['b']
+
+
+def test_directory_changes_remove_deleted_files(manager):
+    for name in ('a', 'b'):
+        manager._install_workflow(name, WORKFLOW)
+    snapshot = manager.workflows
+    manager._apply_directory_changes(ManifestScan(files={}, added=[], changed=[], removed=['a', 'missing'], errors=[]))
+    assert list(manager.workflows) == ['b']
+    assert list(snapshot) == ['a', 'b']